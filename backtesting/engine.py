@@ -1,94 +1,250 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict
-from strategies.base_strategy import BaseStrategy
+from typing import List, Dict, Optional
+from strategies.base_strategy import BaseStrategy, SIGNAL_BUY, SIGNAL_SELL
 from database.models import BacktestResult
+from ml.utils.metrics import compute_metrics, infer_periods_per_year
+
+def _finite(value):
+    return value if value is not None and np.isfinite(value) else None
+
+def _to_ns(timestamps) -> np.ndarray:
+    return pd.to_datetime(pd.Series(timestamps)).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+class IntrabarPath:
+    """Путь цены внутри свечей стратегии по свечам младшего таймфрейма
+    Границы свечей стратегии в массиве минуток считаются один раз через
+    searchsorted, дальше поиск срабатывания SL/TP идет по срезам массивов.
+    """
+    def __init__(self, bar_timestamps, intrabar: pd.DataFrame, chunk_size: int = 4096):
+        self.times = _to_ns(intrabar['timestamp'])
+        self.open = intrabar['open'].to_numpy(dtype=np.float64)
+        self.high = intrabar['high'].to_numpy(dtype=np.float64)
+        self.low = intrabar['low'].to_numpy(dtype=np.float64)
+        self.chunk_size = chunk_size
+
+        bar_times = _to_ns(bar_timestamps)
+        interval = np.median(np.diff(bar_times)) if len(bar_times) > 1 else 0
+        self.starts = np.searchsorted(self.times, bar_times, side='left')
+        self.ends = np.append(self.starts[1:], np.searchsorted(self.times, bar_times[-1] + interval, side='left'))
+
+    def first_hit(self, first_bar: int, last_bar: int, stop: float, take: float):
+        """Первая свеча, задевшая уровень: (свеча стратегии, цена, причина) или None"""
+        start, end = self.starts[first_bar], self.ends[last_bar]
+        for a in range(start, end, self.chunk_size):
+            b = min(a + self.chunk_size, end)
+            stop_hit = self.low[a:b] <= stop
+            take_hit = self.high[a:b] >= take
+            hits = stop_hit | take_hit
+            k = int(np.argmax(hits))
+            if not hits[k]:
+                continue
+
+            m = a + k
+            bar = int(np.searchsorted(self.starts, m, side='right')) - 1
+            # Если в одной минуте задеты оба уровня, считаем, что первым сработал стоп
+            if stop_hit[k]:
+                return bar, min(self.open[m], stop), 'stop_loss'
+            return bar, max(self.open[m], take), 'take_profit'
+        return None
 
 class BacktestEngine:
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, intrabar_data: Optional[pd.DataFrame] = None,
+                 stop_loss_percent: Optional[float] = None, take_profit_percent: Optional[float] = None):
         self.data = data
         self.initial_capital = 10000
         self.current_capital = self.initial_capital
         self.positions = []
         self.trades = []
-        
-    def run(self, strategy: BaseStrategy, symbol: str = "BTCUSDT") -> Dict:
+        self.holdings = []
+        self.warmup_period = 20
+
+        # SL/TP проверяются по минуткам, а без них - по high/low самих свечей
+        self.stop_loss_percent = stop_loss_percent
+        self.take_profit_percent = take_profit_percent
+        self.intrabar = None
+        if stop_loss_percent or take_profit_percent:
+            self.intrabar = IntrabarPath(data['timestamp'], data if intrabar_data is None else intrabar_data)
+
+    def run(self, strategy: BaseStrategy, symbol: str = "BTCUSDT", vectorized: bool = False) -> Dict:
         """Запуск бэктеста"""
-        results = {
-            'total_trades': 0,
-            'winning_trades': 0,
-            'losing_trades': 0,
-            'total_pnl': 0,
-            'max_drawdown': 0,
-            'sharpe_ratio': 0,
-            'win_rate': 0,
-            'profit_factor': 0
-        }
-        
+        if vectorized:
+            return self.run_vectorized(strategy, symbol)
+
         equity_curve = [self.initial_capital]
-        
+
         for i in range(len(self.data)):
-            if i < 20:  
+            if i < self.warmup_period:
                 continue
-                
+
+            self._check_exits(i)
+
             # Анализ текущего состояния
             current_data = self.data.iloc[:i+1].copy()
             analysis = strategy.analyze(current_data)
-            
+
             current_price = self.data.iloc[i]['close']
-            
+
             # Имитация торговли
             if analysis['signal'] == 'BUY' and len(self.positions) == 0:
-                # Открытие позиции
-                position_size = self.current_capital * 0.1 / current_price
-                self.positions.append({
-                    'entry_price': current_price,
-                    'size': position_size,
-                    'entry_time': self.data.iloc[i]['timestamp']
-                })
-                
+                self._open_position(i, current_price)
             elif analysis['signal'] == 'SELL' and len(self.positions) > 0:
-                # Закрытие позиции
-                position = self.positions.pop()
-                pnl = (current_price - position['entry_price']) * position['size']
-                self.current_capital += pnl
-                self.trades.append({
-                    'entry_price': position['entry_price'],
-                    'exit_price': current_price,
-                    'pnl': pnl,
-                    'timestamp': self.data.iloc[i]['timestamp']
-                })
-            
+                self._close_position(i, current_price)
+
             equity_curve.append(self.current_capital)
-        
-        
+
+        return self._calculate_results(equity_curve)
+
+    def run_vectorized(self, strategy: BaseStrategy, symbol: str = "BTCUSDT") -> Dict:
+        """Бэктест за линейное время по заранее рассчитанным сигналам"""
+        signals, _ = strategy.analyze_series(self.data)
+        closes = self.data['close'].to_numpy(dtype=np.float64)
+        start_capital = self.current_capital
+
+        # Сделки возможны только на свечах с сигналом, остальные не меняют капитал
+        capital_changes = np.zeros(len(closes), dtype=np.float64)
+        for i in np.flatnonzero(signals[self.warmup_period:]) + self.warmup_period:
+            # SL/TP до свечи с сигналом включительно: позиция могла закрыться раньше
+            exit = self._check_exits(i)
+            if exit is not None:
+                capital_changes[exit[0]] += exit[1]
+
+            if signals[i] == SIGNAL_BUY and len(self.positions) == 0:
+                self._open_position(i, closes[i])
+            elif signals[i] == SIGNAL_SELL and len(self.positions) > 0:
+                capital_changes[i] += self._close_position(i, closes[i])
+
+        exit = self._check_exits(len(closes) - 1)
+        if exit is not None:
+            capital_changes[exit[0]] += exit[1]
+
+        # Накопление в том же порядке, что и в поштучном режиме
+        equity = np.cumsum(np.concatenate((
+            [start_capital],
+            capital_changes[self.warmup_period:]
+        )))
+        equity_curve = np.concatenate(([self.initial_capital], equity[1:]))
+
+        return self._calculate_results(equity_curve)
+
+    def _open_position(self, i: int, price: float):
+        """Открытие позиции на свече i"""
+        position_size = self.current_capital * 0.1 / price
+        self.positions.append({
+            'entry_price': price,
+            'size': position_size,
+            'entry_time': self.data['timestamp'].iloc[i],
+            # Уровни как в RiskManager.calculate_stop_loss/calculate_take_profit для BUY
+            'stop_loss': price * (1 - self.stop_loss_percent / 100) if self.stop_loss_percent else -np.inf,
+            'take_profit': price * (1 + self.take_profit_percent / 100) if self.take_profit_percent else np.inf,
+            'checked_bar': i,
+            'entry_bar': i
+        })
+
+    def _close_position(self, i: int, price: float, reason: str = 'signal') -> float:
+        """Закрытие позиции на свече i, возвращает PnL"""
+        position = self.positions.pop()
+        pnl = (price - position['entry_price']) * position['size']
+        self.current_capital += pnl
+        self.holdings.append((position['entry_bar'], i, position['entry_price'] * position['size']))
+        self.trades.append({
+            'entry_price': position['entry_price'],
+            'exit_price': price,
+            'pnl': pnl,
+            'timestamp': self.data['timestamp'].iloc[i],
+            'exit_reason': reason
+        })
+        return pnl
+
+    def _check_exits(self, last_bar: int):
+        """Срабатывание SL/TP открытой позиции до свечи last_bar: (свеча, PnL) или None"""
+        if self.intrabar is None or not self.positions:
+            return None
+        position = self.positions[-1]
+        # Уровни действуют со следующей после входа свечи
+        first_bar = position['checked_bar'] + 1
+        if first_bar > last_bar:
+            return None
+        position['checked_bar'] = last_bar
+
+        hit = self.intrabar.first_hit(first_bar, last_bar, position['stop_loss'], position['take_profit'])
+        if hit is None:
+            return None
+        bar, price, reason = hit
+        return bar, self._close_position(bar, price, reason)
+
+    def _calculate_results(self, equity_curve) -> Dict:
+        """Расчет итоговых метрик бэктеста"""
+        results = {
+            'total_trades': 0,
+            'winning_trades': 0,
+            'losing_trades': 0,
+            'total_pnl': 0,
+            'max_drawdown': 0,
+            'max_drawdown_duration': 0,
+            'sharpe_ratio': 0,
+            'sortino_ratio': 0,
+            'calmar_ratio': 0,
+            'exposure': 0,
+            'turnover': 0,
+            'win_rate': 0,
+            'profit_factor': 0
+        }
+
         if len(self.trades) > 0:
-            winning_trades = [t for t in self.trades if t['pnl'] > 0]
-            losing_trades = [t for t in self.trades if t['pnl'] < 0]
-            
-            total_pnl = sum([t['pnl'] for t in self.trades])
-            win_rate = len(winning_trades) / len(self.trades) if self.trades else 0
-            
-            winning_amount = sum([t['pnl'] for t in winning_trades])
-            losing_amount = abs(sum([t['pnl'] for t in losing_trades]))
-            profit_factor = winning_amount / losing_amount if losing_amount > 0 else float('inf')
-            
-            # Расчет максимальной просадки
-            equity_series = pd.Series(equity_curve)
-            rolling_max = equity_series.expanding().max()
-            drawdown = (equity_series - rolling_max) / rolling_max
-            max_drawdown = drawdown.min()
-            
-            results.update({
-                'total_trades': len(self.trades),
-                'winning_trades': len(winning_trades),
-                'losing_trades': len(losing_trades),
-                'total_pnl': total_pnl,
-                'max_drawdown': abs(max_drawdown),
-                'win_rate': win_rate,
-                'profit_factor': profit_factor,
-                'total_return': ((self.current_capital - self.initial_capital) / self.initial_capital) * 100
-            })
-        
+            equity = np.asarray(equity_curve, dtype=np.float64)
+            metrics = compute_metrics(
+                equity,
+                trade_pnl=np.fromiter((t['pnl'] for t in self.trades), dtype=np.float64, count=len(self.trades)),
+                positions=self._position_curve(len(equity)),
+                periods_per_year=infer_periods_per_year(self.data['timestamp'])
+            )
+            results.update({name: value.item() for name, value in metrics.items()})
 
         return results
+
+    def _position_curve(self, length: int) -> np.ndarray:
+        """Стоимость позиции в каждой точке кривой капитала"""
+        holdings = list(self.holdings)
+        if self.positions:
+            position = self.positions[-1]
+            holdings.append((position['entry_bar'], len(self.data) - 1, position['entry_price'] * position['size']))
+
+        # Точка t кривой - капитал после свечи warmup + t - 1, позиция держится на (вход, выход]
+        changes = np.zeros(length + 1, dtype=np.float64)
+        for entry_bar, exit_bar, notional in holdings:
+            changes[entry_bar - self.warmup_period + 2] += notional
+            changes[exit_bar - self.warmup_period + 2] -= notional
+        return np.cumsum(changes[:length])
+
+    @staticmethod
+    def to_record(results: Dict, strategy: str, symbol: str, start_date, end_date) -> Dict:
+        """Строка BacktestResult из результатов бэктеста; бесконечности и NaN пишутся как NULL"""
+        return {
+            'strategy': strategy,
+            'symbol': symbol,
+            'start_date': start_date,
+            'end_date': end_date,
+            'total_trades': results.get('total_trades', 0),
+            'win_rate': results.get('win_rate', 0),
+            'profit_factor': _finite(results.get('profit_factor')),
+            'max_drawdown': results.get('max_drawdown', 0),
+            'max_drawdown_duration': results.get('max_drawdown_duration', 0),
+            'sharpe_ratio': _finite(results.get('sharpe_ratio', 0)),
+            'sortino_ratio': _finite(results.get('sortino_ratio', 0)),
+            'calmar_ratio': _finite(results.get('calmar_ratio', 0)),
+            'exposure': results.get('exposure', 0),
+            'turnover': results.get('turnover', 0),
+            'total_return': results.get('total_return', 0)
+        }
+
+    def save_results(self, results: Dict, strategy: str, symbol: str, db) -> BacktestResult:
+        """Сохранение результатов бэктеста в базу"""
+        record = BacktestResult(**self.to_record(
+            results, strategy, symbol,
+            self.data['timestamp'].iloc[0].to_pydatetime(),
+            self.data['timestamp'].iloc[-1].to_pydatetime()
+        ))
+        db.add(record)
+        db.commit()
+        return record
@@ -0,0 +1,177 @@
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from backtesting.engine import BacktestEngine
+from database.models import BacktestResult
+from utils.logger import logger
+
+# Колонки свечей, которые передаются воркерам
+SHARED_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+# Параметры сетки, которые относятся к BacktestEngine, а не к стратегии
+ENGINE_PARAMS = ('stop_loss_percent', 'take_profit_percent')
+
+# Данные воркера: DataFrame поверх общей памяти, создается один раз на процесс
+_worker_data = None
+_worker_intrabar = None
+_worker_memory = []
+
+def _attach_frame(spec: Dict[str, tuple]) -> pd.DataFrame:
+    columns = {}
+    for column, (name, dtype, length) in spec.items():
+        memory = shared_memory.SharedMemory(name=name)
+        _worker_memory.append(memory)
+        columns[column] = np.ndarray((length,), dtype=dtype, buffer=memory.buf)
+
+    if 'timestamp' in columns:
+        columns['timestamp'] = columns['timestamp'].view('datetime64[ns]')
+    return pd.DataFrame(columns, copy=False)
+
+def _attach_worker(spec: Dict[str, tuple], intrabar_spec: Optional[Dict[str, tuple]] = None):
+    """Инициализатор процесса: подключение к массивам OHLCV и минуток в общей памяти"""
+    global _worker_data, _worker_intrabar
+    _worker_data = _attach_frame(spec)
+    _worker_intrabar = _attach_frame(intrabar_spec) if intrabar_spec else None
+
+def _run_backtest(task: tuple) -> dict:
+    """Один бэктест: класс стратегии, параметры и диапазон свечей"""
+    strategy_cls, params, start, end = task
+    strategy_params = {name: value for name, value in params.items() if name not in ENGINE_PARAMS}
+    engine_params = {name: value for name, value in params.items() if name in ENGINE_PARAMS}
+    engine = BacktestEngine(_worker_data.iloc[start:end], intrabar_data=_worker_intrabar, **engine_params)
+    results = engine.run(strategy_cls(**strategy_params), vectorized=True)
+    results.update({'params': params, 'start': start, 'end': end})
+    return results
+
+class StrategyOptimizer:
+    """Подбор параметров стратегии сеткой, случайным поиском и walk-forward
+    Бэктесты идут параллельно в пуле процессов, данные передаются
+    воркерам через общую память, а не сериализуются в каждую задачу.
+    В сетке можно задавать stop_loss_percent и take_profit_percent: уровни
+    проверяются по intrabar_data или по high/low самих свечей.
+    """
+    def __init__(self, data: pd.DataFrame, strategy_cls, symbol: str = "BTCUSDT",
+                 max_workers: Optional[int] = None, metric: str = 'total_return',
+                 intrabar_data: Optional[pd.DataFrame] = None):
+        self.data = data
+        self.intrabar_data = intrabar_data
+        self.strategy_cls = strategy_cls
+        self.symbol = symbol
+        self.max_workers = max_workers or os.cpu_count()
+        self.metric = metric
+
+    def grid_search(self, param_grid: Dict[str, list]) -> List[dict]:
+        """Перебор всех комбинаций параметров"""
+        names = list(param_grid)
+        combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+        return self.evaluate(combinations)
+
+    def random_search(self, param_space: Dict[str, list], n_iter: int = 50, seed: Optional[int] = None) -> List[dict]:
+        """Случайная выборка комбинаций параметров"""
+        rng = random.Random(seed)
+        combinations = [
+            {name: rng.choice(values) for name, values in param_space.items()}
+            for _ in range(n_iter)
+        ]
+        return self.evaluate(combinations)
+
+    def walk_forward(self, param_grid: Dict[str, list], train_size: int, test_size: int) -> List[dict]:
+        """Walk-forward: подбор на обучающем окне, проверка на следующем"""
+        names = list(param_grid)
+        combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+        windows = [
+            (start, start + train_size, start + train_size + test_size)
+            for start in range(0, len(self.data) - train_size - test_size + 1, test_size)
+        ]
+
+        with self._pool() as pool:
+            # Все обучающие прогоны всех окон - одна пачка задач
+            train_tasks = [
+                (self.strategy_cls, params, start, train_end)
+                for start, train_end, _ in windows
+                for params in combinations
+            ]
+            train_results = list(pool.map(_run_backtest, train_tasks, chunksize=self._chunksize(len(train_tasks))))
+
+            best_params = []
+            for i in range(len(windows)):
+                window_results = train_results[i * len(combinations):(i + 1) * len(combinations)]
+                best_params.append(self.best(window_results)['params'])
+
+            test_tasks = [
+                (self.strategy_cls, params, train_end, test_end)
+                for (_, train_end, test_end), params in zip(windows, best_params)
+            ]
+            test_results = list(pool.map(_run_backtest, test_tasks))
+
+        for result, (start, _, _) in zip(test_results, windows):
+            result['train_start'] = start
+        return test_results
+
+    def evaluate(self, combinations: List[dict], start: int = 0, end: Optional[int] = None) -> List[dict]:
+        """Параллельный прогон бэктестов для списка комбинаций параметров"""
+        end = len(self.data) if end is None else end
+        tasks = [(self.strategy_cls, params, start, end) for params in combinations]
+        with self._pool() as pool:
+            results = list(pool.map(_run_backtest, tasks, chunksize=self._chunksize(len(tasks))))
+        logger.info(f"Optimizer: evaluated {len(results)} {self.strategy_cls.__name__} parameter sets")
+        return results
+
+    def best(self, results: List[dict]) -> dict:
+        """Лучший результат по выбранной метрике"""
+        return max(results, key=lambda r: r.get(self.metric, 0))
+
+    def save_results(self, results: List[dict], db) -> int:
+        """Запись результатов в BacktestResult одной пачкой"""
+        timestamps = self.data['timestamp']
+        rows = []
+        for result in results:
+            strategy = f"{self.strategy_cls.__name__}({', '.join(f'{k}={v}' for k, v in result['params'].items())})"
+            rows.append(BacktestEngine.to_record(
+                result, strategy, self.symbol,
+                timestamps.iloc[result['start']].to_pydatetime(),
+                timestamps.iloc[result['end'] - 1].to_pydatetime()
+            ))
+
+        db.bulk_insert_mappings(BacktestResult, rows)
+        db.commit()
+        return len(rows)
+
+    def _chunksize(self, n_tasks: int) -> int:
+        return max(1, n_tasks // (self.max_workers * 4))
+
+    @contextmanager
+    def _pool(self):
+        """Пул процессов с данными в общей памяти на время работы"""
+        blocks = []
+        try:
+            spec = _share_frame(self.data, blocks)
+            intrabar_spec = _share_frame(self.intrabar_data, blocks) if self.intrabar_data is not None else None
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_attach_worker,
+                                     initargs=(spec, intrabar_spec)) as pool:
+                yield pool
+        finally:
+            for memory in blocks:
+                memory.close()
+                memory.unlink()
+
+def _share_frame(data: pd.DataFrame, blocks: list) -> Dict[str, tuple]:
+    """Копирование колонок свечей в общую память, возвращает описание для воркеров"""
+    spec = {}
+    for column in SHARED_COLUMNS:
+        if column not in data.columns:
+            continue
+        if column == 'timestamp':
+            array = data[column].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        else:
+            array = data[column].to_numpy(dtype=np.float64)
+        memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(memory)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[:] = array
+        spec[column] = (memory.name, array.dtype.str, len(array))
+    return spec
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from utils.logger import logger
+
+# Размеры синтетических рядов по умолчанию, в свечах
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+# Допустимое замедление относительно базовой линии
+DEFAULT_TOLERANCE = 0.25
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Имя замера -> (подготовка, максимальный размер)
+BENCHMARKS: Dict[str, tuple] = {}
+
+def benchmark(name: str, max_size: Optional[int] = None):
+    """Регистрация замера: подготовка получает размер и возвращает функцию без аргументов
+    Для замеров с max_size размер ряда ограничивается, чтобы квадратичные
+    или не зависящие от длины ряда пути не занимали весь прогон.
+    """
+    def register(setup: Callable[[int], Callable]):
+        BENCHMARKS[name] = (setup, max_size)
+        return setup
+    return register
+
+def make_ohlcv(n: int, seed: int = 42) -> pd.DataFrame:
+    """Синтетические минутные свечи со случайным блужданием цены"""
+    rng = np.random.default_rng(seed)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = close * np.abs(rng.normal(0, 0.001, n))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='1min'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 100, n)
+    })
+
+def make_klines(n: int, seed: int = 42) -> list:
+    """Свечи в формате REST API Binance: числа строками, как их отдает биржа"""
+    data = make_ohlcv(n, seed)
+    open_time = data['timestamp'].to_numpy(dtype='datetime64[ms]').view(np.int64)
+    columns = [data[name].to_numpy() for name in ('open', 'high', 'low', 'close', 'volume')]
+    return [
+        [int(t), f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}", int(t) + 59_999,
+         "0", 0, "0", "0", "0"]
+        for t, o, h, l, c, v in zip(open_time, *columns)
+    ]
+
+def _strategies() -> dict:
+    from strategies.rsi_strategy import RSIStrategy
+    from strategies.macd_strategy import MACDStrategy
+    from strategies.bollinger_strategy import BollingerBandsStrategy
+    return {'rsi': RSIStrategy, 'macd': MACDStrategy, 'bollinger': BollingerBandsStrategy}
+
+def _register_strategies():
+    for key in ('rsi', 'macd', 'bollinger'):
+        def analyze(size, key=key):
+            strategy, data = _strategies()[key](), make_ohlcv(size)
+            return lambda: strategy.analyze(data)
+
+        def backtest(size, key=key):
+            from backtesting.engine import BacktestEngine
+            strategy, data = _strategies()[key](), make_ohlcv(size)
+            return lambda: BacktestEngine(data).run(strategy, vectorized=True)
+
+        benchmark(f'strategy.{key}.analyze')(analyze)
+        benchmark(f'backtest.{key}.vectorized')(backtest)
+
+_register_strategies()
+
+@benchmark('backtest.rsi.per_bar', max_size=2_000)
+def backtest_per_bar(size):
+    from backtesting.engine import BacktestEngine
+    strategy, data = _strategies()['rsi'](), make_ohlcv(size)
+    return lambda: BacktestEngine(data).run(strategy)
+
+@benchmark('klines.parse')
+def klines_parse(size):
+    from exchanges.candle_buffer import CandleBuffer
+    klines = make_klines(size)
+
+    def parse():
+        buffer = CandleBuffer(size, 'BTCUSDT', '1m')
+        buffer.extend_klines(klines)
+        return buffer.to_frame()
+    return parse
+
+@benchmark('ml.lstm.prepare_data')
+def lstm_prepare_data(size):
+    from ml.models.lstm_model import LSTMPricePredictor
+    predictor, closes = LSTMPricePredictor(), make_ohlcv(size)['close'].to_numpy()
+    return lambda: predictor.prepare_data(closes)
+
+@benchmark('ml.lstm.predict', max_size=10_000)
+def lstm_predict(size):
+    from ml.models.lstm_model import LSTMPricePredictor
+    predictor, closes = LSTMPricePredictor(), make_ohlcv(size)['close'].to_numpy()
+    predictor.scaler.fit(closes.reshape(-1, 1))
+    return lambda: predictor.predict(closes)
+
+def _feature_candles(size):
+    data = make_ohlcv(size)
+    candles = {name: data[name].to_numpy() for name in ('open', 'high', 'low', 'close', 'volume')}
+    candles['open_time'] = data['timestamp'].to_numpy(dtype='datetime64[ms]').view(np.int64)
+    return candles
+
+@benchmark('ml.features.transform')
+def features_transform(size):
+    import tempfile
+    from ml.features.feature_engineering import FeaturePipeline
+    candles = _feature_candles(size)
+    pipeline = FeaturePipeline(path=tempfile.mkdtemp())
+    return lambda: pipeline.transform(candles)
+
+@benchmark('ml.ensemble.train', max_size=10_000)
+def ensemble_train(size):
+    import tempfile
+    from ml.features.feature_engineering import FeaturePipeline
+    from ml.models.ensemble_model import EnsemblePricePredictor
+    candles = _feature_candles(size)
+    features = FeaturePipeline(path=tempfile.mkdtemp()).transform(candles)
+    return lambda: EnsemblePricePredictor().train(features, candles['close'])
+
+@benchmark('ml.ensemble.predict', max_size=10_000)
+def ensemble_predict(size):
+    """Прогноз для пачки из size символов одним вызовом"""
+    import tempfile
+    from ml.features.feature_engineering import FeaturePipeline
+    from ml.models.ensemble_model import EnsemblePricePredictor
+    candles = _feature_candles(max(size, 5_000))
+    features = FeaturePipeline(path=tempfile.mkdtemp()).transform(candles)
+    model = EnsemblePricePredictor(n_jobs=1)
+    model.train(features, candles['close'])
+    return lambda: model.predict_batch(features[-size:], candles['close'][-size:])
+
+@benchmark('bot.combine_signals')
+def combine_signals(size):
+    from core.bot import TradingBot
+    bot = TradingBot.__new__(TradingBot)
+    rng = np.random.default_rng(42)
+    names = ('RSI', 'MACD', 'Bollinger', 'ML')
+    choices = np.array(['BUY', 'SELL', 'HOLD', 'STRONG_BUY', 'STRONG_SELL'])
+    signals = [
+        {name: {'signal': signal, 'confidence': confidence} for name, signal, confidence in zip(names, row, weights)}
+        for row, weights in zip(rng.choice(choices, (size, len(names))).tolist(), rng.random((size, len(names))).tolist())
+    ]
+    return lambda: [bot.combine_signals(signal) for signal in signals]
+
+def measure(func: Callable, repeat: int = 3) -> Dict:
+    """Время одного вызова в секундах: лучшее и медиана по повторам"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {'best': min(times), 'median': float(np.median(times)), 'number': number, 'repeat': repeat}
+
+def select(names: Optional[List[str]] = None) -> List[str]:
+    """Замеры, имена которых начинаются с одного из префиксов"""
+    if not names:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(name.startswith(prefix) for prefix in names)]
+
+def run_benchmarks(sizes: List[int] = DEFAULT_SIZES, names: Optional[List[str]] = None,
+                   repeat: int = 3) -> List[Dict]:
+    """Прогон выбранных замеров на каждом размере ряда"""
+    results = []
+    for name in select(names):
+        setup, max_size = BENCHMARKS[name]
+        # Ограниченные замеры на больших размерах повторяли бы один и тот же прогон
+        bars_list = sorted({min(size, max_size) if max_size else size for size in sizes})
+        for bars in bars_list:
+            try:
+                func = setup(bars)
+            except ImportError as e:
+                logger.warning(f"Benchmark {name} skipped: {e}")
+                break
+            result = {'name': name, 'bars': bars, **measure(func, repeat)}
+            logger.info(f"{name} [{bars} bars]: best {result['best'] * 1000:.3f} ms, "
+                        f"median {result['median'] * 1000:.3f} ms")
+            results.append(result)
+    return results
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """Замеры, которые медленнее базовой линии больше чем на tolerance
+    Сравнивается лучшее время: оно меньше всего зависит от шума машины.
+    """
+    reference = {(r['name'], r['bars']): r['best'] for r in baseline}
+    regressions = []
+    for result in results:
+        expected = reference.get((result['name'], result['bars']))
+        if expected and result['best'] > expected * (1 + tolerance):
+            regressions.append({
+                'name': result['name'],
+                'bars': result['bars'],
+                'baseline': expected,
+                'current': result['best'],
+                'ratio': result['best'] / expected
+            })
+    return regressions
+
+def to_report(results: List[Dict]) -> Dict:
+    """Результаты с описанием окружения для сохранения в JSON"""
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'results': results
+    }
+
+def load_baseline(path: str, machine: Optional[str] = None) -> List[Dict]:
+    """Результаты базовой линии, снятой на машине machine
+    Время замеров имеет смысл только на той же машине, поэтому линия
+    с другой машины не используется и пересоздается через --update-baseline.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        report = json.load(f)
+    if machine is not None and report.get('machine') != machine:
+        logger.warning(f"Baseline {path} was recorded on {report.get('machine')}, "
+                       f"not on {machine}; run with --update-baseline to record it here")
+        return []
+    return report['results']
+
+def save_report(report: Dict, path: str):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Замеры производительности стратегий, бэктестера и ML')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='размеры рядов в свечах')
+    parser.add_argument('--only', nargs='+', help='префиксы имен замеров, например strategy. ml.')
+    parser.add_argument('--repeat', type=int, default=3, help='число повторов каждого замера')
+    parser.add_argument('--output', help='файл JSON для результатов')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='файл JSON базовой линии')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='допустимое замедление, доля')
+    parser.add_argument('--update-baseline', action='store_true', help='записать результаты как базовую линию')
+    parser.add_argument('--list', action='store_true', help='показать доступные замеры')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name in BENCHMARKS:
+            print(name)
+        return 0
+
+    report = to_report(run_benchmarks(args.sizes, args.only, args.repeat))
+    if args.output:
+        save_report(report, args.output)
+
+    if args.update_baseline:
+        # Замеры, не попавшие в прогон, остаются в базовой линии
+        current = {(r['name'], r['bars']) for r in report['results']}
+        kept = [r for r in load_baseline(args.baseline, report['machine']) if (r['name'], r['bars']) not in current]
+        save_report({**report, 'results': kept + report['results']}, args.baseline)
+        logger.info(f"Baseline updated: {args.baseline}")
+        return 0
+
+    regressions = compare(report['results'], load_baseline(args.baseline, report['machine']), args.tolerance)
+    for r in regressions:
+        logger.warning(f"Regression {r['name']} [{r['bars']} bars]: {r['baseline'] * 1000:.3f} ms -> "
+                       f"{r['current'] * 1000:.3f} ms (x{r['ratio']:.2f})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
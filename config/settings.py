@@ -11,20 +11,41 @@ class Settings:
     # Telegram
     TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
     TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+    TELEGRAM_MIN_INTERVAL = float(os.getenv("TELEGRAM_MIN_INTERVAL", "1.0"))  # секунд между сообщениями
     
     # Trading
     SYMBOL = os.getenv("SYMBOL", "BTCUSDT")
+    # Список символов через запятую для одновременной торговли
+    SYMBOLS = [s.strip().upper() for s in os.getenv("SYMBOLS", SYMBOL).split(",") if s.strip()]
     TRADE_QUANTITY = float(os.getenv("TRADE_QUANTITY", "0.001"))
     INTERVAL = os.getenv("INTERVAL", "15m")
     STOP_LOSS_PERCENT = float(os.getenv("STOP_LOSS_PERCENT", "2.0"))
     TAKE_PROFIT_PERCENT = float(os.getenv("TAKE_PROFIT_PERCENT", "5.0"))
     
+    # Market data: polling - опрос REST раз в минуту, stream - WebSocket поток свечей
+    MARKET_DATA_MODE = os.getenv("MARKET_DATA_MODE", "polling")
+    BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443")
+    MAX_REQUEST_WEIGHT = int(os.getenv("MAX_REQUEST_WEIGHT", "1200"))  # вес запросов в минуту
+    MAX_CONCURRENT_SYMBOLS = int(os.getenv("MAX_CONCURRENT_SYMBOLS", "32"))
+    # threaded - бот в потоке веб-сервера, multiprocess - бот, ML и веб в отдельных процессах
+    RUNTIME_MODE = os.getenv("RUNTIME_MODE", "threaded")
+    # Поток данных аккаунта: балансы и ордера в памяти вместо запросов REST
+    USER_DATA_STREAM = os.getenv("USER_DATA_STREAM", "true").lower() == "true"
+    ACCOUNT_RECONCILE_INTERVAL = float(os.getenv("ACCOUNT_RECONCILE_INTERVAL", "900"))  # секунд
+    # ML-модель: lstm - нейросеть Keras, ensemble - ансамбль sklearn над признаками
+    ML_MODEL = os.getenv("ML_MODEL", "lstm")
+    
     # Database
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./trading_bot.db")
+    CANDLE_STORE_PATH = os.getenv("CANDLE_STORE_PATH", "data/candles.db")
+    FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", "data/features")
     
     # Web
     WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
     WEB_PORT = int(os.getenv("WEB_PORT", "8000"))
+    API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "2.0"))  # секунд
+    # Метрики Prometheus на /metrics; выключенные замеры почти ничего не стоят
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
     
     # Risk Management
     MAX_DAILY_LOSS = float(os.getenv("MAX_DAILY_LOSS", "100"))
@@ -1,24 +1,66 @@
+import asyncio
 import time
 from strategies.macd_strategy import MACDStrategy  
 from strategies.bollinger_strategy import BollingerBandsStrategy 
 from exchanges.binance_client import BinanceClient
-from notifications.telegram_notifier import TelegramNotifier
+from notifications.telegram_notifier import TelegramNotifier, PRIORITY_HIGH, PRIORITY_LOW
 from strategies.rsi_strategy import RSIStrategy
 from config.settings import settings
 from utils.logger import logger
-from strategies.ml_strategy import MLStrategy
-from ml.prediction.predictor import PricePredictor
+from ml.strategies.ml_strategy import MLStrategy
+from ml.prediction.registry import predictor_registry
+from utils.helpers import memory_usage_mb
+from utils.instrumentation import metrics, errors
+from core.streaming_signals import StreamingSignals
+from core.scheduler import MultiSymbolScheduler
+from exchanges.execution import ExecutionEngine
+from database.writer import WriteBehindBuffer
+from database.database import SessionLocal
+from core.risk_manager import RiskManager
+from functools import partial
+from datetime import datetime
+from core.event_hub import event_hub
+
+TICK_LATENCY = metrics.histogram('bot_tick_duration_seconds', 'Full strategy run duration for one candle')
+ANALYZE_LATENCY = metrics.histogram('strategy_analyze_duration_seconds', 'Strategy analyze duration', ['strategy'])
+COMBINE_LATENCY = metrics.histogram('combine_signals_duration_seconds', 'Signal combination duration')
+STARTUP_TIME = metrics.gauge('bot_startup_seconds', 'Trading bot initialization time')
+
+def fill_price(order, default=None):
+    """Средняя цена исполнения ордера из ответа биржи или цена сигнала"""
+    if order:
+        executed = float(order.get('executedQty') or 0)
+        quote = float(order.get('cummulativeQuoteQty') or 0)
+        if executed > 0 and quote > 0:
+            return quote / executed
+    return default
+
+def filled_quantity(result, requested):
+    """Исполненное количество ордера; тестовый ордер считается исполненным целиком"""
+    if result['status'] == 'TEST':
+        return requested
+    order = result.get('order') or {}
+    return float(order.get('executedQty') or 0)
 
 class TradingBot:
     def __init__(self):
+        started = time.perf_counter()
         self.binance = BinanceClient()
+        if settings.USER_DATA_STREAM:
+            self.binance.start_account_stream()
         self.notifier = TelegramNotifier()
         self.strategy = RSIStrategy()
         self.symbol = settings.SYMBOL
+        self.symbols = settings.SYMBOLS
         self.quantity = settings.TRADE_QUANTITY
+        self.execution = ExecutionEngine(self.binance)
+        self.writer = WriteBehindBuffer()
+        self.risk_manager = RiskManager(SessionLocal())
+        self.binance.account.listeners.append(self._on_account_event)
         self.interval = settings.BINANCE_INTERVAL
-        self.ml_predictor = PricePredictor()
-        self.ml_strategy = MLStrategy()
+        # Модель загружается в фоне и делит клиент биржи с ботом
+        predictor_registry.load_async(settings.ML_MODEL, self.symbol, binance=self.binance)
+        self.ml_strategy = MLStrategy(predictor_registry, settings.ML_MODEL)
 
         self.strategies = {
             'RSI': self.strategy,
@@ -26,101 +68,197 @@ class TradingBot:
             'Bollinger': BollingerBandsStrategy(), 
             'ML': self.ml_strategy
         }
+        # Правила в живом режиме считаются потоково: по символу своя копия стратегии
+        self.streaming = StreamingSignals({
+            'RSI': RSIStrategy,
+            'MACD': MACDStrategy,
+            'Bollinger': BollingerBandsStrategy
+        })
         
-        logger.info("Trading Bot initialized")
+        self.startup_time = time.perf_counter() - started
+        STARTUP_TIME.set(self.startup_time)
+        logger.info(f"Trading Bot initialized in {self.startup_time:.2f}s, RSS {memory_usage_mb():.1f} MB")
         self.notifier.send_message("🟢 Бот запущен!")
     
-    def get_market_data(self):
+    def get_market_data(self, symbol=None):
         """Получение рыночных данных"""
         return self.binance.get_klines(
-            symbol=self.symbol,
+            symbol=symbol or self.symbol,
             interval=self.interval,
             limit=100
         )
     
-    def check_position(self):
+    def check_position(self, symbol=None):
         """Проверка наличия позиции"""
-        asset = self.symbol.replace('USDT', '')
+        symbol = symbol or self.symbol
+        asset = symbol.replace('USDT', '')
         balance = self.binance.get_balance(asset)
-        return balance > 0.0001
+        return balance >= self.binance.get_min_quantity(symbol)
     
-    def execute_trade(self, signal: str):
+    def execute_trade(self, signal: str, symbol=None, signal_time=None, price=None, strategy=None):
         """Выполнение сделки"""
-        if signal == 'BUY':
-            result = self.binance.create_test_order(
-                symbol=self.symbol,
-                side='BUY',
-                quantity=self.quantity
-            )
-            if result:
-                message = f"✅ ТЕСТОВАЯ ПОКУПКА\nСимвол: {self.symbol}\nКоличество: {self.quantity}"
-                self.notifier.send_message(message)
-                logger.info(message)
-        elif signal == 'SELL':
-            result = self.binance.create_test_order(
-                symbol=self.symbol,
-                side='SELL',
-                quantity=self.quantity
+        symbol = symbol or self.symbol
+        if signal not in ('BUY', 'SELL'):
+            return None
+        if self.risk_manager.should_stop_trading():
+            logger.warning(f"Daily loss limit reached, {signal} {symbol} skipped")
+            return None
+        future = self.execution.submit(symbol, signal, self.quantity, signal_time=signal_time, test=True)
+        future.add_done_callback(partial(self._on_order_done, price=price, strategy=strategy))
+        return future
+    
+    def _on_order_done(self, future, price=None, strategy=None):
+        """Уведомление и запись результата ордера"""
+        result = future.result()
+        failed = result['status'] in ('FAILED', 'UNKNOWN')
+        quantity = 0.0 if failed else filled_quantity(result, self.quantity)
+        price = fill_price(result.get('order'), price)
+        profit = None
+        if quantity > 0:
+            # Реализованная прибыль закрывающей сделки идет в дневной лимит убытков
+            profit = self.risk_manager.record_fill(result['symbol'], result['side'], quantity, price=price)
+        if price is not None:
+            # Ордер без исполнения (отменен, истек) пишется со своим статусом и не влияет на риск
+            self.writer.add_trade(
+                symbol=result['symbol'],
+                side=result['side'],
+                quantity=quantity or self.quantity,
+                price=price,
+                status='executed' if quantity > 0 else result['status'].lower(),
+                order_id=result['client_order_id'],
+                strategy=strategy,
+                profit=profit
             )
-            if result:
-                message = f"✅ ТЕСТОВАЯ ПРОДАЖА\nСимвол: {self.symbol}\nКоличество: {self.quantity}"
-                self.notifier.send_message(message)
-                logger.info(message)
+        if result['status'] == 'UNKNOWN':
+            # Ордер мог исполниться: позицию нужно проверить вручную
+            self.notifier.send_message(f"⚠️ Статус ордера {result['client_order_id']} по {result['symbol']} неизвестен",
+                                       priority=PRIORITY_HIGH)
+        if quantity <= 0:
+            if not failed:
+                logger.warning(f"Order {result['client_order_id']} {result['status']} without fills")
+            return
+        event_hub.publish('trade', {
+            'symbol': result['symbol'],
+            'side': result['side'],
+            'quantity': quantity,
+            'price': price,
+            'order_id': result['client_order_id'],
+            'timestamp': datetime.utcnow()
+        })
+        event_hub.publish('pnl', self.risk_manager.summary())
+        action = 'ПОКУПКА' if result['side'] == 'BUY' else 'ПРОДАЖА'
+        message = f"✅ ТЕСТОВАЯ {action}\nСимвол: {result['symbol']}\nКоличество: {quantity}"
+        self.notifier.send_message(message, priority=PRIORITY_HIGH)
+        logger.info(message)
+    
+    def _on_account_event(self, event: dict):
+        """Запись снимков баланса из потока данных аккаунта"""
+        if event.get('e') != 'outboundAccountPosition':
+            return
+        for balance in event['B']:
+            self.writer.add_balance(balance['a'], float(balance['f']), float(balance['l']))
     
-    def run_strategy(self):
+    def analyze_strategy(self, name, symbol, data):
+        """Сигнал стратегии; правила обрабатывают только новые свечи окна"""
+        if name in self.streaming.factories:
+            return self.streaming.analyze(name, symbol, data)
+        return self.strategies[name].analyze(data)
+    
+    @TICK_LATENCY.timed()
+    def run_strategy(self, data=None, symbol=None):
         """Запуск стратегии"""
+        symbol = symbol or self.symbol
         try:
-            # Получение данных
-            data = self.get_market_data()
+            # Получение данных (в потоковом режиме окно свечей передается готовым)
+            if data is None:
+                data = self.get_market_data(symbol)
             if data is None or data.empty:
                 return
             
             # Анализ стратегии
-            analysis = self.strategy.analyze(data)
+            with ANALYZE_LATENCY.time(strategy='RSI'):
+                analysis = self.analyze_strategy('RSI', symbol, data)
             signal = analysis['signal']
+            signal_time = time.monotonic()
             confidence = analysis['confidence']
             details = analysis['details']
+            price = float(data['close'].iloc[-1])
+            executed = False
+            last = data.iloc[-1]
+            event_hub.publish('candle', {
+                'symbol': symbol,
+                'open_time': last['timestamp'],
+                'open': float(last['open']),
+                'high': float(last['high']),
+                'low': float(last['low']),
+                'close': price,
+                'volume': float(last['volume'])
+            })
             
             # Отправка уведомления о анализе
             message = (
-                f"📊 Анализ {self.symbol}\n"
+                f"📊 Анализ {symbol}\n"
                 f"Цена: ${details.get('price', 0)}\n"
                 f"RSI: {details.get('rsi', 0)}\n"
                 f"Сигнал: {signal} (уверенность: {confidence*100:.0f}%)"
             )
-            self.notifier.send_message(message)
+            self.notifier.send_message(message, priority=PRIORITY_LOW)
             
             # Выполнение сделки (только для тестирования)
             if signal in ['BUY', 'SELL']:
-                has_position = self.check_position()
+                has_position = self.check_position(symbol)
                 
                 # Логика предотвращения дублирования сделок
                 if (signal == 'BUY' and not has_position) or (signal == 'SELL' and has_position):
-                    self.execute_trade(signal)
+                    executed = self.execute_trade(signal, symbol, signal_time, price, strategy='RSI') is not None
                 else:
                     logger.info(f"Сигнал {signal} проигнорирован: позиция уже открыта/закрыта")
 
-            # Анализ всех стратегий
-            signals = {}
-            for name, strategy in self.strategies.items():
-                analysis = strategy.analyze(data)
+            # Анализ всех стратегий (RSI уже проанализирован выше)
+            signals = {'RSI': analysis}
+            for name in self.strategies:
+                if name in signals:
+                    continue
+                with ANALYZE_LATENCY.time(strategy=name):
+                    analysis = self.analyze_strategy(name, symbol, data)
                 signals[name] = analysis
                 
                 # Отправка уведомления о ML предсказании
                 if name == 'ML' and analysis['signal'] != 'HOLD':
                     ml_message = (
-                        f"🤖 ML Предсказание для {self.symbol}\n"
+                        f"🤖 ML Предсказание для {symbol}\n"
                         f"Текущая цена: ${analysis['details']['current_price']}\n"
                         f"Прогноз: ${analysis['details']['predicted_price']}\n"
                         f"Изменение: {analysis['details']['change_percent']}%\n"
                         f"Сигнал: {analysis['signal']} ({analysis['confidence']*100:.0f}% уверенность)"
                     )
-                    self.notifier.send_message(ml_message)
+                    self.notifier.send_message(ml_message, priority=PRIORITY_LOW)
             
             # Комбинированный сигнал 
             combined_signal = self.combine_signals(signals)
             
+            # Сигналы пишутся в базу отложенно, пачками, и сразу рассылаются клиентам
+            now = datetime.utcnow()
+            for name, result in signals.items():
+                event_hub.publish('signal', {
+                    'symbol': symbol,
+                    'strategy': name,
+                    'signal_type': result['signal'],
+                    'confidence': result['confidence'],
+                    'price': price,
+                    'timestamp': now
+                })
+                self.writer.add_signal(
+                    symbol=symbol,
+                    strategy=name,
+                    signal_type=result['signal'],
+                    confidence=result['confidence'],
+                    price=price,
+                    executed=executed and name == 'RSI'
+                )
+            
         except Exception as e:
+            errors.inc(component='strategy')
             error_msg = f"❌ Ошибка в стратегии: {e}"
             logger.error(error_msg)
             self.notifier.send_message(error_msg)
@@ -128,6 +266,13 @@ class TradingBot:
     def start(self):
         """Запуск бота"""
         logger.info("Starting trading bot...")
+        if settings.MARKET_DATA_MODE == 'stream':
+            self.start_streaming()
+            return
+        if len(self.symbols) > 1:
+            self.start_multi_symbol()
+            return
+        
         while True:
             try:
                 self.run_strategy()
@@ -135,13 +280,48 @@ class TradingBot:
             except KeyboardInterrupt:
                 logger.info("Bot stopped by user")
                 self.notifier.send_message("🔴 Бот остановлен!")
+                self.execution.close()
+                self.notifier.close()
+                self.writer.close()
                 break
             except Exception as e:
+                errors.inc(component='bot')
                 error_msg = f"❌ Критическая ошибка: {e}"
                 logger.error(error_msg)
                 self.notifier.send_message(error_msg)
                 time.sleep(60)
 
+    def start_streaming(self):
+        """Запуск бота на WebSocket потоке: анализ при закрытии каждой свечи"""
+        stream = self.binance.stream_klines(
+            symbols=self.symbols,
+            interval=self.interval,
+            on_candle_close=lambda symbol, data: self.run_strategy(data, symbol),
+            limit=100
+        )
+        try:
+            asyncio.run(stream.run())
+        except KeyboardInterrupt:
+            stream.stop()
+            logger.info("Bot stopped by user")
+            self.notifier.send_message("🔴 Бот остановлен!")
+            self.execution.close()
+            self.notifier.close()
+            self.writer.close()
+
+    def start_multi_symbol(self):
+        """Запуск асинхронного цикла по всем символам из SYMBOLS"""
+        scheduler = MultiSymbolScheduler(self, self.symbols)
+        try:
+            asyncio.run(scheduler.run_forever())
+        except KeyboardInterrupt:
+            logger.info("Bot stopped by user")
+            self.notifier.send_message("🔴 Бот остановлен!")
+            self.execution.close()
+            self.notifier.close()
+            self.writer.close()
+
+    @COMBINE_LATENCY.timed()
     def combine_signals(self, signals):
         """Комбинирование сигналов от разных стратегий"""
         buy_votes = 0
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List
+from utils.logger import logger
+
+# Сколько последних сигналов и сделок отдается новому подписчику
+SNAPSHOT_SIZE = 50
+
+class Subscriber:
+    """Подписчик хаба: очередь сообщений в event loop веб-сервера"""
+    def __init__(self, loop, max_queue: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def _put(self, message):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Отставший клиент отключается и при переподключении получит снимок
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        """Следующее сообщение или None, если подписка закрыта"""
+        return await self.queue.get()
+
+class EventHub:
+    """Рассылка событий бота веб-клиентам
+    Событие сериализуется один раз и раздается всем подписчикам. Новый
+    подписчик сначала получает снимок текущего состояния, затем события
+    начиная со следующего номера, без пропусков и повторов.
+    """
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self.seq = 0
+        self.signals = deque(maxlen=SNAPSHOT_SIZE)
+        self.trades = deque(maxlen=SNAPSHOT_SIZE)
+        self.candles: Dict[str, dict] = {}
+        self.pnl = None
+        self._subscribers: List[Subscriber] = []
+        # Приемники (тип, данные, JSON) вызываются под блокировкой, в порядке seq
+        self.sinks: List[Callable] = []
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, data: dict):
+        """Публикация события из любого потока"""
+        with self._lock:
+            self.seq += 1
+            message = json.dumps({'seq': self.seq, 'type': event_type, 'data': data},
+                                 default=_json_default, separators=(',', ':'))
+            self._remember(event_type, data)
+            subscribers = list(self._subscribers)
+            for sink in self.sinks:
+                try:
+                    sink(event_type, data, message)
+                except Exception as e:
+                    logger.error(f"Event sink failed for {event_type}: {e}")
+
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber._put, message)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                self.unsubscribe(subscriber)
+
+    def subscribe(self):
+        """Подписка из event loop веб-сервера: (подписчик, снимок)"""
+        subscriber = Subscriber(asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            snapshot = json.dumps({'seq': self.seq, 'type': 'snapshot', 'data': {
+                'signals': list(self.signals),
+                'trades': list(self.trades),
+                'candles': self.candles,
+                'pnl': self.pnl
+            }}, default=_json_default, separators=(',', ':'))
+            self._subscribers.append(subscriber)
+        return subscriber, snapshot
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def _remember(self, event_type: str, data: dict):
+        if event_type == 'signal':
+            self.signals.append(data)
+        elif event_type == 'trade':
+            self.trades.append(data)
+        elif event_type == 'candle':
+            self.candles[data['symbol']] = data
+        elif event_type == 'pnl':
+            self.pnl = data
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+# Общий хаб процесса: бот публикует, веб-сервер раздает
+event_hub = EventHub()
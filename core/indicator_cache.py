@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import pandas as pd
+
+class IndicatorCache:
+    """Кэш индикаторов, общий для всех стратегий
+    Ключ: (символ, интервал, время закрытия последней свечи, цена закрытия,
+    длина окна, индикаторы, параметры). Цена закрытия входит в ключ, потому
+    что незакрытая свеча меняется при том же времени закрытия.
+    """
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, strategy, data: pd.DataFrame) -> Optional[tuple]:
+        """Ключ кэша или None, если данные нельзя однозначно определить"""
+        if data.empty:
+            return None
+
+        time_column = 'close_time' if 'close_time' in data.columns else 'timestamp'
+        if time_column not in data.columns:
+            return None
+
+        return (
+            data.attrs.get('symbol'),
+            data.attrs.get('interval'),
+            data[time_column].iloc[-1],
+            float(data['close'].iloc[-1]),
+            len(data),
+            tuple(strategy.get_required_indicators()),
+            strategy.get_indicator_params()
+        )
+
+    def get(self, strategy, data: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Индикаторы стратегии: из кэша или с расчетом и сохранением"""
+        key = self.make_key(strategy, data)
+        if key is None:
+            return strategy.calculate_indicators(data)
+
+        with self._lock:
+            indicators = self._cache.get(key)
+            if indicators is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return indicators
+            self.misses += 1
+
+        # Расчет вне блокировки, чтобы символы из разных потоков не ждали друг друга
+        indicators = strategy.calculate_indicators(data)
+        with self._lock:
+            self._cache[key] = indicators
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return indicators
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        """Счетчики попаданий и промахов"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._cache)
+        }
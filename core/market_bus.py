@@ -0,0 +1,238 @@
+import json
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+import numpy as np
+from utils.logger import logger
+
+# Форматы записей шины
+CANDLE_DTYPE = np.dtype([
+    ('symbol', 'S20'), ('open_time', '<i8'), ('open', '<f8'), ('high', '<f8'),
+    ('low', '<f8'), ('close', '<f8'), ('volume', '<f8')
+])
+PREDICTION_DTYPE = np.dtype([
+    ('symbol', 'S20'), ('signal', 'S12'), ('confidence', '<f8'), ('predicted_price', '<f8'),
+    ('current_price', '<f8'), ('change_percent', '<f8'), ('timestamp', '<i8'), ('open_time', '<i8')
+])
+EVENT_DTYPE = np.dtype([('payload', 'S4096')])
+# Метрики процесса в текстовом формате Prometheus
+METRICS_DTYPE = np.dtype([('process', 'S20'), ('payload', 'S131072')])
+
+# Размеры колец в записях
+BUS_CAPACITIES = {'candles': 4096, 'predictions': 1024, 'events': 1024, 'metrics': 16}
+
+# Заголовок кольца: номер следующей записи и емкость
+_HEADER = np.dtype([('seq', '<i8'), ('capacity', '<i8')])
+
+class SharedRingBuffer:
+    """Кольцо записей фиксированного формата в разделяемой памяти
+    Пишет один процесс, читают любые: каждый читатель хранит свою позицию
+    (номер записи) и получает копию новых записей. Номер записи растет
+    монотонно, поэтому отставший больше чем на емкость читатель теряет
+    только перезаписанные записи. Самая старая ячейка может в этот момент
+    переписываться, поэтому читателю доступны capacity - 1 последних записей.
+    """
+    def __init__(self, name: str, dtype: np.dtype, capacity: Optional[int] = None, create: bool = False):
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        if create:
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True, size=_HEADER.itemsize + capacity * self.dtype.itemsize
+            )
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._header = np.ndarray((), dtype=_HEADER, buffer=self.shm.buf)
+        if create:
+            self._header['seq'] = 0
+            self._header['capacity'] = capacity
+        self.capacity = int(self._header['capacity'])
+        self._records = np.ndarray((self.capacity,), dtype=self.dtype, buffer=self.shm.buf,
+                                   offset=_HEADER.itemsize)
+
+    @property
+    def seq(self) -> int:
+        """Номер следующей записи"""
+        return int(self._header['seq'])
+
+    def append(self, record: tuple) -> int:
+        """Запись одной строки; номер публикуется после данных"""
+        seq = self.seq
+        self._records[seq % self.capacity] = record
+        self._header['seq'] = seq + 1
+        return seq
+
+    def read(self, position: int, limit: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """Записи начиная с position: (копия записей, следующая позиция)"""
+        seq = self.seq
+        start = max(position, seq - self.capacity + 1)
+        if limit is not None:
+            seq = min(seq, start + limit)
+        if start >= seq:
+            return self._records[:0].copy(), max(position, seq)
+
+        slots = np.arange(start, seq) % self.capacity
+        records = self._records[slots]
+        # Записи, перезаписанные писателем во время копирования, отбрасываются
+        # вместе с ячейкой, которую писатель может заполнять прямо сейчас
+        overwritten = self.seq + 1 - self.capacity - start
+        if overwritten > 0:
+            records = records[overwritten:]
+        if start > position:
+            logger.warning(f"Bus reader of {self.name} lagged, skipped {start - position} records")
+        return records, seq
+
+    def close(self):
+        self._header = None
+        self._records = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+class MarketDataBus:
+    """Шина между процессами бота, инференса и веб-сервера
+    candles - закрытые свечи от торгового процесса, predictions - прогнозы
+    ML-процесса, events - события EventHub в JSON для веб-сервера,
+    metrics - метрики дочерних процессов для /metrics веб-сервера.
+    """
+    def __init__(self, prefix: str, create: bool = False, capacities: Optional[Dict[str, int]] = None):
+        self.prefix = prefix
+        self.owner = create
+        capacities = {**BUS_CAPACITIES, **(capacities or {})}
+        dtypes = {'candles': CANDLE_DTYPE, 'predictions': PREDICTION_DTYPE, 'events': EVENT_DTYPE,
+                  'metrics': METRICS_DTYPE}
+        self.rings = {
+            name: SharedRingBuffer(f"{prefix}_{name}", dtype, capacities[name], create=create)
+            for name, dtype in dtypes.items()
+        }
+        self.candles = self.rings['candles']
+        self.predictions = self.rings['predictions']
+        self.events = self.rings['events']
+        self.metrics = self.rings['metrics']
+
+    @classmethod
+    def create(cls, prefix: str, capacities: Optional[Dict[str, int]] = None) -> 'MarketDataBus':
+        return cls(prefix, create=True, capacities=capacities)
+
+    @classmethod
+    def attach(cls, prefix: str) -> 'MarketDataBus':
+        return cls(prefix)
+
+    def publish_candle(self, symbol: str, open_time: int, open_: float, high: float, low: float,
+                       close: float, volume: float):
+        self.candles.append((symbol.encode(), open_time, open_, high, low, close, volume))
+
+    def publish_prediction(self, symbol: str, result: dict, open_time: int):
+        """Прогноз по свече open_time"""
+        self.predictions.append((
+            symbol.encode(), result['signal'].encode(), result['confidence'], result['predicted_price'],
+            result['current_price'], result['change_percent'], int(time.time() * 1000), open_time
+        ))
+
+    def publish_event(self, event_type: str, data: dict, message: str):
+        """Приемник EventHub: событие для веб-процесса, свеча - еще и в кольцо свечей"""
+        if event_type == 'candle' and 'open' in data:
+            self.publish_candle(data['symbol'], _to_ms(data['open_time']), data['open'], data['high'],
+                                data['low'], data['close'], data['volume'])
+        payload = message.encode()
+        if len(payload) > EVENT_DTYPE['payload'].itemsize:
+            logger.warning(f"Bus event {event_type} is too large ({len(payload)} bytes), dropped")
+            return
+        self.events.append((payload,))
+
+    def read_events(self, position: int):
+        """События из кольца: (список (тип, данные), следующая позиция)"""
+        records, position = self.events.read(position)
+        events = []
+        for payload in records['payload']:
+            # Испорченная запись пропускается, остальные события доставляются
+            try:
+                message = json.loads(payload)
+                events.append((message['type'], message['data']))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Malformed bus event skipped: {e}")
+        return events, position
+
+    def publish_metrics(self, process: str, text: str):
+        """Снимок метрик процесса для веб-сервера"""
+        payload = text.encode()
+        if len(payload) > METRICS_DTYPE['payload'].itemsize:
+            logger.warning(f"Metrics of {process} are too large ({len(payload)} bytes), dropped")
+            return
+        self.metrics.append((process.encode(), payload))
+
+    def read_metrics(self, position: int):
+        """Последние снимки метрик: ({процесс: текст}, следующая позиция)"""
+        records, position = self.metrics.read(position)
+        return {record['process'].decode(): record['payload'].decode() for record in records}, position
+
+    def close(self):
+        for ring in self.rings.values():
+            ring.close()
+        if self.owner:
+            for ring in self.rings.values():
+                ring.unlink()
+
+class BusPredictor:
+    """Предиктор торгового процесса: последние прогнозы ML-процесса из шины
+    Подставляется в реестр предикторов вместо PricePredictor, поэтому
+    TensorFlow в торговом процессе не загружается. Прогноз принимается
+    только для последней свечи символа, опубликованной в шину: прогноз
+    прошлой свечи ждется до wait секунд, затем возвращается HOLD.
+    """
+    def __init__(self, bus: MarketDataBus, max_age: float = 3600, wait: float = 0.5,
+                 poll_interval: float = 0.02, **kwargs):
+        self.bus = bus
+        self.max_age = max_age
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.latest: Dict[str, np.void] = {}
+        # Время открытия последней свечи каждого символа в шине
+        self.candle_times: Dict[str, int] = {}
+        self._position = 0
+        self._candle_position = 0
+
+    def poll(self):
+        candles, self._candle_position = self.bus.candles.read(self._candle_position)
+        for record in candles:
+            self.candle_times[record['symbol'].decode()] = int(record['open_time'])
+        records, self._position = self.bus.predictions.read(self._position)
+        for record in records:
+            self.latest[record['symbol'].decode()] = record
+
+    def get_trend_signal(self, symbol, current_price):
+        """Прогноз по последней свече символа или HOLD, если его нет или он устарел"""
+        self.poll()
+        expected = self.candle_times.get(symbol)
+        deadline = time.monotonic() + self.wait
+        while expected is not None and not self._matches(symbol, expected) and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            self.poll()
+
+        record = self.latest.get(symbol)
+        if (record is None or time.time() * 1000 - record['timestamp'] > self.max_age * 1000
+                or (expected is not None and not self._matches(symbol, expected))):
+            return {
+                'signal': 'HOLD',
+                'confidence': 0.0,
+                'predicted_price': current_price,
+                'current_price': current_price,
+                'change_percent': 0.0
+            }
+        return {
+            'signal': record['signal'].decode(),
+            'confidence': float(record['confidence']),
+            'predicted_price': float(record['predicted_price']),
+            'current_price': round(current_price, 2),
+            'change_percent': float(record['change_percent'])
+        }
+
+    def _matches(self, symbol: str, open_time: int) -> bool:
+        record = self.latest.get(symbol)
+        return record is not None and int(record['open_time']) == open_time
+
+def _to_ms(value) -> int:
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    # datetime, pandas.Timestamp и numpy.datetime64 без часового пояса считаются UTC
+    return int(np.datetime64(value, 'ms').astype(np.int64))
@@ -1,28 +1,134 @@
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 from database.models import Trade
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
+from config.settings import settings
 
 class RiskManager:
     def __init__(self, db_session: Session):
         self.db = db_session
-        self.daily_loss_limit = 100  # USD
+        self.daily_loss_limit = settings.MAX_DAILY_LOSS  # USD
         self.max_position_size = 0.01  # BTC
         self.stop_loss_percent = 2.0
         self.take_profit_percent = 5.0
+        
+        # Счетчики за текущие сутки UTC и открытые позиции по символам
+        self.day = None
+        self.daily_loss = 0.0
+        self.daily_pnl = 0.0
+        self.symbol_pnl: Dict[str, float] = {}
+        self.exposure: Dict[str, float] = {}
+        # Средняя цена входа открытой позиции по символу
+        self.entry_price: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.rebuild()
     
-    def check_daily_loss_limit(self) -> bool:
-        """Проверка дневного лимита убытков"""
-        today = datetime.utcnow().date()
-        start_of_day = datetime.combine(today, datetime.min.time())
+    def rebuild(self):
+        """Восстановление счетчиков из базы одним агрегирующим запросом"""
+        now = datetime.utcnow()
+        start_of_day = datetime.combine(now.date(), datetime.min.time())
+        today = Trade.timestamp >= start_of_day
         
-        daily_trades = self.db.query(Trade).filter(
-            Trade.timestamp >= start_of_day,
-            Trade.profit < 0
-        ).all()
+        rows = self.db.query(
+            Trade.symbol,
+            func.sum(case((today & (Trade.profit < 0), -Trade.profit), else_=0.0)),
+            func.sum(case((today, func.coalesce(Trade.profit, 0.0)), else_=0.0)),
+            func.sum(case((Trade.side == 'BUY', Trade.quantity), else_=-Trade.quantity))
+        ).filter(Trade.status == 'executed').group_by(Trade.symbol).all()
+        
+        exposure = {row[0]: row[3] or 0.0 for row in rows}
+        entry_price = {
+            symbol: self._open_entry_price(symbol, position)
+            for symbol, position in exposure.items() if abs(position) > 1e-12
+        }
+        
+        with self._lock:
+            self.day = now.date()
+            self.daily_loss = sum(row[1] or 0.0 for row in rows)
+            self.daily_pnl = sum(row[2] or 0.0 for row in rows)
+            self.symbol_pnl = {row[0]: row[2] or 0.0 for row in rows}
+            self.exposure = exposure
+            self.entry_price = {symbol: price for symbol, price in entry_price.items() if price is not None}
+    
+    def _open_entry_price(self, symbol: str, position: float) -> Optional[float]:
+        """Цена входа открытой позиции по последним сделкам в ее сторону"""
+        side = 'BUY' if position > 0 else 'SELL'
+        trades = self.db.query(Trade.quantity, Trade.price).filter(
+            Trade.symbol == symbol, Trade.side == side, Trade.status == 'executed'
+        ).order_by(Trade.timestamp.desc()).yield_per(100)
         
-        total_loss = sum(abs(trade.profit or 0) for trade in daily_trades)
-        return total_loss < self.daily_loss_limit
+        remaining, cost = abs(position), 0.0
+        for quantity, price in trades:
+            used = min(quantity, remaining)
+            cost += used * price
+            remaining -= used
+            if remaining <= 1e-12:
+                return cost / abs(position)
+        return None
+    
+    def record_fill(self, symbol: str, side: str, quantity: float, profit: float = None, timestamp: datetime = None,
+                    price: float = None) -> Optional[float]:
+        """Учет исполненной сделки в счетчиках
+        Без profit реализованная прибыль закрывающей сделки считается по цене
+        исполнения price и средней цене входа. Возвращает учтенную прибыль.
+        """
+        timestamp = timestamp or datetime.utcnow()
+        signed = quantity if side == 'BUY' else -quantity
+        with self._lock:
+            self._roll_over(timestamp)
+            position = self.exposure.get(symbol, 0.0)
+            entry = self.entry_price.get(symbol)
+            
+            closed = min(abs(signed), abs(position)) if position * signed < 0 else 0.0
+            if profit is None and closed and price is not None and entry is not None:
+                # Лонг закрывается продажей, шорт - покупкой
+                profit = (price - entry) * closed * (1 if position > 0 else -1)
+            
+            new_position = position + signed
+            if abs(new_position) <= 1e-12:
+                self.entry_price.pop(symbol, None)
+            elif price is not None and (position * signed > 0 or entry is None):
+                # Добавление к позиции: средняя цена входа
+                self.entry_price[symbol] = (abs(position) * (entry or price) + abs(signed) * price) / (abs(position) + abs(signed))
+            elif price is not None and position * new_position < 0:
+                # Переворот позиции: остаток открыт по цене сделки
+                self.entry_price[symbol] = price
+            self.exposure[symbol] = new_position
+            
+            # Запоздавшее исполнение за прошлые сутки не влияет на текущий лимит
+            if profit and timestamp.date() == self.day:
+                self.daily_pnl += profit
+                self.symbol_pnl[symbol] = self.symbol_pnl.get(symbol, 0.0) + profit
+                if profit < 0:
+                    self.daily_loss -= profit
+        return profit
+    
+    def summary(self) -> dict:
+        """Текущие значения счетчиков"""
+        with self._lock:
+            return {
+                'day': self.day.isoformat(),
+                'daily_pnl': self.daily_pnl,
+                'daily_loss': self.daily_loss,
+                'symbol_pnl': dict(self.symbol_pnl),
+                'exposure': dict(self.exposure)
+            }
+    
+    def check_daily_loss_limit(self) -> bool:
+        """Проверка дневного лимита убытков"""
+        with self._lock:
+            self._roll_over(datetime.utcnow())
+            return self.daily_loss < self.daily_loss_limit
+    
+    def _roll_over(self, now: datetime):
+        """Сброс дневных счетчиков после полуночи UTC"""
+        if self.day is None or now.date() > self.day:
+            self.day = now.date()
+            self.daily_loss = 0.0
+            self.daily_pnl = 0.0
+            self.symbol_pnl = {}
     
     def calculate_position_size(self, price: float, account_balance: float) -> float:
         """Расчет размера позиции с учетом риска"""
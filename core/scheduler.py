@@ -0,0 +1,73 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from config.settings import settings
+from utils.logger import logger
+
+class SymbolState:
+    """Состояние обработки одного символа"""
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.last_candle = None
+        self.runs = 0
+        self.errors = 0
+
+class MultiSymbolScheduler:
+    """Асинхронный цикл по многим символам
+    Загрузка свечей, анализ и сделки каждого символа выполняются в пуле
+    потоков параллельно, поэтому время тика растет не линейно с числом
+    символов. Общий вес запросов ограничивает BinanceClient.
+    """
+    def __init__(self, bot, symbols: Optional[List[str]] = None, poll_interval: float = 60,
+                 max_concurrency: Optional[int] = None):
+        self.bot = bot
+        self.poll_interval = poll_interval
+        self.max_concurrency = max_concurrency or settings.MAX_CONCURRENT_SYMBOLS
+        self.states: Dict[str, SymbolState] = {
+            symbol: SymbolState(symbol) for symbol in (symbols or bot.symbols)
+        }
+        self._running = False
+        self._semaphore = None
+
+    async def run_forever(self):
+        """Тики с фиксированным периодом до вызова stop()"""
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_concurrency))
+        self._running = True
+        logger.info(f"Multi-symbol scheduler started for {len(self.states)} symbols")
+
+        while self._running:
+            started = loop.time()
+            await self.tick()
+            elapsed = loop.time() - started
+            logger.info(f"Tick for {len(self.states)} symbols took {elapsed:.2f}s")
+            await asyncio.sleep(max(self.poll_interval - elapsed, 0))
+
+    def stop(self):
+        self._running = False
+
+    async def tick(self):
+        """Один проход по всем символам"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        await asyncio.gather(*(self.process_symbol(state) for state in self.states.values()))
+
+    async def process_symbol(self, state: SymbolState):
+        """Загрузка свечей и запуск стратегий для символа"""
+        async with self._semaphore:
+            try:
+                data = await asyncio.to_thread(self.bot.get_market_data, state.symbol)
+                if data is None or data.empty:
+                    return
+
+                # Без новых данных повторный анализ ничего не изменит
+                candle = (data['close_time'].iloc[-1], float(data['close'].iloc[-1]))
+                if candle == state.last_candle:
+                    return
+                state.last_candle = candle
+
+                await asyncio.to_thread(self.bot.run_strategy, data, state.symbol)
+                state.runs += 1
+            except Exception as e:
+                state.errors += 1
+                logger.error(f"Error processing {state.symbol}: {e}")
@@ -0,0 +1,73 @@
+import copy
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from strategies.base_strategy import StreamingStrategy
+
+class SymbolStream:
+    """Потоковое состояние одной стратегии для одного символа"""
+    def __init__(self, strategy: StreamingStrategy):
+        self.strategy = strategy
+        # Время открытия последней свечи, переданной в update
+        self.last_open_time: Optional[int] = None
+        self.last_result: Optional[dict] = None
+
+class StreamingSignals:
+    """Сигналы правил в живом режиме через seed/update стратегий
+    Для каждого символа стратегия один раз инициализируется по истории окна,
+    дальше в update передаются только новые закрытые свечи. Незакрытая
+    свеча анализируется на копии состояния, которая не сохраняется, поэтому
+    результат совпадает с analyze на той же истории.
+    """
+    def __init__(self, factories: Dict[str, Callable[[], StreamingStrategy]]):
+        self.factories = factories
+        self.states: Dict[Tuple[str, str], SymbolStream] = {}
+        self.seeds = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def analyze(self, name: str, symbol: str, data: pd.DataFrame, now_ms: Optional[int] = None) -> dict:
+        """Сигнал стратегии name по последней свече окна data"""
+        state = self._state(name, symbol)
+        open_time = _open_times(data)
+        close = data['close'].to_numpy(dtype=np.float64)
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+
+        # Последняя свеча окна может быть еще не закрыта (опрос REST)
+        forming = 'close_time' in data.columns and int(data['close_time'].iloc[-1]) >= now_ms
+        closed = len(close) - 1 if forming else len(close)
+
+        if closed:
+            start = None
+            if state.last_open_time is not None:
+                start = int(np.searchsorted(open_time[:closed], state.last_open_time, side='right'))
+                # Последняя обработанная свеча должна быть в окне, иначе история пересчитывается
+                if start == 0 or open_time[start - 1] != state.last_open_time:
+                    start = None
+            if start is None:
+                state.strategy.seed(close[:closed - 1])
+                self.seeds += 1
+                start = closed - 1
+            for i in range(start, closed):
+                state.last_result = state.strategy.update(float(close[i]))
+                self.updates += 1
+            if closed > start:
+                state.last_open_time = int(open_time[closed - 1])
+
+        if forming:
+            return copy.deepcopy(state.strategy).update(float(close[-1]))
+        return state.last_result
+
+    def _state(self, name: str, symbol: str) -> SymbolStream:
+        with self._lock:
+            state = self.states.get((name, symbol))
+            if state is None:
+                state = self.states[(name, symbol)] = SymbolStream(self.factories[name]())
+            return state
+
+def _open_times(data: pd.DataFrame) -> np.ndarray:
+    if 'timestamp' in data.columns:
+        return data['timestamp'].to_numpy(dtype='datetime64[ms]').view(np.int64)
+    return data['close_time'].to_numpy(dtype=np.int64)
@@ -0,0 +1,267 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from config.settings import settings
+from utils.logger import logger
+
+# Команды канала управления
+COMMAND_STOP = 'stop'
+
+# Период публикации метрик дочерних процессов в шину, секунды
+METRICS_INTERVAL = 5.0
+
+class ProcessSpec:
+    """Описание дочернего процесса: имя и функция верхнего уровня модуля"""
+    def __init__(self, name: str, target: Callable, restart: bool = True):
+        self.name = name
+        self.target = target
+        self.restart = restart
+
+def _child_main(name: str, target: Callable, bus_prefix: str, control, status):
+    """Точка входа дочернего процесса
+    Команда stop из канала управления действует так же, как Ctrl+C,
+    поэтому процессы останавливаются своими обычными путями.
+    """
+    def listen():
+        while True:
+            try:
+                command = control.get()
+            except (EOFError, OSError):
+                return
+            if command == COMMAND_STOP:
+                # Настоящий SIGINT: его получают и обработчики event loop uvicorn
+                signal.raise_signal(signal.SIGINT)
+                return
+
+    threading.Thread(target=listen, name="control", daemon=True).start()
+    status.put(('started', name, os.getpid()))
+    try:
+        target(bus_prefix)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        status.put(('stopped', name, os.getpid()))
+
+class Supervisor:
+    """Запуск и контроль процессов бота, инференса и веб-сервера
+    Процессы обмениваются данными через MarketDataBus в разделяемой памяти,
+    которую создает и удаляет супервизор. Упавший процесс перезапускается
+    с растущей паузой; по SIGTERM/SIGINT всем процессам отправляется stop.
+    """
+    def __init__(self, specs: List[ProcessSpec], bus_prefix: Optional[str] = None,
+                 restart_delay: float = 1.0, max_restart_delay: float = 60.0, poll_interval: float = 0.5,
+                 bus_capacities: Optional[Dict[str, int]] = None):
+        self.specs = {spec.name: spec for spec in specs}
+        self.bus_prefix = bus_prefix or f"tradingbot_{os.getpid()}"
+        self.bus_capacities = bus_capacities
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.poll_interval = poll_interval
+        # spawn: дочерние процессы не наследуют потоки и состояние TensorFlow родителя
+        self.context = multiprocessing.get_context('spawn')
+        self.status = self.context.Queue()
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        self.controls: Dict[str, object] = {}
+        self.restarts: Dict[str, int] = {name: 0 for name in self.specs}
+        self._next_start: Dict[str, float] = {}
+        self.bus = None
+        self._running = False
+
+    def start(self):
+        """Создание шины и запуск всех процессов"""
+        from core.market_bus import MarketDataBus
+        self.bus = MarketDataBus.create(self.bus_prefix, self.bus_capacities)
+        self._running = True
+        for name in self.specs:
+            self._start_process(name)
+
+    def run(self):
+        """Запуск и наблюдение до сигнала остановки"""
+        previous = {sig: signal.signal(sig, self._on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self.start()
+            while self._running:
+                self.poll(self.poll_interval)
+        finally:
+            self.stop()
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+    def poll(self, timeout: float = 0.0):
+        """Обработка статусов и перезапуск упавших процессов"""
+        try:
+            event, name, pid = self.status.get(timeout=timeout) if timeout else self.status.get_nowait()
+            logger.info(f"Process {name} (pid {pid}) {event}")
+        except queue.Empty:
+            pass
+
+        now = time.monotonic()
+        for name, process in list(self.processes.items()):
+            if process.is_alive() or not self._running:
+                continue
+            spec = self.specs[name]
+            if name not in self._next_start:
+                logger.error(f"Process {name} exited with code {process.exitcode}")
+                if not spec.restart:
+                    del self.processes[name]
+                    continue
+                delay = min(self.restart_delay * 2 ** self.restarts[name], self.max_restart_delay)
+                self._next_start[name] = now + delay
+            elif now >= self._next_start[name]:
+                del self._next_start[name]
+                self.restarts[name] += 1
+                self._start_process(name)
+
+    def stop(self, timeout: float = 10.0):
+        """Остановка процессов командой stop, затем terminate, и удаление шины"""
+        self._running = False
+        for name, process in self.processes.items():
+            if process.is_alive():
+                self.controls[name].put(COMMAND_STOP)
+
+        deadline = time.monotonic() + timeout
+        for name, process in self.processes.items():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f"Process {name} did not stop in time, terminating")
+                process.terminate()
+                process.join()
+        self.processes.clear()
+
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
+
+    def _start_process(self, name: str):
+        spec = self.specs[name]
+        control = self.context.Queue()
+        process = self.context.Process(
+            target=_child_main,
+            args=(name, spec.target, self.bus_prefix, control, self.status),
+            name=name,
+            daemon=False
+        )
+        process.start()
+        self.processes[name] = process
+        self.controls[name] = control
+
+    def _on_signal(self, signum, frame):
+        logger.info(f"Received signal {signum}, stopping processes...")
+        self._running = False
+
+def start_metrics_publisher(bus, process: str, interval: float = METRICS_INTERVAL) -> threading.Event:
+    """Фоновая публикация метрик процесса в шину для /metrics веб-сервера
+    Возвращает событие, установка которого останавливает публикацию.
+    """
+    from utils.instrumentation import metrics
+
+    stopped = threading.Event()
+
+    def publish():
+        while metrics.enabled:
+            try:
+                bus.publish_metrics(process, metrics.render())
+            except Exception as e:
+                logger.error(f"Failed to publish metrics of {process}: {e}")
+            if stopped.wait(interval):
+                return
+
+    threading.Thread(target=publish, name="metrics-publisher", daemon=True).start()
+    return stopped
+
+def run_trading_process(bus_prefix: str):
+    """Торговый процесс: свечи и события в шину, ML-сигналы из шины"""
+    from core.market_bus import MarketDataBus, BusPredictor
+    from core.event_hub import event_hub
+    from ml.prediction.registry import predictor_registry
+
+    bus = MarketDataBus.attach(bus_prefix)
+    predictor_registry.register(settings.ML_MODEL, lambda **kwargs: BusPredictor(bus))
+    event_hub.sinks.append(bus.publish_event)
+    publisher = start_metrics_publisher(bus, 'trading')
+
+    from core.bot import TradingBot
+    try:
+        TradingBot().start()
+    finally:
+        publisher.set()
+        bus.close()
+
+def run_inference_process(bus_prefix: str, poll_interval: float = 0.2):
+    """ML-процесс: прогноз по каждой новой свече из шины"""
+    from core.market_bus import MarketDataBus
+    from ml.prediction.registry import predictor_registry
+
+    bus = MarketDataBus.attach(bus_prefix)
+    publisher = start_metrics_publisher(bus, 'inference')
+    try:
+        predictor = predictor_registry.get(settings.ML_MODEL, settings.SYMBOL)
+        if predictor is None:
+            raise RuntimeError("ML predictor failed to load")
+        position = bus.candles.seq
+        while True:
+            records, position = bus.candles.read(position)
+            if not len(records):
+                time.sleep(poll_interval)
+                continue
+            # Из пачки свечей прогнозируется только последняя по каждому символу
+            latest = {record['symbol'].decode(): (int(record['open_time']), float(record['close']))
+                      for record in records}
+            for symbol, (open_time, close) in latest.items():
+                bus.publish_prediction(symbol, predictor.get_trend_signal(symbol, close), open_time)
+    finally:
+        publisher.set()
+        bus.close()
+
+def run_web_process(bus_prefix: str, poll_interval: float = 0.05):
+    """Веб-процесс: события торгового процесса из шины раздаются клиентам,
+    метрики дочерних процессов добавляются к выдаче /metrics
+    """
+    import uvicorn
+    from core.market_bus import MarketDataBus
+    from core.event_hub import event_hub
+    from utils.instrumentation import metrics
+
+    bus = MarketDataBus.attach(bus_prefix)
+    running = True
+
+    def relay():
+        position = bus.events.seq
+        metrics_position = 0
+        while running:
+            events = []
+            try:
+                events, position = bus.read_events(position)
+                snapshots, metrics_position = bus.read_metrics(metrics_position)
+                for process, text in snapshots.items():
+                    metrics.set_remote(process, text)
+            except Exception as e:
+                logger.error(f"Bus relay read failed: {e}")
+            # Ошибка одного события не останавливает доставку остальных
+            for event_type, data in events:
+                try:
+                    event_hub.publish(event_type, data)
+                except Exception as e:
+                    logger.error(f"Failed to relay bus event {event_type}: {e}")
+            if not events:
+                time.sleep(poll_interval)
+
+    thread = threading.Thread(target=relay, name="bus-relay", daemon=True)
+    thread.start()
+    try:
+        uvicorn.run("web.app:app", host=settings.WEB_HOST, port=settings.WEB_PORT, reload=False)
+    finally:
+        running = False
+        thread.join()
+        bus.close()
+
+def default_specs() -> List[ProcessSpec]:
+    return [
+        ProcessSpec('trading', run_trading_process),
+        ProcessSpec('inference', run_inference_process),
+        ProcessSpec('web', run_web_process)
+    ]
@@ -1,8 +1,22 @@
+from sqlalchemy import inspect, text
 from database.database import engine, Base
 from database.models import Trade, Signal, Balance, BacktestResult
 
 def init_database():
     Base.metadata.create_all(bind=engine)
+    # create_all не добавляет новые колонки в уже существующие таблицы
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+    # create_all не добавляет индексы в уже существующие таблицы
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     print("Database initialized successfully!")
 
 if __name__ == "__main__":
@@ -1,8 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index
 from datetime import datetime
-
-Base = declarative_base()
+from database.database import Base
 
 class Trade(Base):
     __tablename__ = 'trades'
@@ -18,6 +16,12 @@ class Trade(Base):
     strategy = Column(String)
     profit = Column(Float)
     commission = Column(Float)
+    
+    __table_args__ = (
+        Index('ix_trades_timestamp', 'timestamp'),
+        Index('ix_trades_symbol_timestamp', 'symbol', 'timestamp'),
+        Index('ix_trades_strategy_timestamp', 'strategy', 'timestamp'),
+    )
 
 class Signal(Base):
     __tablename__ = 'signals'
@@ -30,6 +34,12 @@ class Signal(Base):
     price = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
     executed = Column(Boolean, default=False)
+    
+    __table_args__ = (
+        Index('ix_signals_timestamp', 'timestamp'),
+        Index('ix_signals_symbol_timestamp', 'symbol', 'timestamp'),
+        Index('ix_signals_strategy_timestamp', 'strategy', 'timestamp'),
+    )
 
 class Balance(Base):
     __tablename__ = 'balances'
@@ -39,6 +49,11 @@ class Balance(Base):
     free = Column(Float, nullable=False)
     locked = Column(Float, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_balances_timestamp', 'timestamp'),
+        Index('ix_balances_asset_timestamp', 'asset', 'timestamp'),
+    )
 
 class BacktestResult(Base):
     __tablename__ = 'backtest_results'
@@ -52,6 +67,16 @@ class BacktestResult(Base):
     win_rate = Column(Float)
     profit_factor = Column(Float)
     max_drawdown = Column(Float)
+    max_drawdown_duration = Column(Integer)
     sharpe_ratio = Column(Float)
+    sortino_ratio = Column(Float)
+    calmar_ratio = Column(Float)
+    exposure = Column(Float)
+    turnover = Column(Float)
     total_return = Column(Float)
-    timestamp = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_backtest_results_timestamp', 'timestamp'),
+        Index('ix_backtest_results_strategy_timestamp', 'strategy', 'timestamp'),
+    )
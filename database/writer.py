@@ -0,0 +1,139 @@
+import threading
+from datetime import datetime
+from typing import Dict, List
+from database.models import Signal, Trade, Balance
+from utils.logger import logger
+from utils.instrumentation import metrics, errors
+
+FLUSH_LATENCY = metrics.histogram('db_flush_duration_seconds', 'Write-behind batch insert and commit duration')
+ROWS_WRITTEN = metrics.counter('db_rows_written_total', 'Rows written by the write-behind buffer', ['table'])
+ROWS_DROPPED = metrics.counter('db_rows_dropped_total', 'Rows dropped when the write-behind buffer overflowed', ['table'])
+
+# Порядок отбрасывания при переполнении: сделки последними, по ним восстанавливается риск
+DROP_ORDER = (Signal, Balance, Trade)
+
+class WriteBehindBuffer:
+    """Отложенная запись сигналов, сделок и балансов
+    Записи копятся в памяти и пишутся пачками из фонового потока при
+    наборе max_batch записей или раз в flush_interval секунд, поэтому
+    торговый цикл не ждет коммита в базу. Пачка, которую не удалось
+    записать, возвращается в начало буфера; при больше max_pending записей
+    отбрасываются самые старые, сделки - в последнюю очередь.
+    """
+    def __init__(self, session_factory=None, max_batch: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 50_000):
+        if session_factory is None:
+            from database.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self._buffers: Dict[type, List[dict]] = {Signal: [], Trade: [], Balance: []}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._worker.start()
+
+    def add_signal(self, symbol: str, strategy: str, signal_type: str, confidence: float = None,
+                   price: float = None, executed: bool = False):
+        """Сигнал стратегии"""
+        self.add(Signal, {
+            'symbol': symbol, 'strategy': strategy, 'signal_type': signal_type,
+            'confidence': confidence, 'price': price, 'executed': executed
+        })
+
+    def add_trade(self, symbol: str, side: str, quantity: float, price: float, status: str = 'executed',
+                  order_id: str = None, strategy: str = None, profit: float = None, commission: float = None):
+        """Сделка"""
+        self.add(Trade, {
+            'symbol': symbol, 'side': side, 'quantity': quantity, 'price': price, 'status': status,
+            'order_id': order_id, 'strategy': strategy, 'profit': profit, 'commission': commission
+        })
+
+    def add_balance(self, asset: str, free: float, locked: float):
+        """Снимок баланса"""
+        self.add(Balance, {'asset': asset, 'free': free, 'locked': locked})
+
+    def add(self, model, row: dict):
+        # Время события, а не время записи пачки
+        row.setdefault('timestamp', datetime.utcnow())
+        with self._lock:
+            self._buffers[model].append(row)
+            self._size += 1
+            full = self._size >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Запись накопленных записей одной транзакцией"""
+        with self._flush_lock:
+            with self._lock:
+                batches = {model: rows for model, rows in self._buffers.items() if rows}
+                self._buffers = {model: [] for model in self._buffers}
+                self._size = 0
+            if not batches:
+                return 0
+
+            count = sum(len(rows) for rows in batches.values())
+            db = self.session_factory()
+            try:
+                with FLUSH_LATENCY.time():
+                    for model, rows in batches.items():
+                        db.bulk_insert_mappings(model, rows)
+                    db.commit()
+                self.written += count
+                for model, rows in batches.items():
+                    ROWS_WRITTEN.inc(len(rows), table=model.__tablename__)
+            except Exception as e:
+                db.rollback()
+                self.failed += count
+                errors.inc(component='database')
+                logger.error(f"Error writing {count} records to database, will retry: {e}")
+                self._requeue(batches)
+                return 0
+            finally:
+                db.close()
+            return count
+
+    def _requeue(self, batches: Dict[type, List[dict]]):
+        """Возврат незаписанной пачки перед новыми записями с отбрасыванием сверх max_pending"""
+        with self._lock:
+            for model, rows in batches.items():
+                self._buffers[model] = rows + self._buffers[model]
+            self._size = sum(len(rows) for rows in self._buffers.values())
+            overflow = self._size - self.max_pending
+            dropped = {}
+            for model in DROP_ORDER:
+                if overflow <= 0:
+                    break
+                rows = self._buffers[model]
+                count = min(overflow, len(rows))
+                if count:
+                    self._buffers[model] = rows[count:]
+                    dropped[model] = count
+                    overflow -= count
+            self._size -= sum(dropped.values())
+            self.dropped += sum(dropped.values())
+        for model, count in dropped.items():
+            ROWS_DROPPED.inc(count, table=model.__tablename__)
+            logger.error(f"Write-behind buffer overflow: dropped {count} oldest {model.__tablename__} rows")
+
+    def close(self):
+        """Остановка фонового потока с записью остатка"""
+        self._running = False
+        self._wakeup.set()
+        self._worker.join()
+        self.flush()
+
+    def _run(self):
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
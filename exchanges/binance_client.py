@@ -1,55 +1,141 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
 import pandas as pd
+import websockets
 from config.settings import settings
+from exchanges.candle_buffer import CandleBuffer, INTERVAL_MS
+from exchanges.rate_limiter import request_budget
 from utils.logger import logger
+from utils.instrumentation import metrics, errors
+
+# Вес запросов REST API Binance
+ACCOUNT_WEIGHT = 20
+ORDER_WEIGHT = 1
+QUERY_ORDER_WEIGHT = 4
+OPEN_ORDERS_WEIGHT = 80
+EXCHANGE_INFO_WEIGHT = 20
+LISTEN_KEY_WEIGHT = 2
+
+REQUEST_LATENCY = metrics.histogram('binance_request_duration_seconds', 'Binance REST call duration', ['method'])
+
+# Позиция меньше минимального лота не считается открытой
+DEFAULT_MIN_QUANTITY = 0.0001
+
+def klines_weight(limit: int) -> int:
+    """Вес запроса свечей в зависимости от limit"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    return 5 if limit <= 1000 else 10
 
 class BinanceClient:
-    def __init__(self):
+    def __init__(self, weight_budget=None):
         self.client = Client(
             api_key=settings.BINANCE_API_KEY,
             api_secret=settings.BINANCE_API_SECRET
         )
+        self.weight_budget = weight_budget or request_budget
+        self.account = AccountSnapshot()
+        self.account_stream = None
+        self._min_quantities: Dict[str, float] = {}
+        self.candles: Dict[tuple, CandleBuffer] = {}
     
+    @REQUEST_LATENCY.timed(method='get_klines')
     def get_klines(self, symbol: str, interval: str, limit: int = 100):
         """Получение свечей"""
         try:
+            buffer = self.candles.get((symbol, interval))
+            if buffer is None or buffer.capacity < limit:
+                buffer = self.candles[(symbol, interval)] = CandleBuffer(limit, symbol, interval)
+            
+            # Запрашиваются только свечи после последней известной, включая ее саму
+            fetch = limit
+            if len(buffer) >= limit and interval in INTERVAL_MS:
+                fetch = max((int(time.time() * 1000) - buffer.last_open_time) // INTERVAL_MS[interval] + 1, 1)
+            if fetch >= limit:
+                fetch = limit
+                buffer.clear()
+            
+            self.weight_budget.acquire(klines_weight(fetch))
             klines = self.client.get_klines(
                 symbol=symbol,
                 interval=interval,
-                limit=limit
+                limit=fetch
             )
+            buffer.extend_klines(klines)
             
-            df = pd.DataFrame(klines, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_asset_volume', 'number_of_trades',
-                'taker_buy_base_volume', 'taker_buy_quote_volume', 'ignore'
-            ])
-            
-            df['close'] = pd.to_numeric(df['close'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            
-            return df
+            # Копия: кадр уходит в другие потоки и не должен меняться при следующем append
+            return buffer.to_frame(limit, copy=True)
             
         except BinanceAPIException as e:
+            errors.inc(component='binance')
             logger.error(f"Binance API Error: {e.message}")
             return None
         except Exception as e:
+            errors.inc(component='binance')
             logger.error(f"Error getting klines: {e}")
             return None
     
+    def stream_klines(self, symbols: List[str], interval: str,
+                      on_candle_close: Callable[[str, pd.DataFrame], None], limit: int = 100):
+        """Создание WebSocket потока свечей для списка символов"""
+        return KlineStream(self.client, symbols, interval, on_candle_close, limit=limit,
+                           weight_budget=self.weight_budget)
+    
+    def start_account_stream(self):
+        """Запуск потока данных аккаунта в фоновом потоке"""
+        if self.account_stream is not None:
+            return self.account_stream
+        self.account_stream = UserDataStream(self.client, self.account, weight_budget=self.weight_budget)
+        threading.Thread(
+            target=lambda: asyncio.run(self.account_stream.run()),
+            name="user-data-stream",
+            daemon=True
+        ).start()
+        return self.account_stream
+    
+    def get_min_quantity(self, symbol: str) -> float:
+        """Минимальный размер ордера по фильтру LOT_SIZE, кэшируется на символ"""
+        if symbol not in self._min_quantities:
+            try:
+                self.weight_budget.acquire(EXCHANGE_INFO_WEIGHT)
+                with REQUEST_LATENCY.time(method='get_symbol_info'):
+                    info = self.client.get_symbol_info(symbol) or {}
+                lot_size = next((f for f in info.get('filters', []) if f['filterType'] == 'LOT_SIZE'), None)
+                self._min_quantities[symbol] = float(lot_size['minQty']) if lot_size else DEFAULT_MIN_QUANTITY
+            except Exception as e:
+                errors.inc(component='binance')
+                logger.error(f"Error getting symbol info: {e}")
+                return DEFAULT_MIN_QUANTITY
+        return self._min_quantities[symbol]
+    
     def get_balance(self, asset: str) -> float:
         """Получение баланса актива"""
+        # Пока поток аккаунта подключен, баланс берется из памяти без запроса
+        if self.account.live:
+            return self.account.get_free(asset)
         try:
-            balance = self.client.get_asset_balance(asset=asset)
+            self.weight_budget.acquire(ACCOUNT_WEIGHT)
+            with REQUEST_LATENCY.time(method='get_asset_balance'):
+                balance = self.client.get_asset_balance(asset=asset)
             return float(balance['free'])
         except Exception as e:
+            errors.inc(component='binance')
             logger.error(f"Error getting balance: {e}")
             return 0.0
     
+    @REQUEST_LATENCY.timed(method='create_order')
     def create_market_order(self, symbol: str, side: str, quantity: float):
         """Создание рыночного ордера"""
         try:
+            self.weight_budget.acquire(ORDER_WEIGHT)
             order = self.client.create_order(
                 symbol=symbol,
                 side=side,
@@ -58,15 +144,19 @@ class BinanceClient:
             )
             return order
         except BinanceAPIException as e:
+            errors.inc(component='binance')
             logger.error(f"Binance Order Error: {e.message}")
             return None
         except Exception as e:
+            errors.inc(component='binance')
             logger.error(f"Error creating order: {e}")
             return None
     
+    @REQUEST_LATENCY.timed(method='create_test_order')
     def create_test_order(self, symbol: str, side: str, quantity: float):
         """Создание тестового ордера"""
         try:
+            self.weight_budget.acquire(ORDER_WEIGHT)
             order = self.client.create_test_order(
                 symbol=symbol,
                 side=side,
@@ -75,5 +165,313 @@ class BinanceClient:
             )
             return True
         except Exception as e:
+            errors.inc(component='binance')
             logger.error(f"Error creating test order: {e}")
-            return False
\ No newline at end of file
+            return False
+
+class KlineStream:
+    """WebSocket поток свечей вместо опроса REST API
+    Держит в памяти окно закрытых свечей по каждому символу и вызывает
+    on_candle_close(symbol, data) при закрытии свечи. После переподключения
+    пропущенные свечи догружаются через REST.
+    """
+    def __init__(self, client, symbols: List[str], interval: str,
+                 on_candle_close: Callable[[str, pd.DataFrame], None], limit: int = 100,
+                 ws_url: Optional[str] = None, reconnect_delay: float = 1.0, max_reconnect_delay: float = 60.0,
+                 weight_budget=None):
+        self.client = client
+        # Догрузка через REST расходует тот же бюджет веса, что и остальные запросы клиента
+        self.weight_budget = weight_budget or request_budget
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.interval = interval
+        self.on_candle_close = on_candle_close
+        self.limit = limit
+        self.ws_url = ws_url or settings.BINANCE_WS_URL
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.windows: Dict[str, CandleBuffer] = {
+            symbol: CandleBuffer(limit, symbol, interval) for symbol in self.symbols
+        }
+        self.reconnects = 0
+        self._running = False
+        self._ws = None
+        self._loop = None
+    
+    @property
+    def url(self) -> str:
+        streams = '/'.join(f"{symbol.lower()}@kline_{self.interval}" for symbol in self.symbols)
+        return f"{self.ws_url}/stream?streams={streams}"
+    
+    def get_window(self, symbol: str) -> pd.DataFrame:
+        """Текущее окно закрытых свечей символа"""
+        return self.windows[symbol.upper()].to_frame(copy=True)
+    
+    async def run(self):
+        """Чтение потока с переподключением до вызова stop()"""
+        self._running = True
+        self._loop = asyncio.get_running_loop()
+        delay = self.reconnect_delay
+        
+        while self._running:
+            try:
+                await self._backfill()
+                async with websockets.connect(self.url) as ws:
+                    self._ws = ws
+                    delay = self.reconnect_delay
+                    logger.info(f"Kline stream connected: {', '.join(self.symbols)} {self.interval}")
+                    
+                    async for message in ws:
+                        await self._handle_message(message)
+            except Exception as e:
+                logger.error(f"Kline stream error: {e}")
+            finally:
+                self._ws = None
+            
+            if self._running:
+                self.reconnects += 1
+                logger.info(f"Reconnecting kline stream in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+    
+    def stop(self):
+        """Остановка потока, в том числе из другого потока"""
+        self._running = False
+        if self._ws is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._ws.close()))
+    
+    async def _handle_message(self, message: str):
+        payload = json.loads(message)
+        event = payload.get('data', payload)
+        if event.get('e') != 'kline':
+            return
+        
+        kline = event['k']
+        if not kline['x']:
+            return
+        
+        symbol = event['s']
+        if self._append(symbol, [kline['t'], kline['o'], kline['h'], kline['l'], kline['c'], kline['v'], kline['T']]):
+            await self._notify(symbol)
+    
+    def _append(self, symbol: str, row: list) -> bool:
+        """Добавление закрытой свечи, дубликаты и старые свечи пропускаются"""
+        window = self.windows[symbol]
+        if window and row[0] <= window.last_open_time:
+            return False
+        return window.append_kline(row)
+    
+    async def _backfill(self):
+        """Догрузка закрытых свечей, пропущенных во время разрыва соединения"""
+        now_ms = int(time.time() * 1000)
+        for symbol in self.symbols:
+            klines = await asyncio.to_thread(self._fetch_klines, symbol)
+            window = self.windows[symbol]
+            had_history = bool(window)
+            
+            # Разрыв длиннее окна: старые свечи уже не смежны с новыми
+            if window and klines and klines[0][0] > window.last_open_time:
+                window.clear()
+            
+            appended = False
+            for row in klines:
+                # Последняя свеча из REST может быть еще не закрыта
+                if row[6] < now_ms:
+                    appended = self._append(symbol, row) or appended
+            
+            if had_history and appended:
+                logger.info(f"Backfilled kline gap for {symbol}")
+                await self._notify(symbol)
+    
+    def _fetch_klines(self, symbol: str) -> list:
+        self.weight_budget.acquire(klines_weight(self.limit))
+        return self.client.get_klines(symbol=symbol, interval=self.interval, limit=self.limit)
+    
+    async def _notify(self, symbol: str):
+        try:
+            await asyncio.to_thread(self.on_candle_close, symbol, self.get_window(symbol))
+        except Exception as e:
+            logger.error(f"Error handling closed candle for {symbol}: {e}")
+
+
+class AccountSnapshot:
+    """Состояние аккаунта в памяти: балансы, открытые ордера и исполнения
+    Заполняется из REST и обновляется событиями потока данных аккаунта.
+    live - снимок актуален, пока поток подключен.
+    """
+    def __init__(self, max_fills: int = 1000):
+        self.balances: Dict[str, Dict[str, float]] = {}
+        self.open_orders: Dict[int, dict] = {}
+        self.fills = deque(maxlen=max_fills)
+        self.live = False
+        self.updated_at = 0
+        # Подписчики на события потока: ExecutionEngine, запись балансов
+        self.listeners: List[Callable[[dict], None]] = []
+        self._balance_times: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def seed(self, account: dict, open_orders: List[dict]):
+        """Полная замена снимка данными REST API"""
+        update_time = account.get('updateTime', 0)
+        with self._lock:
+            for balance in account.get('balances', []):
+                asset = balance['asset']
+                # Событие потока, пришедшее после запроса, новее данных REST
+                if self._balance_times.get(asset, 0) > update_time:
+                    continue
+                self.balances[asset] = {'free': float(balance['free']), 'locked': float(balance['locked'])}
+                self._balance_times[asset] = update_time
+            self.open_orders = {order['orderId']: order for order in open_orders}
+            self.updated_at = max(self.updated_at, update_time)
+    
+    def apply_event(self, event: dict):
+        """Обновление снимка событием потока данных аккаунта"""
+        event_type = event.get('e')
+        with self._lock:
+            if event_type == 'outboundAccountPosition':
+                update_time = event['u']
+                for balance in event['B']:
+                    asset = balance['a']
+                    if self._balance_times.get(asset, 0) > update_time:
+                        continue
+                    self.balances[asset] = {'free': float(balance['f']), 'locked': float(balance['l'])}
+                    self._balance_times[asset] = update_time
+                self.updated_at = max(self.updated_at, update_time)
+            elif event_type == 'executionReport':
+                self._apply_execution(event)
+        
+        for listener in self.listeners:
+            listener(event)
+    
+    def _apply_execution(self, event: dict):
+        order_id = event['i']
+        if event['x'] == 'TRADE':
+            self.fills.append({
+                'symbol': event['s'],
+                'orderId': order_id,
+                'side': event['S'],
+                'price': float(event['L']),
+                'quantity': float(event['l']),
+                'commission': float(event['n']),
+                'commissionAsset': event['N'],
+                'time': event['T']
+            })
+        
+        if event['X'] in ('NEW', 'PARTIALLY_FILLED'):
+            self.open_orders[order_id] = {
+                'symbol': event['s'],
+                'orderId': order_id,
+                'clientOrderId': event['c'],
+                'side': event['S'],
+                'type': event['o'],
+                'price': event['p'],
+                'origQty': event['q'],
+                'executedQty': event['z'],
+                'status': event['X']
+            }
+        else:
+            self.open_orders.pop(order_id, None)
+    
+    def get_free(self, asset: str) -> float:
+        with self._lock:
+            return self.balances.get(asset, {}).get('free', 0.0)
+    
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            return [order for order in self.open_orders.values() if symbol is None or order['symbol'] == symbol]
+
+class UserDataStream:
+    """Поток данных аккаунта Binance (listen key)
+    После подключения снимок заполняется через REST, дальше обновляется
+    событиями executionReport и outboundAccountPosition. Снимок периодически
+    сверяется с REST, listen key продлевается.
+    """
+    def __init__(self, client, account: AccountSnapshot, ws_url: Optional[str] = None,
+                 weight_budget=None, keepalive_interval: float = 1800, reconcile_interval: Optional[float] = None,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 60.0):
+        self.client = client
+        self.account = account
+        self.ws_url = ws_url or settings.BINANCE_WS_URL
+        self.weight_budget = weight_budget or request_budget
+        self.keepalive_interval = keepalive_interval
+        self.reconcile_interval = reconcile_interval or settings.ACCOUNT_RECONCILE_INTERVAL
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.listen_key = None
+        self.reconnects = 0
+        self._running = False
+        self._ws = None
+        self._loop = None
+    
+    async def run(self):
+        """Чтение потока с переподключением до вызова stop()"""
+        self._running = True
+        self._loop = asyncio.get_running_loop()
+        delay = self.reconnect_delay
+        
+        while self._running:
+            maintenance = None
+            try:
+                self.listen_key = await asyncio.to_thread(self._get_listen_key)
+                async with websockets.connect(f"{self.ws_url}/ws/{self.listen_key}") as ws:
+                    self._ws = ws
+                    # События, пришедшие во время запроса снимка, ждут в буфере сокета
+                    await asyncio.to_thread(self.reconcile)
+                    self.account.live = True
+                    delay = self.reconnect_delay
+                    maintenance = asyncio.create_task(self._maintain())
+                    logger.info("User data stream connected")
+                    
+                    async for message in ws:
+                        self.account.apply_event(json.loads(message))
+            except Exception as e:
+                logger.error(f"User data stream error: {e}")
+            finally:
+                self.account.live = False
+                self._ws = None
+                if maintenance is not None:
+                    maintenance.cancel()
+            
+            if self._running:
+                self.reconnects += 1
+                logger.info(f"Reconnecting user data stream in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+    
+    def stop(self):
+        """Остановка потока, в том числе из другого потока"""
+        self._running = False
+        if self._ws is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._ws.close()))
+    
+    def reconcile(self):
+        """Сверка снимка с REST API"""
+        self.weight_budget.acquire(ACCOUNT_WEIGHT)
+        account = self.client.get_account()
+        self.weight_budget.acquire(OPEN_ORDERS_WEIGHT)
+        open_orders = self.client.get_open_orders()
+        self.account.seed(account, open_orders)
+    
+    async def _maintain(self):
+        """Продление listen key и периодическая сверка снимка"""
+        loop = asyncio.get_running_loop()
+        last_keepalive = last_reconcile = loop.time()
+        while True:
+            await asyncio.sleep(min(self.keepalive_interval, self.reconcile_interval))
+            now = loop.time()
+            try:
+                if now - last_keepalive >= self.keepalive_interval:
+                    await asyncio.to_thread(self._keepalive)
+                    last_keepalive = now
+                if now - last_reconcile >= self.reconcile_interval:
+                    await asyncio.to_thread(self.reconcile)
+                    last_reconcile = now
+            except Exception as e:
+                logger.error(f"User data stream maintenance error: {e}")
+    
+    def _keepalive(self):
+        self.weight_budget.acquire(LISTEN_KEY_WEIGHT)
+        self.client.stream_keepalive(self.listen_key)
+    
+    def _get_listen_key(self) -> str:
+        self.weight_budget.acquire(LISTEN_KEY_WEIGHT)
+        return self.client.stream_get_listen_key()
@@ -0,0 +1,108 @@
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+INTERVAL_MS = {
+    '1m': 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000
+}
+
+CANDLE_FIELDS = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time']
+
+class CandleBuffer:
+    """Кольцевой буфер свечей в типизированных массивах
+    Каждое значение пишется дважды, в позицию i и i + capacity, поэтому
+    последние свечи всегда лежат непрерывным срезом и отдаются как
+    представления NumPy без копирования.
+    """
+    def __init__(self, capacity: int, symbol: Optional[str] = None, interval: Optional[str] = None):
+        self.capacity = capacity
+        self.symbol = symbol
+        self.interval = interval
+        self._data = {
+            field: np.zeros(2 * capacity, dtype=np.int64 if field.endswith('_time') else np.float64)
+            for field in CANDLE_FIELDS
+        }
+        self._end = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        return int(self._data['open_time'][self._end - 1]) if self._size else None
+
+    def append(self, open_time: int, open_: float, high: float, low: float, close: float,
+               volume: float, close_time: int) -> bool:
+        """Добавление свечи; свеча с тем же open_time обновляется на месте"""
+        values = (open_time, open_, high, low, close, volume, close_time)
+        last = self.last_open_time
+        if last is not None and open_time < last:
+            return False
+
+        if last is None or open_time > last:
+            if self._end == 2 * self.capacity:
+                self._end = self.capacity
+            self._end += 1
+            self._size = min(self._size + 1, self.capacity)
+
+        i = self._end - 1
+        mirror = i - self.capacity if i >= self.capacity else i + self.capacity
+        for field, value in zip(CANDLE_FIELDS, values):
+            column = self._data[field]
+            column[i] = value
+            column[mirror] = value
+        return last is None or open_time > last
+
+    def append_kline(self, kline: list) -> bool:
+        """Добавление свечи в формате REST API Binance"""
+        return self.append(
+            int(kline[0]), float(kline[1]), float(kline[2]), float(kline[3]),
+            float(kline[4]), float(kline[5]), int(kline[6])
+        )
+
+    def extend_klines(self, klines: list) -> int:
+        """Добавление пачки свечей REST API, возвращает число новых"""
+        return sum(self.append_kline(kline) for kline in klines)
+
+    def clear(self):
+        self._end = 0
+        self._size = 0
+
+    def view(self, field: str, n: Optional[int] = None) -> np.ndarray:
+        """Последние n значений поля без копирования"""
+        n = self._size if n is None else min(n, self._size)
+        view = self._data[field][self._end - n:self._end]
+        view.flags.writeable = False
+        return view
+
+    def arrays(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return {field: self.view(field, n) for field in CANDLE_FIELDS}
+
+    def to_frame(self, n: Optional[int] = None, copy: bool = False) -> pd.DataFrame:
+        """DataFrame последних n свечей
+        Без copy колонки - представления буфера только для чтения, они
+        актуальны до следующего append. Такие кадры - только для внутреннего
+        кода; наружу отдается копия (copy=True), которую можно хранить и менять.
+        """
+        arrays = self.arrays(n)
+        if copy:
+            arrays = {field: values.copy() for field, values in arrays.items()}
+        df = pd.DataFrame({
+            'timestamp': arrays['open_time'].view('datetime64[ms]'),
+            'open': arrays['open'],
+            'high': arrays['high'],
+            'low': arrays['low'],
+            'close': arrays['close'],
+            'volume': arrays['volume'],
+            'close_time': arrays['close_time']
+        }, copy=False)
+        df.attrs['symbol'] = self.symbol
+        df.attrs['interval'] = self.interval
+        return df
@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+from binance.exceptions import BinanceAPIException
+from requests.adapters import HTTPAdapter
+from exchanges.binance_client import ORDER_WEIGHT, QUERY_ORDER_WEIGHT
+from utils.logger import logger
+from utils.instrumentation import metrics
+
+# Этапы исполнения ордера, для каждого ведется гистограмма задержек
+LATENCY_STAGES = ('signal_to_send', 'send_to_ack', 'ack_to_fill')
+
+# Границы корзин гистограммы в миллисекундах
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Binance: ордер с таким newClientOrderId уже принят
+DUPLICATE_ORDER_CODE = -2010
+# Binance: ордер с таким client id не найден
+ORDER_NOT_FOUND_CODE = -2013
+
+# Результат проверки ордера, когда биржа не ответила ни ордером, ни -2013
+LOOKUP_FAILED = object()
+
+ORDER_LATENCY = metrics.histogram('order_latency_seconds', 'Order latency by stage', ['stage'])
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами"""
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+            self.count += 1
+            self.total += value_ms
+            self.max = max(self.max, value_ms)
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля по верхней границе корзины"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q / 100 * self.count
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return float(self.buckets[i]) if i < len(self.buckets) else self.max
+            return self.max
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max
+        }
+
+class ExecutionEngine:
+    """Асинхронное исполнение ордеров
+    Ордера отправляются из пула потоков через общее keep-alive соединение.
+    У каждого ордера свой newClientOrderId, поэтому повтор после сетевой
+    ошибки не создаст второй ордер. Задержки signal->send, send->ack и
+    ack->fill собираются по символам.
+    """
+    def __init__(self, binance, max_workers: int = 4, max_retries: int = 3, retry_delay: float = 0.2,
+                 client_id_prefix: str = 'bot'):
+        self.binance = binance
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.client_id_prefix = client_id_prefix
+        self.latencies: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self.retries = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='order')
+        self._awaiting_fill: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+        # Соединения с API переиспользуются всеми потоками пула
+        session = getattr(binance.client, 'session', None)
+        if session is not None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            session.mount('https://', adapter)
+
+        account = getattr(binance, 'account', None)
+        if account is not None:
+            account.listeners.append(self.on_execution_report)
+
+    def submit(self, symbol: str, side: str, quantity: float, signal_time: Optional[float] = None,
+               test: bool = False) -> Future:
+        """Постановка рыночного ордера в очередь на отправку"""
+        signal_time = time.monotonic() if signal_time is None else signal_time
+        client_order_id = self.new_client_order_id()
+        return self._pool.submit(self._place, symbol, side, quantity, client_order_id, signal_time, test)
+
+    def new_client_order_id(self) -> str:
+        # Binance допускает до 36 символов [a-zA-Z0-9-_]
+        return f"{self.client_id_prefix}-{uuid.uuid4().hex[:24]}"
+
+    def on_execution_report(self, event: dict):
+        """Исполнение ордера из потока данных аккаунта"""
+        if event.get('X') != 'FILLED':
+            return
+        with self._lock:
+            pending = self._awaiting_fill.pop(event.get('c'), None)
+        if pending is not None:
+            symbol, ack_time = pending
+            # Исполнение пришло раньше ответа на отправку
+            elapsed = 0.0 if ack_time is None else time.monotonic() - ack_time
+            self._observe(symbol, 'ack_to_fill', elapsed)
+
+    def latency_stats(self) -> Dict[str, Dict[str, dict]]:
+        """Сводка задержек по символам и этапам"""
+        return {
+            symbol: {stage: histogram.summary() for stage, histogram in stages.items()}
+            for symbol, stages in self.latencies.items()
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def _place(self, symbol: str, side: str, quantity: float, client_order_id: str,
+               signal_time: float, test: bool) -> dict:
+        params = {
+            'symbol': symbol,
+            'side': side,
+            'type': 'MARKET',
+            'quantity': quantity,
+            'newClientOrderId': client_order_id
+        }
+        send_time = time.monotonic()
+        self._observe(symbol, 'signal_to_send', send_time - signal_time)
+        # Ордер ждет исполнения с момента отправки: событие может прийти раньше ответа
+        if not test:
+            with self._lock:
+                self._awaiting_fill[client_order_id] = (symbol, None)
+
+        order = None
+        error = None
+        # Исход предыдущей отправки неизвестен: ордер мог быть принят биржей
+        unknown = False
+        for attempt in range(self.max_retries):
+            if unknown:
+                # Повторная отправка только если биржа подтвердила, что ордера нет:
+                # рыночный ордер исполняется сразу, и дубликат client id уже не отклоняется
+                found = self._find_order(symbol, client_order_id)
+                if found is None:
+                    unknown = False
+                elif found is not LOOKUP_FAILED:
+                    order = found
+                    break
+
+            if not unknown:
+                try:
+                    self.binance.weight_budget.acquire(ORDER_WEIGHT)
+                    if test:
+                        self.binance.client.create_test_order(**params)
+                        order = {'symbol': symbol, 'clientOrderId': client_order_id, 'status': 'TEST'}
+                    else:
+                        order = self.binance.client.create_order(**params)
+                    break
+                except BinanceAPIException as e:
+                    error = e
+                    # Дубликат, 5xx (в том числе 503 "execution status unknown") - ордер мог дойти
+                    if e.code != DUPLICATE_ORDER_CODE and e.status_code < 500:
+                        break
+                    unknown = not test
+                except Exception as e:
+                    error = e
+                    # Ответ не получен: ордер мог быть принят, проверяем по client id
+                    unknown = not test
+
+            if attempt + 1 < self.max_retries:
+                self.retries += 1
+                time.sleep(self.retry_delay * (2 ** attempt))
+
+        if order is None and unknown:
+            found = self._find_order(symbol, client_order_id)
+            if found is not None and found is not LOOKUP_FAILED:
+                order = found
+
+        ack_time = time.monotonic()
+        if order is None:
+            with self._lock:
+                self._awaiting_fill.pop(client_order_id, None)
+            # UNKNOWN: ордер мог быть исполнен, но проверить это не удалось
+            status = 'UNKNOWN' if unknown and found is LOOKUP_FAILED else 'FAILED'
+            logger.error(f"Order {client_order_id} for {symbol} {status.lower()}: {error}")
+            return {'symbol': symbol, 'side': side, 'client_order_id': client_order_id,
+                    'status': status, 'error': str(error)}
+
+        self._observe(symbol, 'send_to_ack', ack_time - send_time)
+        if not test:
+            filled = order.get('status') == 'FILLED'
+            with self._lock:
+                # Без записи исполнение уже учтено по событию из потока
+                pending = self._awaiting_fill.pop(client_order_id, None)
+                if pending is not None and not filled:
+                    self._awaiting_fill[client_order_id] = (symbol, ack_time)
+            if pending is not None and filled:
+                # Рыночный ордер исполнен к моменту ответа
+                self._observe(symbol, 'ack_to_fill', 0.0)
+
+        return {'symbol': symbol, 'side': side, 'client_order_id': client_order_id,
+                'status': order.get('status', 'NEW'), 'order': order}
+
+    def _find_order(self, symbol: str, client_order_id: str):
+        """Ордер по client id, None - биржа подтвердила, что его нет, LOOKUP_FAILED - неизвестно"""
+        try:
+            self.binance.weight_budget.acquire(QUERY_ORDER_WEIGHT)
+            return self.binance.client.get_order(symbol=symbol, origClientOrderId=client_order_id)
+        except BinanceAPIException as e:
+            if e.code == ORDER_NOT_FOUND_CODE:
+                return None
+            logger.warning(f"Order {client_order_id} lookup failed: {e.message}")
+            return LOOKUP_FAILED
+        except Exception as e:
+            logger.warning(f"Order {client_order_id} lookup failed: {e}")
+            return LOOKUP_FAILED
+
+    def _observe(self, symbol: str, stage: str, seconds: float):
+        stages = self.latencies.get(symbol)
+        if stages is None:
+            with self._lock:
+                stages = self.latencies.setdefault(
+                    symbol, {name: LatencyHistogram() for name in LATENCY_STAGES}
+                )
+        stages[stage].observe(seconds * 1000)
+        ORDER_LATENCY.observe(seconds, stage=stage)
@@ -0,0 +1,45 @@
+import threading
+import time
+from collections import deque
+from config.settings import settings
+
+class RequestWeightBudget:
+    """Бюджет веса запросов Binance на скользящем окне
+    Общий для всех потоков процесса: acquire блокирует вызывающий поток,
+    пока в окне не освободится нужный вес.
+    """
+    def __init__(self, max_weight: int = 1200, window: float = 60.0):
+        self.max_weight = max_weight
+        self.window = window
+        self.waits = 0
+        self._lock = threading.Lock()
+        self._requests = deque()
+        self._used = 0
+
+    @property
+    def used(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return self._used
+
+    def acquire(self, weight: int = 1):
+        """Резервирование веса запроса, с ожиданием при исчерпании бюджета"""
+        weight = min(weight, self.max_weight)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                if self._used + weight <= self.max_weight:
+                    self._requests.append((now, weight))
+                    self._used += weight
+                    return
+                delay = self._requests[0][0] + self.window - now
+                self.waits += 1
+            time.sleep(max(delay, 0.001))
+
+    def _expire(self, now: float):
+        while self._requests and self._requests[0][0] <= now - self.window:
+            self._used -= self._requests.popleft()[1]
+
+# Единый бюджет для всех клиентов Binance в процессе
+request_budget = RequestWeightBudget(settings.MAX_REQUEST_WEIGHT)
@@ -20,10 +20,19 @@ def run_web():
         reload=False
     )
 
+def run_multiprocess():
+    """Бот, ML-инференс и веб-сервер в отдельных процессах под супервизором"""
+    from core.supervisor import Supervisor, default_specs
+    Supervisor(default_specs()).run()
+
 if __name__ == "__main__":
     # Инициализация базы данных
     init_database()
     
+    if settings.RUNTIME_MODE == "multiprocess":
+        run_multiprocess()
+        raise SystemExit(0)
+    
     # Запуск бота в отдельном потоке
     bot_thread = threading.Thread(target=run_bot)
     bot_thread.daemon = True
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+import numpy as np
+from config.settings import settings
+from exchanges.candle_buffer import INTERVAL_MS, CANDLE_FIELDS
+from utils.logger import logger
+
+class CandleStore:
+    """Локальное хранилище свечей в SQLite с ключом (symbol, interval, open_time)
+    С биржи догружаются только недостающие закрытые свечи, история читается
+    одним запросом сразу в массивы NumPy.
+    """
+    def __init__(self, client, path: Optional[str] = None):
+        self.client = client
+        self.path = path or settings.CANDLE_STORE_PATH
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS candles (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                open_time INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                close_time INTEGER NOT NULL,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def get_range(self, symbol: str, interval: str):
+        """Первое и последнее время открытия сохраненных свечей"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MIN(open_time), MAX(open_time) FROM candles WHERE symbol = ? AND interval = ?",
+                (symbol, interval)
+            ).fetchone()
+
+    def sync(self, symbol: str, interval: str, start_ms: int, end_ms: Optional[int] = None) -> int:
+        """Догрузка недостающих свечей за период, возвращает число новых"""
+        now_ms = int(time.time() * 1000)
+        end_ms = min(end_ms or now_ms, now_ms)
+        first, last = self.get_range(symbol, interval)
+
+        if first is None:
+            return self._download(symbol, interval, start_ms, end_ms, now_ms)
+
+        inserted = 0
+        if start_ms < first:
+            inserted += self._download(symbol, interval, start_ms, first - 1, now_ms)
+
+        # Новая свеча закрывается не раньше, чем через интервал после последней
+        if last + 2 * INTERVAL_MS[interval] <= end_ms:
+            inserted += self._download(symbol, interval, last + 1, end_ms, now_ms)
+
+        return inserted
+
+    def _download(self, symbol: str, interval: str, start_ms: int, end_ms: int, now_ms: int) -> int:
+        klines = self.client.get_historical_klines(
+            symbol=symbol,
+            interval=interval,
+            start_str=start_ms,
+            end_str=end_ms
+        )
+        rows = [
+            (symbol, interval, int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), int(k[6]))
+            for k in klines
+            if int(k[6]) < now_ms
+        ]
+        if not rows:
+            return 0
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+        logger.info(f"Candle store: saved {len(rows)} {symbol} {interval} candles")
+        return len(rows)
+
+    def load(self, symbol: str, interval: str, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Свечи за период в виде массивов NumPy по полям"""
+        query = "SELECT open_time, open, high, low, close, volume, close_time FROM candles WHERE symbol = ? AND interval = ?"
+        params = [symbol, interval]
+        if start_ms is not None:
+            query += " AND open_time >= ?"
+            params.append(start_ms)
+        if end_ms is not None:
+            query += " AND open_time <= ?"
+            params.append(end_ms)
+        query += " ORDER BY open_time"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        # Транспонирование с копией: каждое поле - непрерывный массив
+        columns = np.array(rows, dtype=np.float64).reshape(len(rows), len(CANDLE_FIELDS)).T.copy()
+        candles = {field: columns[i] for i, field in enumerate(CANDLE_FIELDS)}
+        candles['open_time'] = candles['open_time'].astype(np.int64)
+        candles['close_time'] = candles['close_time'].astype(np.int64)
+        return candles
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from config.settings import settings
+from utils.logger import logger
+
+# Признаки, которые умеет считать конвейер
+FEATURES = (
+    'return', 'log_return', 'log_volume', 'rsi', 'macd', 'macd_signal', 'macd_hist',
+    'bb_percent', 'bb_width', 'volatility', 'hour_sin', 'hour_cos', 'weekday_sin', 'weekday_cos'
+)
+
+# Состояние EMA после каждой строки: хранится в кэше рядом с признаками,
+# чтобы новые строки продолжали рекурсию с того же значения
+STATE_COLUMNS = ('ema_gain', 'ema_loss', 'ema_fast', 'ema_slow', 'ema_signal')
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+def _ema(values: np.ndarray, alpha: float, init: Optional[float] = None) -> np.ndarray:
+    """EMA как pandas ewm(adjust=False); с init продолжает уже посчитанный ряд"""
+    if init is None or np.isnan(init):
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    series = pd.Series(np.concatenate(([init], values)))
+    return series.ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+def _rolling(values: np.ndarray, window: int, reduce) -> np.ndarray:
+    """Значение по каждому окну, выровненное по последней свече окна"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = reduce(sliding_window_view(values, window))
+    return result
+
+class FeatureSet:
+    """Объявленный набор признаков и параметры индикаторов
+    Хэш набора входит в имя файла кэша: при смене признаков или параметров
+    матрица считается заново.
+    """
+    def __init__(self, features: Sequence[str] = FEATURES, rsi_period: int = 14, macd_fast: int = 12,
+                 macd_slow: int = 26, macd_signal: int = 9, bb_window: int = 20, bb_std: float = 2.0,
+                 volatility_window: int = 20):
+        unknown = set(features) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown features: {sorted(unknown)}")
+        self.features = tuple(features)
+        self.rsi_period = rsi_period
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.bb_window = bb_window
+        self.bb_std = bb_std
+        self.volatility_window = volatility_window
+
+    @property
+    def params(self) -> dict:
+        return {
+            'features': list(self.features),
+            'rsi_period': self.rsi_period,
+            'macd': [self.macd_fast, self.macd_slow, self.macd_signal],
+            'bb': [self.bb_window, self.bb_std],
+            'volatility_window': self.volatility_window
+        }
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha1(json.dumps(self.params, sort_keys=True).encode()).hexdigest()[:12]
+
+    @property
+    def lookback(self) -> int:
+        """Строк истории перед новыми свечами, нужных скользящим окнам"""
+        return max(self.bb_window, self.volatility_window + 1)
+
+    @property
+    def warmup(self) -> int:
+        """Строк, после которых все EMA вышли из периода прогрева"""
+        return max(self.rsi_period, self.macd_slow + self.macd_signal, self.lookback)
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """Колонки файла кэша"""
+        return ('open_time',) + self.features + STATE_COLUMNS
+
+    def compute(self, candles: Dict[str, np.ndarray], start: int = 0, state: Optional[np.ndarray] = None,
+                offset: int = 0) -> np.ndarray:
+        """Строки кэша для свечей candles[start:] за один векторный проход
+        Свечи до start - контекст для скользящих окон, state - состояние EMA
+        после предыдущей строки, offset - номер первой новой строки в ряду.
+        """
+        close = np.asarray(candles['close'], dtype=np.float64)
+        volume = np.asarray(candles['volume'], dtype=np.float64)
+        open_time = np.asarray(candles['open_time'], dtype=np.int64)[start:]
+        index = offset + np.arange(len(close) - start)
+
+        previous = np.concatenate(([np.nan], close[:-1]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = close / previous - 1
+            log_returns = np.log(close / previous)
+
+        # Окна считаются по контексту и отрезаются до start; каждое окно
+        # считается отдельно, поэтому дописанные строки совпадают с полным пересчетом
+        middle = _rolling(close, self.bb_window, lambda w: w.mean(axis=1))[start:]
+        band = self.bb_std * _rolling(close, self.bb_window, lambda w: w.std(axis=1))[start:]
+        volatility = _rolling(log_returns, self.volatility_window, lambda w: w.std(axis=1, ddof=1))[start:]
+
+        state = np.full(len(STATE_COLUMNS), np.nan) if state is None else state
+        change = np.nan_to_num(close[start:] - previous[start:])
+        gain = _ema(np.where(change > 0, change, 0.0), 1 / self.rsi_period, state[0])
+        loss = _ema(np.where(change < 0, -change, 0.0), 1 / self.rsi_period, state[1])
+        fast = _ema(close[start:], 2 / (self.macd_fast + 1), state[2])
+        slow = _ema(close[start:], 2 / (self.macd_slow + 1), state[3])
+
+        # Прогрев как min_periods в библиотеке ta
+        macd = np.where(index >= max(self.macd_fast, self.macd_slow) - 1, fast - slow, np.nan)
+        signal = _ema(macd, 2 / (self.macd_signal + 1), state[4])
+        signal_out = np.where(index >= self.macd_slow + self.macd_signal - 2, signal, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+            bb_percent = (close[start:] - (middle - band)) / (2 * band)
+            bb_width = 2 * band / middle
+        rsi[index < self.rsi_period - 1] = np.nan
+
+        day_phase = 2 * np.pi * (open_time % DAY_MS) / DAY_MS
+        # 1 января 1970 года - четверг, сдвиг на 3 дня дает понедельник = 0
+        week_phase = 2 * np.pi * ((open_time // DAY_MS + 3) % 7) / 7
+        values = {
+            'return': returns[start:],
+            'log_return': log_returns[start:],
+            'log_volume': np.log1p(volume[start:]),
+            'rsi': rsi,
+            'macd': macd,
+            'macd_signal': signal_out,
+            'macd_hist': macd - signal_out,
+            'bb_percent': bb_percent,
+            'bb_width': bb_width,
+            'volatility': volatility,
+            'hour_sin': np.sin(day_phase),
+            'hour_cos': np.cos(day_phase),
+            'weekday_sin': np.sin(week_phase),
+            'weekday_cos': np.cos(week_phase)
+        }
+        return np.column_stack(
+            [open_time.astype(np.float64)] + [values[name] for name in self.features] + [gain, loss, fast, slow, signal]
+        )
+
+class FeaturePipeline:
+    """Кэш матриц признаков на диске по (symbol, interval, хэш набора)
+    Файл - строки float64 без заголовка, поэтому новые закрытые свечи
+    дописываются в конец без перезаписи истории, а чтение - это memmap.
+    Обучение и инференс читают одни и те же строки. Недописанная после
+    сбоя строка в конце файла при чтении пропускается, а удаляется только
+    при следующей записи.
+    """
+    def __init__(self, feature_set: Optional[FeatureSet] = None, path: Optional[str] = None):
+        self.feature_set = feature_set or FeatureSet()
+        self.path = path or settings.FEATURE_STORE_PATH
+        os.makedirs(self.path, exist_ok=True)
+        self.width = len(self.feature_set.columns)
+        # Запись в файлы кэша, включая обрезку недописанной строки
+        self._lock = threading.Lock()
+
+    def file_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.path, f"{symbol}_{interval}_{self.feature_set.key}.f64")
+
+    def transform(self, candles: Dict[str, np.ndarray]) -> np.ndarray:
+        """Матрица признаков для свечей без кэша (строки x признаки)"""
+        rows = self.feature_set.compute(candles)
+        return rows[:, 1:1 + len(self.feature_set.features)]
+
+    def get_range(self, symbol: str, interval: str):
+        """Первое и последнее время открытия строк в кэше"""
+        path = self.file_path(symbol, interval)
+        count, last_row = self._tail(path)
+        if not count:
+            return None, None
+        with open(path, 'rb') as f:
+            first = np.frombuffer(f.read(8), dtype=np.float64)[0]
+        return int(first), int(last_row[0])
+
+    def update(self, symbol: str, interval: str, candles: Dict[str, np.ndarray], rebuild: bool = False) -> int:
+        """Дописывание строк для свечей новее кэша, возвращает число новых строк
+        candles должны включать последнюю свечу кэша и lookback свечей перед
+        новыми; иначе кэш пересчитывается по переданным свечам.
+        """
+        with self._lock:
+            return self._update(symbol, interval, candles, rebuild)
+
+    def _update(self, symbol: str, interval: str, candles: Dict[str, np.ndarray], rebuild: bool) -> int:
+        path = self.file_path(symbol, interval)
+        count, last_row = self._tail(path, repair=True)
+        open_time = np.asarray(candles['open_time'], dtype=np.int64)
+        if not len(open_time):
+            return 0
+
+        if count >= self.feature_set.warmup and not rebuild:
+            first_new = int(np.searchsorted(open_time, int(last_row[0]), side='right'))
+            if first_new == len(open_time):
+                return 0
+            contiguous = first_new > 0 and open_time[first_new - 1] == int(last_row[0])
+            if contiguous and first_new >= self.feature_set.lookback:
+                context = first_new - self.feature_set.lookback
+                segment = {name: np.asarray(values)[context:] for name, values in candles.items()}
+                rows = self.feature_set.compute(segment, start=self.feature_set.lookback,
+                                                state=last_row[-len(STATE_COLUMNS):], offset=count)
+                self._write(path, rows, append=True)
+                return len(rows)
+            logger.warning(f"Feature cache {symbol} {interval}: candles do not continue the cache, rebuilding")
+
+        rows = self.feature_set.compute(candles)
+        self._write(path, rows, append=False)
+        return len(rows)
+
+    def load(self, symbol: str, interval: str, start_ms: Optional[int] = None,
+             end_ms: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(время открытия, матрица признаков) из кэша без копирования"""
+        path = self.file_path(symbol, interval)
+        count, _ = self._tail(path)
+        if not count:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(self.feature_set.features)))
+
+        rows = np.memmap(path, dtype=np.float64, mode='r', shape=(count, self.width))
+        open_time = rows[:, 0].astype(np.int64)
+        first = 0 if start_ms is None else int(np.searchsorted(open_time, start_ms, side='left'))
+        last = count if end_ms is None else int(np.searchsorted(open_time, end_ms, side='right'))
+        return open_time[first:last], rows[first:last, 1:1 + len(self.feature_set.features)]
+
+    def _tail(self, path: str, repair: bool = False) -> Tuple[int, Optional[np.ndarray]]:
+        """Число целых строк в файле и последняя строка
+        Недописанная строка не считается; repair обрезает ее, только под блокировкой записи.
+        """
+        if not os.path.exists(path):
+            return 0, None
+        row_size = self.width * 8
+        size = os.path.getsize(path)
+        count = size // row_size
+        if repair and size % row_size:
+            with open(path, 'r+b') as f:
+                f.truncate(count * row_size)
+        if not count:
+            return 0, None
+        with open(path, 'rb') as f:
+            f.seek((count - 1) * row_size)
+            return count, np.frombuffer(f.read(row_size), dtype=np.float64)
+
+    def _write(self, path: str, rows: np.ndarray, append: bool):
+        with open(path, 'ab' if append else 'wb') as f:
+            f.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
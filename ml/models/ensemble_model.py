@@ -0,0 +1,169 @@
+from typing import Callable, Dict, Optional, Sequence
+import numpy as np
+import joblib
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline, make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+from ml.features.feature_engineering import FeatureSet
+from utils.logger import logger
+
+def default_members() -> Dict[str, object]:
+    """Участники ансамбля по умолчанию: линейная модель и два леса неглубоких деревьев"""
+    return {
+        'ridge': make_pipeline(StandardScaler(), Ridge(alpha=1.0)),
+        'extra_trees': ExtraTreesRegressor(n_estimators=50, max_depth=8, min_samples_leaf=20, random_state=42),
+        'random_forest': RandomForestRegressor(n_estimators=50, max_depth=8, min_samples_leaf=20,
+                                               max_features=0.5, random_state=42)
+    }
+
+def _fit_member(name: str, estimator, X: np.ndarray, y: np.ndarray):
+    return name, estimator.fit(X, y)
+
+def _compile(estimator) -> Callable[[np.ndarray], np.ndarray]:
+    """Функция прогноза обученной модели формы (строки, выходы)
+    predict в sklearn проверяет вход и запускает деревья через joblib, что
+    для одной строки стоит миллисекунды. Линейная модель со стандартизацией
+    сворачивается в одно матричное умножение, лес - в проход по деревьям.
+    """
+    steps = [step for _, step in estimator.steps] if isinstance(estimator, Pipeline) else [estimator]
+    *scalers, final = steps
+    if hasattr(final, 'coef_') and all(isinstance(step, StandardScaler) for step in scalers):
+        coef = np.atleast_2d(final.coef_).astype(np.float64)
+        intercept = np.atleast_1d(final.intercept_).astype(np.float64)
+        for scaler in reversed(scalers):
+            scale = scaler.scale_ if scaler.scale_ is not None else 1.0
+            mean = scaler.mean_ if scaler.mean_ is not None else 0.0
+            coef = coef / scale
+            intercept = intercept - coef @ np.broadcast_to(mean, coef.shape[1:])
+        return lambda X: X @ coef.T + intercept
+
+    trees = getattr(estimator, 'estimators_', None)
+    if isinstance(trees, list) and trees and all(isinstance(tree, DecisionTreeRegressor) for tree in trees):
+        nodes = [tree.tree_ for tree in trees]
+
+        def forest(X):
+            # Деревья sklearn работают в float32, как и внутри predict
+            X32 = np.ascontiguousarray(X, dtype=np.float32)
+            total = nodes[0].predict(X32)
+            for node in nodes[1:]:
+                total = total + node.predict(X32)
+            return total.reshape(len(X32), -1) / len(nodes)
+        return forest
+
+    return lambda X: np.asarray(estimator.predict(X), dtype=np.float64).reshape(len(X), -1)
+
+class EnsemblePricePredictor:
+    """Ансамбль регрессоров sklearn над признаками FeaturePipeline
+    Модели прогнозируют лог-доходность на каждом горизонте по последней
+    строке признаков и обучаются параллельно, по процессу на модель.
+    Веса ансамбля обратно пропорциональны ошибке на последних строках.
+    Интерфейс совпадает с LSTMPricePredictor, но на вход вместо окна
+    цен подаются строки признаков и текущие цены.
+    """
+    name = 'ensemble'
+
+    def __init__(self, horizons: Sequence[int] = (1,), feature_set: Optional[FeatureSet] = None,
+                 members: Optional[Dict[str, object]] = None, n_jobs: int = -1):
+        # Горизонты прогноза в свечах, по одному выходу на горизонт
+        self.horizons = tuple(horizons)
+        self.feature_set = feature_set or FeatureSet()
+        self.members = members or default_members()
+        self.n_jobs = n_jobs
+        self.weights: Dict[str, float] = {}
+        self.validation_scores: Dict[str, float] = {}
+        self._predict: Dict[str, Callable] = {}
+
+    @property
+    def sequence_length(self) -> int:
+        """Свечей истории для первой полной строки признаков"""
+        return self.feature_set.warmup + 1
+
+    def prepare_data(self, features, closes):
+        """Обучающие строки: X - признаки свечи, y - лог-доходности до каждого горизонта
+        Строки прогрева с NaN и последние строки без известного будущего отбрасываются.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        log_close = np.log(np.asarray(closes, dtype=np.float64))
+        n_samples = len(log_close) - max(self.horizons)
+        if n_samples <= 0:
+            return features[:0], np.empty((0, len(self.horizons)))
+
+        X = features[:n_samples]
+        y = np.column_stack([log_close[h:h + n_samples] - log_close[:n_samples] for h in self.horizons])
+        valid = np.isfinite(X).all(axis=1) & np.isfinite(y).all(axis=1)
+        return X[valid], y[valid]
+
+    def train(self, features, closes, validation_split=0.1):
+        """Обучение моделей, возвращает ошибку каждой модели на валидации"""
+        X, y = self.prepare_data(features, closes)
+        # Хронологическое разделение: валидация на последних строках
+        split = int(len(X) * (1 - validation_split))
+        if split == 0:
+            raise ValueError("Not enough feature rows to train the ensemble")
+        # Один горизонт - одномерная цель, иначе sklearn предупреждает о форме y
+        target = y[:split, 0] if y.shape[1] == 1 else y[:split]
+
+        fitted = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_member)(name, clone(estimator), X[:split], target)
+            for name, estimator in self.members.items()
+        )
+        self.members = dict(fitted)
+        self._compile()
+
+        if split < len(X):
+            self.validation_scores = {
+                name: float(np.mean((predict(X[split:]) - y[split:]) ** 2))
+                for name, predict in self._predict.items()
+            }
+            inverse = {name: 1 / max(score, 1e-12) for name, score in self.validation_scores.items()}
+        else:
+            self.validation_scores = {}
+            inverse = {name: 1.0 for name in self.members}
+        total = sum(inverse.values())
+        self.weights = {name: value / total for name, value in inverse.items()}
+
+        logger.info(f"Ensemble trained on {split} rows, weights: "
+                    + ", ".join(f"{name}={weight:.2f}" for name, weight in self.weights.items()))
+        return self.validation_scores
+
+    def predict(self, features, current_price):
+        """Предсказание по последней строке признаков"""
+        features = np.asarray(features, dtype=np.float64)
+        return self.predict_batch(features.reshape(-1, features.shape[-1])[-1:], [current_price])[0, 0]
+
+    def predict_batch(self, features, current_prices):
+        """Предсказание для пачки символов (batch, признаки) за один вызов каждой модели
+        Возвращает цены формы (batch, len(horizons)).
+        """
+        X = np.asarray(features, dtype=np.float64)
+        returns = np.zeros((len(X), len(self.horizons)))
+        for name, predict in self._predict.items():
+            returns += self.weights[name] * predict(X)
+        return np.asarray(current_prices, dtype=np.float64)[:, np.newaxis] * np.exp(returns)
+
+    def save_model(self, filepath):
+        """Сохранение модели"""
+        joblib.dump({
+            'horizons': self.horizons,
+            'feature_set': self.feature_set,
+            'members': self.members,
+            'weights': self.weights,
+            'validation_scores': self.validation_scores
+        }, f"{filepath}_model.pkl")
+
+    def load_model(self, filepath):
+        """Загрузка модели"""
+        state = joblib.load(f"{filepath}_model.pkl")
+        self.horizons = state['horizons']
+        self.feature_set = state['feature_set']
+        self.members = state['members']
+        self.weights = state['weights']
+        self.validation_scores = state['validation_scores']
+        self._compile()
+
+    def _compile(self):
+        self._predict = {name: _compile(estimator) for name, estimator in self.members.items()}
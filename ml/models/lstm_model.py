@@ -1,5 +1,7 @@
 import numpy as np
 import pandas as pd
+import tensorflow as tf
+from numpy.lib.stride_tricks import sliding_window_view
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.optimizers import Adam
@@ -7,10 +9,14 @@ from sklearn.preprocessing import MinMaxScaler
 import joblib
 
 class LSTMPricePredictor:
-    def __init__(self, sequence_length=60, epochs=50, batch_size=32):
+    name = 'lstm'
+    
+    def __init__(self, sequence_length=60, epochs=50, batch_size=32, horizons=(1,)):
         self.sequence_length = sequence_length
         self.epochs = epochs
         self.batch_size = batch_size
+        # Горизонты прогноза в свечах, по одному выходу модели на горизонт
+        self.horizons = tuple(horizons)
         self.model = None
         self.scaler = MinMaxScaler()
         self._build_model()
@@ -24,7 +30,7 @@ class LSTMPricePredictor:
             Dropout(0.2),
             LSTM(50),
             Dropout(0.2),
-            Dense(1)
+            Dense(len(self.horizons))
         ])
         
         self.model.compile(
@@ -34,27 +40,49 @@ class LSTMPricePredictor:
         )
     
     def prepare_data(self, data):
-        """Подготовка данных для обучения"""
-        scaled_data = self.scaler.fit_transform(data.reshape(-1, 1))
-        X, y = [], []
-        for i in range(self.sequence_length, len(scaled_data)):
-            X.append(scaled_data[i-self.sequence_length:i, 0])
-            y.append(scaled_data[i, 0])
+        """Подготовка данных для обучения
+        X - представление (view) скользящих окон над одним масштабированным
+        массивом, окна не копируются. y - цены на каждом горизонте.
+        """
+        scaled_data = self.scaler.fit_transform(data.reshape(-1, 1)).astype(np.float32).ravel()
+        max_horizon = max(self.horizons)
+        n_samples = len(scaled_data) - self.sequence_length - max_horizon + 1
         
-        X, y = np.array(X), np.array(y)
-        X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+        X = sliding_window_view(scaled_data, self.sequence_length)[:n_samples, :, np.newaxis]
+        targets = sliding_window_view(scaled_data[self.sequence_length:], max_horizon)
+        y = targets[:, [h - 1 for h in self.horizons]]
         
         return X, y
     
-    def train(self, data):
+    def make_dataset(self, X, y, shuffle=False):
+        """tf.data конвейер, собирающий пачки из окон по требованию"""
+        n_batches = int(np.ceil(len(X) / self.batch_size))
+        
+        def batches():
+            order = np.random.permutation(len(X)) if shuffle else np.arange(len(X))
+            for start in range(0, len(X), self.batch_size):
+                index = order[start:start + self.batch_size]
+                yield X[index], y[index]
+        
+        dataset = tf.data.Dataset.from_generator(batches, output_signature=(
+            tf.TensorSpec(shape=(None, self.sequence_length, 1), dtype=tf.float32),
+            tf.TensorSpec(shape=(None, len(self.horizons)), dtype=tf.float32)
+        ))
+        return dataset.apply(tf.data.experimental.assert_cardinality(n_batches)).prefetch(2)
+    
+    def train(self, data, validation_split=0.1):
         """Обучение модели"""
         X, y = self.prepare_data(data)
         
+        # Хронологическое разделение: валидация на последних окнах
+        split = int(len(X) * (1 - validation_split))
+        train_dataset = self.make_dataset(X[:split], y[:split], shuffle=True)
+        validation_dataset = self.make_dataset(X[split:], y[split:]) if split < len(X) else None
+        
         history = self.model.fit(
-            X, y,
+            train_dataset,
             epochs=self.epochs,
-            batch_size=self.batch_size,
-            validation_split=0.1,
+            validation_data=validation_dataset,
             verbose=1
         )
         
@@ -62,12 +90,18 @@ class LSTMPricePredictor:
     
     def predict(self, data):
         """Предсказание"""
-        scaled_data = self.scaler.transform(data[-self.sequence_length:].reshape(-1, 1))
-        X = np.array([scaled_data])
-        X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+        return self.predict_batch(np.asarray(data)[-self.sequence_length:].reshape(1, -1))[0, 0]
+    
+    def predict_batch(self, windows):
+        """Предсказание для пачки окон (batch, sequence_length) за один проход модели
+        Возвращает цены формы (batch, len(horizons)).
+        """
+        windows = np.asarray(windows, dtype=np.float64)
+        scaled = self.scaler.transform(windows.reshape(-1, 1)).reshape(windows.shape[0], windows.shape[1], 1)
         
-        prediction = self.model.predict(X, verbose=0)
-        return self.scaler.inverse_transform(prediction)[0, 0]
+        # Прямой вызов модели дешевле model.predict для небольших пачек
+        prediction = np.asarray(self.model(scaled, training=False))
+        return self.scaler.inverse_transform(prediction.reshape(-1, 1)).reshape(prediction.shape)
     
     def save_model(self, filepath):
         """Сохранение модели"""
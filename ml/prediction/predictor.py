@@ -1,14 +1,57 @@
+import os
+import threading
+import time
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from ml.models.lstm_model import LSTMPricePredictor
+from typing import Dict, List, Optional
 from exchanges.binance_client import BinanceClient
+from ml.data.data_loader import CandleStore, INTERVAL_MS
+from ml.features.feature_engineering import FeaturePipeline
+from utils.instrumentation import metrics, errors
+from utils.logger import logger
+
+INFERENCE_LATENCY = metrics.histogram('ml_inference_duration_seconds', 'Model inference duration per batch', ['model'])
+PREDICTION_CACHE = metrics.counter('ml_prediction_cache_total', 'Prediction cache lookups', ['result'])
+
+# Ключ общей для всех символов модели в PricePredictor.models
+SHARED_MODEL = '*'
 
 class PricePredictor:
-    def __init__(self):
-        self.lstm_model = LSTMPricePredictor()
-        self.binance = BinanceClient()
-        self.is_trained = False
+    # Интервал свечей, на котором обучается модель
+    model_interval = '1h'
+
+    def __init__(self, model_factory=None, binance=None, candle_store=None, feature_pipeline=None,
+                 retry_interval: float = 300):
+        if model_factory is None:
+            # TensorFlow нужен только при создании модели
+            from ml.models.lstm_model import LSTMPricePredictor
+            model_factory = LSTMPricePredictor
+        self.model_factory = model_factory
+        # Модели по ключу model_key: символ или SHARED_MODEL
+        self.models: Dict[str, object] = {}
+        # Образец задает имя, горизонты и вход модели; его получает первая модель
+        self.prototype = model_factory()
+        self._prototype_free = True
+        # Имя модели в путях сохранения и метриках; модели с feature_set получают на вход признаки
+        self.model_name = getattr(self.prototype, 'name', 'lstm')
+        self.uses_features = getattr(self.prototype, 'feature_set', None) is not None
+        # Модель на признаках прогнозирует лог-доходность и не зависит от масштаба цен,
+        # поэтому она одна на все символы; LSTM масштабирует цены, у символа своя модель
+        self.shared = self.uses_features
+        self.binance = binance or BinanceClient()
+        self.candle_store = candle_store or CandleStore(self.binance.client)
+        self._feature_pipeline = feature_pipeline
+        self._models_lock = threading.Lock()
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+        # Фоновые загрузки и обучения моделей по ключу и время последней ошибки
+        self._loading: Dict[str, threading.Thread] = {}
+        self._failed_at: Dict[str, float] = {}
+        self.retry_interval = retry_interval
+        # Кэш прогнозов: symbol -> (время открытия последней закрытой свечи, цены по горизонтам)
+        self.prediction_cache: Dict[str, tuple] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def fetch_historical_data(self, symbol, days=30):
         """Получение исторических данных"""
@@ -16,56 +59,242 @@ class PricePredictor:
         start_time = end_time - timedelta(days=days)
         start_timestamp = int(start_time.timestamp() * 1000)
         end_timestamp = int(end_time.timestamp() * 1000)
-        klines = self.binance.client.get_historical_klines(
-            symbol=symbol,
-            interval='1h',
-            start_str=start_timestamp,
-            end_str=end_timestamp
-        )
         
-        df = pd.DataFrame(klines, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'number_of_trades',
-            'taker_buy_base_volume', 'taker_buy_quote_volume', 'ignore'
-        ])
+        # С биржи загружаются только свечи, которых еще нет в локальном хранилище
+        self.candle_store.sync(symbol, '1h', start_timestamp, end_timestamp)
+        candles = self.candle_store.load(symbol, '1h', start_ms=start_timestamp)
+        return candles['close']
+    
+    @property
+    def feature_pipeline(self) -> FeaturePipeline:
+        if self._feature_pipeline is None:
+            self._feature_pipeline = FeaturePipeline(getattr(self.prototype, 'feature_set', None))
+        return self._feature_pipeline
+    
+    def get_features(self, symbol, days=90):
+        """Время открытия и матрица признаков закрытых свечей за период
+        Обучение и инференс читают один кэш: считаются только строки для
+        свечей, закрытых после последнего обновления.
+        """
+        end_ms = int(time.time() * 1000)
+        start_ms = end_ms - days * 24 * 60 * 60 * 1000
+        self.update_features(symbol, start_ms, end_ms)
+        return self.feature_pipeline.load(symbol, self.model_interval, start_ms=start_ms)
+    
+    def update_features(self, symbol, start_ms, end_ms):
+        """Догрузка свечей и дописывание кэша признаков, возвращает прочитанные свечи"""
+        interval_ms = INTERVAL_MS[self.model_interval]
+        self.candle_store.sync(symbol, self.model_interval, start_ms, end_ms)
         
-        df['close'] = pd.to_numeric(df['close'])
-        return df['close'].values
+        first, last = self.feature_pipeline.get_range(symbol, self.model_interval)
+        # Кэш, который не покрывает начало периода, пересчитывается целиком
+        rebuild = first is None or first > start_ms + interval_ms
+        load_from = start_ms if rebuild else last - self.feature_pipeline.feature_set.lookback * interval_ms
+        candles = self.candle_store.load(symbol, self.model_interval, start_ms=load_from, end_ms=end_ms)
+        self.feature_pipeline.update(symbol, self.model_interval, candles, rebuild=rebuild)
+        return candles
+    
+    def model_key(self, symbol):
+        """Ключ модели символа в self.models"""
+        return SHARED_MODEL if self.shared else symbol
+    
+    def new_model(self):
+        """Необученная модель для очередного ключа"""
+        with self._models_lock:
+            if self._prototype_free:
+                self._prototype_free = False
+                return self.prototype
+        return self.model_factory()
     
-    def train_model(self, symbol):
-        """Обучение модели"""
+    def train_model(self, symbol, model=None):
+        """Обучение модели символа; общая модель обучается на истории symbol"""
         print(f"Training model for {symbol}...")
         
-        historical_prices = self.fetch_historical_data(symbol, days=90)
-        
-        self.lstm_model.train(historical_prices)
-        self.is_trained = True
-        self.lstm_model.save_model(f"models/{symbol.lower()}_lstm")
+        model = model or self.new_model()
+        if self.uses_features:
+            open_time, features = self.get_features(symbol, days=90)
+            candles = self.candle_store.load(symbol, self.model_interval, start_ms=open_time[0], end_ms=open_time[-1])
+            # Цены закрытия тех же свечей, что и строки признаков
+            index = np.minimum(np.searchsorted(candles['open_time'], open_time), len(candles['open_time']) - 1)
+            aligned = candles['open_time'][index] == open_time
+            model.train(np.asarray(features)[aligned], candles['close'][index[aligned]])
+        else:
+            historical_prices = self.fetch_historical_data(symbol, days=90)
+            model.train(historical_prices)
+        os.makedirs(os.path.dirname(self.model_path(symbol)), exist_ok=True)
+        model.save_model(self.model_path(symbol))
+        self.models[self.model_key(symbol)] = model
         
         print("Model training completed!")
+        return model
     
-    def predict_next_price(self, symbol, current_price=None):
-        """Предсказание следующей цены"""
-        if not self.is_trained:
+    def load_or_train(self, symbol):
+        """Модель символа: загруженная ранее, сохраненная на диске или обученная"""
+        key = self.model_key(symbol)
+        model = self.models.get(key)
+        if model is not None:
+            return model
+        # Блокировка по ключу: модель не обучается дважды, а другие модели не ждут обучения
+        with self._models_lock:
+            lock = self._symbol_locks.setdefault(key, threading.Lock())
+        with lock:
+            model = self.models.get(key)
+            if model is not None:
+                return model
+            model = self.new_model()
             try:
-                self.lstm_model.load_model(f"models/{symbol.lower()}_lstm")
-                self.is_trained = True
+                model.load_model(self.model_path(symbol))
+                self.models[key] = model
+                return model
             except:
                 print("Model not found, training...")
-                self.train_model(symbol)
+                return self.train_model(symbol, model)
+    
+    def ready_model(self, symbol):
+        """Готовая модель символа или None
+        Модели нет в памяти - ее загрузка или обучение запускается в фоне,
+        чтобы прогноз не блокировал тик стратегии и цикл инференса.
+        """
+        key = self.model_key(symbol)
+        model = self.models.get(key)
+        if model is not None:
+            return model
+        with self._models_lock:
+            if key in self._loading:
+                return None
+            # После ошибки повторная попытка не чаще retry_interval
+            failed_at = self._failed_at.get(key)
+            if failed_at is not None and time.monotonic() - failed_at < self.retry_interval:
+                return None
+            thread = threading.Thread(target=self._load_in_background, args=(symbol,),
+                                      name=f"model-{key}", daemon=True)
+            self._loading[key] = thread
+        thread.start()
+        return None
+    
+    def wait_model(self, symbol, timeout: Optional[float] = None):
+        """Ожидание фоновой загрузки модели символа"""
+        thread = self._loading.get(self.model_key(symbol))
+        if thread is not None:
+            thread.join(timeout)
+        return self.models.get(self.model_key(symbol))
+    
+    def _load_in_background(self, symbol):
+        key = self.model_key(symbol)
+        try:
+            self.load_or_train(symbol)
+            with self._models_lock:
+                self._failed_at.pop(key, None)
+        except Exception as e:
+            errors.inc(component='ml')
+            logger.error(f"Failed to load {self.model_name} model for {symbol}: {e}")
+            with self._models_lock:
+                self._failed_at[key] = time.monotonic()
+        finally:
+            with self._models_lock:
+                del self._loading[key]
+    
+    def model_path(self, symbol):
+        if self.shared:
+            return f"models/{self.model_name}"
+        return f"models/{symbol.lower()}_{self.model_name}"
+    
+    def last_closed_candle_time(self, now_ms=None) -> int:
+        """Время открытия последней закрытой свечи интервала модели"""
+        interval_ms = INTERVAL_MS[self.model_interval]
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return (now_ms // interval_ms - 1) * interval_ms
+    
+    def get_input_window(self, symbol, candle_time):
+        """Последние sequence_length закрытых свечей, заканчивая candle_time"""
+        interval_ms = INTERVAL_MS[self.model_interval]
+        start_ms = candle_time - (self.prototype.sequence_length - 1) * interval_ms
+        self.candle_store.sync(symbol, self.model_interval, start_ms, candle_time + interval_ms)
+        closes = self.candle_store.load(symbol, self.model_interval, start_ms=start_ms, end_ms=candle_time)['close']
+        return closes if len(closes) == self.prototype.sequence_length else None
+    
+    def get_feature_input(self, symbol, candle_time):
+        """Строка признаков и цена закрытия свечи candle_time из кэша признаков"""
+        interval_ms = INTERVAL_MS[self.model_interval]
+        start_ms = candle_time - self.feature_pipeline.feature_set.warmup * interval_ms
+        candles = self.update_features(symbol, start_ms, candle_time + interval_ms)
+        if not len(candles['open_time']) or candles['open_time'][-1] != candle_time:
+            return None
+        _, rows = self.feature_pipeline.load(symbol, self.model_interval, start_ms=candle_time, end_ms=candle_time)
+        if len(rows) != 1 or not np.isfinite(rows[0]).all():
+            return None
+        return np.array(rows[0]), candles['close'][-1]
+    
+    def get_model_input(self, symbol, candle_time):
+        """Вход модели для символа: окно цен или строка признаков с ценой"""
+        if self.uses_features:
+            return self.get_feature_input(symbol, candle_time)
+        return self.get_input_window(symbol, candle_time)
+    
+    def predict_many(self, symbols: List[str]) -> Dict[str, np.ndarray]:
+        """Прогноз по всем горизонтам для нескольких символов
+        Результат кэшируется до закрытия следующей свечи. Символы без
+        актуального прогноза считаются пачкой по каждой модели: общая
+        модель на признаках считает все символы одним проходом, у LSTM
+        своя модель на символ, и пачка состоит из одного символа.
+        """
+        candle_time = self.last_closed_candle_time()
+        predictions = {}
+        pending = []
+        for symbol in symbols:
+            cached = self.prediction_cache.get(symbol)
+            if cached is not None and cached[0] == candle_time:
+                self.cache_hits += 1
+                PREDICTION_CACHE.inc(result='hit')
+                predictions[symbol] = cached[1]
+            else:
+                self.cache_misses += 1
+                PREDICTION_CACHE.inc(result='miss')
+                pending.append(symbol)
         
-        if current_price is None:
-            historical_prices = self.fetch_historical_data(symbol, days=3)
-        else:
-            historical_prices = np.array([current_price])
+        if not pending:
+            return predictions
+        
+        # Пачки по моделям: id модели -> (модель, {символ: вход})
+        groups: Dict[int, tuple] = {}
+        for symbol in pending:
+            # Символ без готовой модели пропускается до окончания фоновой загрузки
+            model = self.ready_model(symbol)
+            if model is None:
+                continue
+            model_input = self.get_model_input(symbol, candle_time)
+            if model_input is None:
+                continue
+            groups.setdefault(id(model), (model, {}))[1][symbol] = model_input
         
-        predicted_price = self.lstm_model.predict(historical_prices)
-        return predicted_price
+        for model, inputs in groups.values():
+            with INFERENCE_LATENCY.time(model=self.model_name):
+                if self.uses_features:
+                    features, closes = zip(*inputs.values())
+                    batch = model.predict_batch(np.stack(features), np.array(closes))
+                else:
+                    batch = model.predict_batch(np.stack(list(inputs.values())))
+            for symbol, prices in zip(inputs, batch):
+                self.prediction_cache[symbol] = (candle_time, prices)
+                predictions[symbol] = prices
+        
+        return predictions
+    
+    def predict_next_price(self, symbol, current_price=None):
+        """Предсказание следующей цены"""
+        predictions = self.predict_many([symbol])
+        if symbol not in predictions:
+            raise ValueError(f"Not enough {self.model_interval} history for {symbol}")
+        return predictions[symbol][0]
     
     def get_trend_signal(self, symbol, current_price):
-        """Получение сигнала тренда"""
+        """Получение сигнала тренда; HOLD, пока модель символа загружается"""
+        if self.ready_model(symbol) is None:
+            return self.hold_signal(current_price)
         try:
+            # Прогноз пересчитывается только после закрытия новой свечи
             predicted_price = self.predict_next_price(symbol, current_price)
+            horizon_prices = self.prediction_cache[symbol][1]
             change_percent = ((predicted_price - current_price) / current_price) * 100
             
             if change_percent > 1.0:  # Рост более 1%
@@ -88,16 +317,24 @@ class PricePredictor:
                 'signal': signal,
                 'confidence': round(confidence, 2),
                 'predicted_price': round(predicted_price, 2),
+                'horizon_predictions': {
+                    horizon: round(float(price), 2)
+                    for horizon, price in zip(self.prototype.horizons, horizon_prices)
+                },
                 'current_price': round(current_price, 2),
                 'change_percent': round(change_percent, 2)
             }
             
         except Exception as e:
             print(f"Error in trend prediction: {e}")
-            return {
-                'signal': 'HOLD',
-                'confidence': 0.0,
-                'predicted_price': current_price,
-                'current_price': current_price,
-                'change_percent': 0.0
-            }
\ No newline at end of file
+            return self.hold_signal(current_price)
+    
+    def hold_signal(self, current_price):
+        """Сигнал без прогноза"""
+        return {
+            'signal': 'HOLD',
+            'confidence': 0.0,
+            'predicted_price': current_price,
+            'current_price': current_price,
+            'change_percent': 0.0
+        }
\ No newline at end of file
@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+from utils.logger import logger
+from utils.helpers import memory_usage_mb
+from utils.instrumentation import metrics, errors
+
+LOAD_TIME = metrics.gauge('ml_predictor_load_seconds', 'Time to build and load a predictor', ['name'])
+
+def _lstm_predictor(binance=None):
+    # TensorFlow импортируется только здесь, при первой загрузке модели
+    from ml.prediction.predictor import PricePredictor
+    return PricePredictor(binance=binance)
+
+def _ensemble_predictor(binance=None):
+    from ml.models.ensemble_model import EnsemblePricePredictor
+    from ml.prediction.predictor import PricePredictor
+    return PricePredictor(model_factory=EnsemblePricePredictor, binance=binance)
+
+class PredictorRegistry:
+    """Общие для процесса ML-предикторы
+    Каждый предиктор создается один раз и загружается в фоновом потоке:
+    пока модель не готова, get_ready возвращает None, а правила торгуют.
+    """
+    def __init__(self, factories: Optional[Dict[str, Callable]] = None, retry_interval: float = 300):
+        self.factories = dict(factories or {'lstm': _lstm_predictor, 'ensemble': _ensemble_predictor})
+        self.retry_interval = retry_interval
+        self.load_times: Dict[str, float] = {}
+        self._predictors: Dict[str, object] = {}
+        self._loading: Dict[str, threading.Thread] = {}
+        self._failed_at: Dict[str, float] = {}
+        # Аргументы фабрики из первого load_async, повторные попытки используют их же
+        self._kwargs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable):
+        with self._lock:
+            self.factories[name] = factory
+
+    def load_async(self, name: str = 'lstm', symbol: Optional[str] = None, **kwargs) -> Optional[threading.Thread]:
+        """Запуск фоновой загрузки, если предиктор еще не загружен и не загружается"""
+        with self._lock:
+            if kwargs:
+                self._kwargs.setdefault(name, kwargs)
+            kwargs = self._kwargs.get(name, {})
+            if name in self._predictors:
+                return None
+            if name in self._loading:
+                return self._loading[name]
+            # После ошибки повторная попытка не чаще retry_interval
+            failed_at = self._failed_at.get(name)
+            if failed_at is not None and time.monotonic() - failed_at < self.retry_interval:
+                return None
+
+            thread = threading.Thread(target=self._load, args=(name, symbol, kwargs),
+                                      name=f"predictor-{name}", daemon=True)
+            self._loading[name] = thread
+        thread.start()
+        return thread
+
+    def get(self, name: str = 'lstm', symbol: Optional[str] = None, timeout: Optional[float] = None, **kwargs):
+        """Предиктор с ожиданием загрузки"""
+        thread = self.load_async(name, symbol, **kwargs)
+        if thread is not None:
+            thread.join(timeout)
+        return self.get_ready(name)
+
+    def get_ready(self, name: str = 'lstm'):
+        """Загруженный предиктор или None"""
+        return self._predictors.get(name)
+
+    def is_loading(self, name: str = 'lstm') -> bool:
+        return name in self._loading
+
+    def _load(self, name: str, symbol: Optional[str], kwargs: dict):
+        started = time.perf_counter()
+        try:
+            predictor = self.factories[name](**kwargs)
+            if symbol is not None and hasattr(predictor, 'load_or_train'):
+                predictor.load_or_train(symbol)
+        except Exception as e:
+            errors.inc(component='ml')
+            logger.error(f"Failed to load predictor {name}: {e}")
+            with self._lock:
+                self._failed_at[name] = time.monotonic()
+                del self._loading[name]
+            return
+
+        with self._lock:
+            self._predictors[name] = predictor
+            self.load_times[name] = time.perf_counter() - started
+            self._failed_at.pop(name, None)
+            del self._loading[name]
+        LOAD_TIME.set(self.load_times[name], name=name)
+        logger.info(f"Predictor {name} loaded in {self.load_times[name]:.2f}s, RSS {memory_usage_mb():.1f} MB")
+
+# Общий реестр процесса: одна модель и один клиент биржи на всех потребителей
+predictor_registry = PredictorRegistry()
@@ -1,11 +1,17 @@
 import pandas as pd
 from strategies.base_strategy import BaseStrategy
-from ml.prediction.predictor import PricePredictor
+from ml.prediction.registry import predictor_registry
+from config.settings import settings
 
 class MLStrategy(BaseStrategy):
-    def __init__(self):
+    def __init__(self, registry=None, predictor_name: str = 'lstm'):
         super().__init__("ML Strategy")
-        self.predictor = PricePredictor()
+        self.registry = registry or predictor_registry
+        self.predictor_name = predictor_name
+
+    @property
+    def predictor(self):
+        return self.registry.get_ready(self.predictor_name)
     
     def get_required_indicators(self) -> list:
         return ['ml_prediction']
@@ -15,9 +21,15 @@ class MLStrategy(BaseStrategy):
             return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
         
         current_price = data['close'].iloc[-1]
-        symbol = "BTCUSDT"  
+        symbol = data.attrs.get('symbol', settings.SYMBOL)
+        
+        predictor = self.predictor
+        if predictor is None:
+            # Модель еще загружается в фоне, до готовности стратегия не голосует
+            self.registry.load_async(self.predictor_name, symbol)
+            return {'signal': 'HOLD', 'confidence': 0.0, 'details': {'status': 'loading'}}
         
-        prediction_result = self.predictor.get_trend_signal(symbol, current_price)
+        prediction_result = predictor.get_trend_signal(symbol, current_price)
         
         details = {
             'current_price': round(current_price, 2),
@@ -0,0 +1,133 @@
+import numpy as np
+from typing import Dict, Optional
+
+# Метрики считаются по последней оси: одна кривая капитала (T,) или пачка (N, T)
+
+# Предел логарифма годового роста: exp(700) еще конечно в float64
+MAX_LOG_GROWTH = 700.0
+
+def returns_from_equity(equity: np.ndarray) -> np.ndarray:
+    """Доходности между соседними точками кривой капитала"""
+    equity = np.asarray(equity, dtype=np.float64)
+    return equity[..., 1:] / equity[..., :-1] - 1
+
+def sharpe_ratio(returns: np.ndarray, periods_per_year: float = 365) -> np.ndarray:
+    """Коэффициент Шарпа в годовом выражении"""
+    returns = np.asarray(returns, dtype=np.float64)
+    std = returns.std(axis=-1, ddof=1) if returns.shape[-1] > 1 else np.zeros(returns.shape[:-1])
+    mean = returns.mean(axis=-1) if returns.shape[-1] else np.zeros(returns.shape[:-1])
+    return _safe_divide(mean, std) * np.sqrt(periods_per_year)
+
+def sortino_ratio(returns: np.ndarray, periods_per_year: float = 365) -> np.ndarray:
+    """Коэффициент Сортино: в знаменателе только отрицательные доходности"""
+    returns = np.asarray(returns, dtype=np.float64)
+    if not returns.shape[-1]:
+        return np.zeros(returns.shape[:-1])
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=-1))
+    return _safe_divide(returns.mean(axis=-1), downside) * np.sqrt(periods_per_year)
+
+def drawdowns(equity: np.ndarray) -> np.ndarray:
+    """Просадка от предыдущего максимума в долях"""
+    equity = np.asarray(equity, dtype=np.float64)
+    running_max = np.maximum.accumulate(equity, axis=-1)
+    return (equity - running_max) / running_max
+
+def max_drawdown(equity: np.ndarray) -> np.ndarray:
+    """Максимальная просадка в долях, положительное число"""
+    return _drawdown_stats(np.asarray(equity, dtype=np.float64))[0]
+
+def max_drawdown_duration(equity: np.ndarray) -> np.ndarray:
+    """Самый долгий период ниже предыдущего максимума, в точках кривой"""
+    return _drawdown_stats(np.asarray(equity, dtype=np.float64))[1]
+
+def calmar_ratio(equity: np.ndarray, periods_per_year: float = 365, drawdown: np.ndarray = None) -> np.ndarray:
+    """Годовая доходность, деленная на максимальную просадку
+    Годовой рост считается в логарифмах и ограничивается сверху: на минутных
+    свечах степень periods_per_year / periods переполнила бы float64.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    periods = max(equity.shape[-1] - 1, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_growth = np.log(equity[..., -1] / equity[..., 0]) * (periods_per_year / periods)
+    annual_return = np.expm1(np.minimum(log_growth, MAX_LOG_GROWTH))
+    return _safe_divide(annual_return, max_drawdown(equity) if drawdown is None else drawdown)
+
+def profit_factor(trade_pnl: np.ndarray) -> np.ndarray:
+    """Сумма прибылей к сумме убытков; NaN в пачке - отсутствующие сделки"""
+    trade_pnl = np.asarray(trade_pnl, dtype=np.float64)
+    gains = np.nansum(np.where(trade_pnl > 0, trade_pnl, 0), axis=-1)
+    losses = np.abs(np.nansum(np.where(trade_pnl < 0, trade_pnl, 0), axis=-1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(losses > 0, gains / np.where(losses > 0, losses, 1), np.inf)
+
+def exposure(positions: np.ndarray) -> np.ndarray:
+    """Доля времени в позиции"""
+    return np.mean(np.asarray(positions) != 0, axis=-1)
+
+def turnover(positions: np.ndarray, equity: np.ndarray) -> np.ndarray:
+    """Оборот: сумма изменений позиции к среднему капиталу"""
+    positions = np.asarray(positions, dtype=np.float64)
+    traded = np.abs(np.diff(positions, axis=-1, prepend=0)).sum(axis=-1)
+    return _safe_divide(traded, np.asarray(equity, dtype=np.float64).mean(axis=-1))
+
+def compute_metrics(equity: np.ndarray, trade_pnl: Optional[np.ndarray] = None,
+                    positions: Optional[np.ndarray] = None, periods_per_year: float = 365) -> Dict[str, np.ndarray]:
+    """Все метрики за один проход по массивам капитала, сделок и позиций
+    Для пачки кривых (N, T) каждая метрика - массив длины N, для одной
+    кривой (T,) - скаляр numpy.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    returns = returns_from_equity(equity)
+    dd, duration = _drawdown_stats(equity)
+
+    metrics = {
+        'total_return': (equity[..., -1] / equity[..., 0] - 1) * 100,
+        'sharpe_ratio': sharpe_ratio(returns, periods_per_year),
+        'sortino_ratio': sortino_ratio(returns, periods_per_year),
+        'max_drawdown': dd,
+        'max_drawdown_duration': duration,
+        'calmar_ratio': calmar_ratio(equity, periods_per_year, dd)
+    }
+
+    if trade_pnl is not None:
+        trade_pnl = np.asarray(trade_pnl, dtype=np.float64)
+        trades = np.sum(~np.isnan(trade_pnl), axis=-1)
+        wins = np.sum(trade_pnl > 0, axis=-1)
+        metrics.update({
+            'total_trades': trades,
+            'winning_trades': wins,
+            'losing_trades': np.sum(trade_pnl < 0, axis=-1),
+            'total_pnl': np.nansum(trade_pnl, axis=-1),
+            'win_rate': _safe_divide(wins, trades),
+            'profit_factor': profit_factor(trade_pnl)
+        })
+
+    if positions is not None:
+        metrics.update({
+            'exposure': exposure(positions),
+            'turnover': turnover(positions, equity)
+        })
+
+    return metrics
+
+def infer_periods_per_year(timestamps) -> float:
+    """Число свечей в году по медианному шагу времени"""
+    steps = np.diff(np.asarray(timestamps, dtype='datetime64[ns]').view(np.int64))
+    if not len(steps):
+        return 365.0
+    return 365 * 24 * 3600 * 1e9 / float(np.median(steps))
+
+def _drawdown_stats(equity: np.ndarray):
+    """Максимальная просадка и ее длительность по одному накопленному максимуму"""
+    running_max = np.maximum.accumulate(equity, axis=-1)
+    max_dd = np.abs(((equity - running_max) / running_max).min(axis=-1))
+
+    index = np.broadcast_to(np.arange(equity.shape[-1]), equity.shape)
+    last_high = np.maximum.accumulate(np.where(equity >= running_max, index, 0), axis=-1)
+    return max_dd, (index - last_high).max(axis=-1)
+
+def _safe_divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / np.where(denominator != 0, denominator, 1), 0.0)
@@ -30,6 +30,38 @@ const HomeScreen = ({ navigation }) => {
     fetchData();
   }, []);
 
+  // Обновления от бота приходят через WebSocket, без опроса сервера
+  useEffect(() => {
+    let socket;
+    let reconnectTimer;
+    const connect = () => {
+      socket = new WebSocket('ws://your-server/ws');
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'snapshot') {
+          setData((prev) => ({
+            ...prev,
+            pnl: message.data.pnl ? message.data.pnl.daily_pnl : prev.pnl,
+            signals: message.data.signals.slice().reverse(),
+          }));
+        } else if (message.type === 'signal') {
+          setData((prev) => ({ ...prev, signals: [message.data, ...prev.signals].slice(0, 50) }));
+        } else if (message.type === 'pnl') {
+          setData((prev) => ({ ...prev, pnl: message.data.daily_pnl }));
+        }
+      };
+      socket.onclose = () => {
+        reconnectTimer = setTimeout(connect, 3000);
+      };
+    };
+    connect();
+    return () => {
+      clearTimeout(reconnectTimer);
+      socket.onclose = null;
+      socket.close();
+    };
+  }, []);
+
   const chartData = {
     labels: ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
     datasets: [{
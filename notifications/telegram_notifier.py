@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from config.settings import settings
+from utils.logger import logger
+from utils.instrumentation import metrics, errors
+
+# Приоритеты сообщений: сделки отправляются первыми, отчеты объединяются
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Ограничение Telegram на длину одного сообщения
+MAX_MESSAGE_LENGTH = 4096
+
+SEND_LATENCY = metrics.histogram('telegram_send_duration_seconds', 'Telegram delivery duration including retries')
+MESSAGES = metrics.counter('telegram_messages_total', 'Telegram messages by outcome', ['status'])
+
+class TelegramNotifier:
+    def __init__(self, base_url: str = None, max_queue_size: int = 1000, min_interval: float = None):
+        self.token = settings.TELEGRAM_BOT_TOKEN
+        self.chat_id = settings.TELEGRAM_CHAT_ID
+        self.base_url = base_url or f"https://api.telegram.org/bot{self.token}"
+        self.min_interval = settings.TELEGRAM_MIN_INTERVAL if min_interval is None else min_interval
+
+        # Одно keep-alive соединение на все отправки
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        # Сообщения о сделках не отбрасываются; ограничены только остальные очереди
+        self._queues = {
+            PRIORITY_HIGH: deque(),
+            PRIORITY_NORMAL: deque(maxlen=max_queue_size),
+            PRIORITY_LOW: deque(maxlen=max_queue_size)
+        }
+        self._condition = threading.Condition()
+        self._worker = None
+        self._running = True
+        self._in_flight = 0
+        self._last_sent = 0.0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def send_message(self, message: str, priority: int = PRIORITY_NORMAL):
+        """Постановка сообщения в очередь на отправку в Telegram"""
+        with self._condition:
+            queue = self._queues[priority]
+            if len(queue) == queue.maxlen:
+                self.dropped += 1
+                MESSAGES.inc(status='dropped')
+            queue.append(message)
+            self._condition.notify()
+
+        if self._worker is None:
+            self._start_worker()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Ожидание отправки всех сообщений из очереди"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending() or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """Отправка оставшихся сообщений и остановка фонового потока"""
+        self.flush(timeout)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self.session.close()
+
+    def _start_worker(self):
+        with self._condition:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+            self._worker.start()
+
+    def _pending(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _next_message(self):
+        """Следующее сообщение: по приоритету, отчеты склеиваются в одно"""
+        for priority in (PRIORITY_HIGH, PRIORITY_NORMAL):
+            if self._queues[priority]:
+                return self._queues[priority].popleft()
+
+        low = self._queues[PRIORITY_LOW]
+        batch = low.popleft()
+        while low and len(batch) + len(low[0]) + 2 <= MAX_MESSAGE_LENGTH:
+            batch += "\n\n" + low.popleft()
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._pending():
+                    self._condition.wait()
+                if not self._running and not self._pending():
+                    return
+                message = self._next_message()
+                self._in_flight += 1
+
+            # Не чаще одного сообщения в min_interval секунд
+            delay = self._last_sent + self.min_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            try:
+                self._deliver(message)
+            finally:
+                self._last_sent = time.monotonic()
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    @SEND_LATENCY.timed()
+    def _deliver(self, message: str, attempts: int = 3):
+        """Отправка сообщения в Telegram"""
+        url = f"{self.base_url}/sendMessage"
+        payload = {
+            'chat_id': self.chat_id,
+            'text': message,
+            'parse_mode': 'HTML'
+        }
+
+        for _ in range(attempts):
+            try:
+                response = self.session.post(url, data=payload, timeout=10)
+                if response.status_code == 200:
+                    self.sent += 1
+                    MESSAGES.inc(status='sent')
+                    return
+                if response.status_code == 429:
+                    retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                    logger.warning(f"Telegram rate limit, retrying in {retry_after}s")
+                    time.sleep(retry_after)
+                    continue
+                self._fail(f"Telegram API error: {response.text}")
+                return
+            except Exception as e:
+                self._fail(f"Error sending Telegram message: {e}")
+                return
+        self._fail(f"Telegram rate limit persisted after {attempts} attempts, message dropped")
+
+    def _fail(self, reason: str):
+        self.failed += 1
+        MESSAGES.inc(status='failed')
+        errors.inc(component='notifier')
+        logger.error(reason)
@@ -1,19 +1,76 @@
 from abc import ABC, abstractmethod
+from typing import Dict, Tuple
+import numpy as np
 import pandas as pd
 
+# Коды сигналов для векторизованных расчетов
+SIGNAL_HOLD = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+
+SIGNAL_CODES = {'HOLD': SIGNAL_HOLD, 'BUY': SIGNAL_BUY, 'SELL': SIGNAL_SELL}
+SIGNAL_NAMES = {code: name for name, code in SIGNAL_CODES.items()}
+
 class BaseStrategy(ABC):
     def __init__(self, name: str):
         self.name = name
-    
+        self.indicator_cache = None
+
     @abstractmethod
     def analyze(self, data: pd.DataFrame) -> dict:
         """Анализ данных и возврат сигнала
         Возвращает: {'signal': 'BUY'|'SELL'|'HOLD', 'confidence': float, 'details': dict}
         """
         pass
-    
+
     @abstractmethod
     def get_required_indicators(self) -> list:
-        
 
+
+        pass
+
+    def get_indicator_params(self) -> tuple:
+        """Параметры индикаторов, от которых зависит их значение"""
+        return ()
+
+    def calculate_indicators(self, data: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Расчет индикаторов из get_required_indicators без изменения data
+        Стратегии без индикаторов возвращают пустой словарь.
+        """
+        return {}
+
+    def get_indicators(self, data: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Индикаторы для data, через общий кэш, если он подключен"""
+        if self.indicator_cache is not None:
+            return self.indicator_cache.get(self, data)
+        return self.calculate_indicators(data)
+
+    def analyze_series(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Сигналы для каждой свечи истории
+        Возвращает массивы (коды сигналов, уверенность), где элемент i совпадает
+        с результатом analyze(data.iloc[:i+1]). Базовая реализация вызывает
+        analyze на каждом префиксе, стратегии переопределяют ее векторно.
+        """
+        signals = np.zeros(len(data), dtype=np.int8)
+        confidence = np.zeros(len(data), dtype=np.float64)
+
+        for i in range(len(data)):
+            analysis = self.analyze(data.iloc[:i+1].copy())
+            signals[i] = SIGNAL_CODES.get(analysis['signal'], SIGNAL_HOLD)
+            confidence[i] = analysis['confidence']
+
+        return signals, confidence
+
+class StreamingStrategy(ABC):
+    """Стратегия с потоковым состоянием индикаторов: свеча обрабатывается за O(1)"""
+    @abstractmethod
+    def seed(self, closes) -> None:
+        """Инициализация потокового состояния индикаторов по истории"""
+        pass
+
+    @abstractmethod
+    def update(self, close: float) -> dict:
+        """Анализ очередной закрытой свечи без пересчета истории
+        Возвращает то же, что analyze на истории с добавленной свечой.
+        """
         pass
@@ -1,43 +1,58 @@
+from typing import Dict, Tuple
+import numpy as np
 import pandas as pd
 import ta
-from strategies.base_strategy import BaseStrategy
+from strategies.base_strategy import BaseStrategy, StreamingStrategy, SIGNAL_BUY, SIGNAL_SELL, SIGNAL_HOLD
+from strategies.indicators import RollingBollinger
 
-class BollingerBandsStrategy(BaseStrategy):
+class BollingerBandsStrategy(BaseStrategy, StreamingStrategy):
     def __init__(self, window: int = 20, num_std: float = 2.0):
         super().__init__("Bollinger Bands Strategy")
         self.window = window
         self.num_std = num_std
+        self._bands = None
     
     def get_required_indicators(self) -> list:
         return ['bb_upper', 'bb_lower', 'bb_middle']
-    
-    def analyze(self, data: pd.DataFrame) -> dict:
-        if len(data) < self.window:
-            return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
-        
-        # Расчет полос Боллинджера
+
+    def get_indicator_params(self) -> tuple:
+        return (self.window, self.num_std)
+
+    def calculate_indicators(self, data: pd.DataFrame) -> Dict[str, pd.Series]:
         bb_indicator = ta.volatility.BollingerBands(
             data['close'],
             window=self.window,
             window_dev=self.num_std
         )
+        return {
+            'bb_upper': bb_indicator.bollinger_hband(),
+            'bb_lower': bb_indicator.bollinger_lband(),
+            'bb_middle': bb_indicator.bollinger_mavg()
+        }
+    
+    def analyze(self, data: pd.DataFrame) -> dict:
+        if len(data) < self.window:
+            return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
         
-        data['bb_upper'] = bb_indicator.bollinger_hband()
-        data['bb_lower'] = bb_indicator.bollinger_lband()
-        data['bb_middle'] = bb_indicator.bollinger_mavg()
+        # Расчет полос Боллинджера
+        indicators = self.get_indicators(data)
         
         current_price = data['close'].iloc[-1]
-        upper_band = data['bb_upper'].iloc[-1]
-        lower_band = data['bb_lower'].iloc[-1]
-        middle_band = data['bb_middle'].iloc[-1]
+        upper_band = indicators['bb_upper'].iloc[-1]
+        lower_band = indicators['bb_lower'].iloc[-1]
+        middle_band = indicators['bb_middle'].iloc[-1]
         
-        # Генерация сигнала
+        return self._build_result(current_price, upper_band, lower_band, middle_band)
+
+    def _build_result(self, current_price: float, upper_band: float, lower_band: float, middle_band: float) -> dict:
+        """Генерация сигнала по положению цены относительно полос"""
+        band_width = upper_band - lower_band
         if current_price <= lower_band:
             signal = 'BUY'
-            confidence = (lower_band - current_price) / (upper_band - lower_band)
+            confidence = (lower_band - current_price) / band_width if band_width != 0 else float('nan')
         elif current_price >= upper_band:
             signal = 'SELL'
-            confidence = (current_price - upper_band) / (upper_band - lower_band)
+            confidence = (current_price - upper_band) / band_width if band_width != 0 else float('nan')
         else:
             signal = 'HOLD'
             confidence = 0.0
@@ -53,4 +68,46 @@ class BollingerBandsStrategy(BaseStrategy):
             'signal': signal,
             'confidence': round(confidence, 2),
             'details': details
-        }
\ No newline at end of file
+        }
+
+    def seed(self, closes) -> None:
+        """Инициализация потоковых полос по истории закрытых свечей"""
+        self._bands = RollingBollinger(self.window, self.num_std)
+        for close in closes:
+            self._bands.update(float(close))
+
+    def update(self, close: float) -> dict:
+        """Анализ новой закрытой свечи за O(1), без пересчета окна"""
+        if self._bands is None:
+            self.seed([])
+
+        upper_band, middle_band, lower_band = self._bands.update(close)
+        if len(self._bands.values) < self.window:
+            return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
+
+        return self._build_result(close, upper_band, lower_band, middle_band)
+
+    def analyze_series(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Векторный расчет сигналов по полосам Боллинджера"""
+        indicators = self.calculate_indicators(data)
+        close = data['close'].to_numpy(dtype=np.float64)
+        upper_band = indicators['bb_upper'].to_numpy(dtype=np.float64)
+        lower_band = indicators['bb_lower'].to_numpy(dtype=np.float64)
+
+        enough_data = np.arange(len(close)) >= self.window - 1
+
+        with np.errstate(invalid='ignore'):
+            buy = enough_data & (close <= lower_band)
+            sell = enough_data & ~buy & (close >= upper_band)
+
+        signals = np.full(len(close), SIGNAL_HOLD, dtype=np.int8)
+        signals[buy] = SIGNAL_BUY
+        signals[sell] = SIGNAL_SELL
+
+        band_width = upper_band - lower_band
+        confidence = np.zeros(len(close), dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence[buy] = (lower_band[buy] - close[buy]) / band_width[buy]
+            confidence[sell] = (close[sell] - upper_band[sell]) / band_width[sell]
+
+        return signals, np.round(confidence, 2)
@@ -0,0 +1,140 @@
+import math
+from collections import deque
+from typing import Iterable, Optional, Tuple
+
+class EMA:
+    """Потоковая экспоненциальная скользящая средняя
+    Повторяет pandas ewm(adjust=False), которую использует библиотека ta,
+    поэтому значения совпадают с пересчетом по всей истории.
+    """
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None, min_periods: int = 0):
+        com = (span - 1) / 2 if span is not None else (1 - alpha) / alpha
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_weight = 1.0 - self.alpha
+        self.min_periods = min_periods
+        self.count = 0
+        self._value = math.nan
+
+    @property
+    def value(self) -> float:
+        return self._value if self.count >= self.min_periods else math.nan
+
+    def update(self, x: float) -> float:
+        """Добавление нового значения за O(1)"""
+        self.count += 1
+        if self.count == 1:
+            self._value = x
+        elif self._value != x:
+            self._value = (self.old_weight * self._value + self.alpha * x) / (self.old_weight + self.alpha)
+        return self.value
+
+    def seed(self, values: Iterable[float]) -> float:
+        """Инициализация по истории"""
+        for x in values:
+            self.update(float(x))
+        return self.value
+
+class WilderRSI:
+    """Потоковый RSI с тем же сглаживанием Уайлдера, что и ta.momentum.RSIIndicator"""
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.avg_gain = EMA(alpha=1 / period, min_periods=period)
+        self.avg_loss = EMA(alpha=1 / period, min_periods=period)
+        self.previous_close = None
+        self.value = math.nan
+
+    def update(self, close: float) -> float:
+        """Обновление по закрытой свече"""
+        change = 0.0 if self.previous_close is None else close - self.previous_close
+        self.previous_close = close
+
+        avg_gain = self.avg_gain.update(change if change > 0 else 0.0)
+        avg_loss = self.avg_loss.update(-change if change < 0 else 0.0)
+
+        if math.isnan(avg_loss):
+            self.value = math.nan
+        elif avg_loss == 0:
+            self.value = 100.0
+        else:
+            self.value = 100 - (100 / (1 + avg_gain / avg_loss))
+        return self.value
+
+    def seed(self, closes: Iterable[float]) -> float:
+        for close in closes:
+            self.update(float(close))
+        return self.value
+
+class StreamingMACD:
+    """Потоковый MACD: разница быстрой и медленной EMA и сигнальная линия"""
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = EMA(span=fast_period, min_periods=fast_period)
+        self.slow = EMA(span=slow_period, min_periods=slow_period)
+        self.signal = EMA(span=signal_period, min_periods=signal_period)
+        self.macd = math.nan
+        self.macd_signal = math.nan
+
+    @property
+    def histogram(self) -> float:
+        return self.macd - self.macd_signal
+
+    def update(self, close: float) -> Tuple[float, float]:
+        """Обновление по закрытой свече, возвращает (macd, signal)"""
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        if not math.isnan(self.macd):
+            self.macd_signal = self.signal.update(self.macd)
+        return self.macd, self.macd_signal
+
+    def seed(self, closes: Iterable[float]) -> Tuple[float, float]:
+        for close in closes:
+            self.update(float(close))
+        return self.macd, self.macd_signal
+
+class RollingBollinger:
+    """Потоковые полосы Боллинджера на скользящем окне
+    Среднее и дисперсия обновляются алгоритмом Уэлфорда с добавлением
+    и удалением значения, без пересчета всего окна.
+    """
+    def __init__(self, window: int = 20, num_std: float = 2.0):
+        self.window = window
+        self.num_std = num_std
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    @property
+    def std(self) -> float:
+        if len(self.values) < self.window:
+            return math.nan
+        return math.sqrt(max(self._m2 / self.window, 0.0))
+
+    @property
+    def middle(self) -> float:
+        return self.mean if len(self.values) >= self.window else math.nan
+
+    @property
+    def upper(self) -> float:
+        return self.middle + self.num_std * self.std
+
+    @property
+    def lower(self) -> float:
+        return self.middle - self.num_std * self.std
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        """Обновление по закрытой свече, возвращает (upper, middle, lower)"""
+        if len(self.values) == self.window:
+            removed = self.values[0]
+            self.values.append(close)
+            old_mean = self.mean
+            self.mean += (close - removed) / self.window
+            self._m2 += (close - removed) * (close - self.mean + removed - old_mean)
+        else:
+            self.values.append(close)
+            delta = close - self.mean
+            self.mean += delta / len(self.values)
+            self._m2 += delta * (close - self.mean)
+        return self.upper, self.middle, self.lower
+
+    def seed(self, closes: Iterable[float]) -> Tuple[float, float, float]:
+        for close in closes:
+            self.update(float(close))
+        return self.upper, self.middle, self.lower
@@ -1,45 +1,64 @@
+from typing import Dict, Tuple
+import numpy as np
 import pandas as pd
 import ta
-from strategies.base_strategy import BaseStrategy
+from strategies.base_strategy import BaseStrategy, StreamingStrategy, SIGNAL_BUY, SIGNAL_SELL, SIGNAL_HOLD
+from strategies.indicators import StreamingMACD
 
-class MACDStrategy(BaseStrategy):
+class MACDStrategy(BaseStrategy, StreamingStrategy):
     def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
         super().__init__("MACD Strategy")
         self.fast_period = fast_period
         self.slow_period = slow_period
         self.signal_period = signal_period
+        self._macd = None
+        self._candles_seen = 0
     
     def get_required_indicators(self) -> list:
         return ['macd', 'macd_signal', 'macd_hist']
-    
-    def analyze(self, data: pd.DataFrame) -> dict:
-        if len(data) < max(self.fast_period, self.slow_period) + self.signal_period:
-            return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
-        
-        # Расчет MACD
+
+    def get_indicator_params(self) -> tuple:
+        return (self.fast_period, self.slow_period, self.signal_period)
+
+    def calculate_indicators(self, data: pd.DataFrame) -> Dict[str, pd.Series]:
         macd_indicator = ta.trend.MACD(
             data['close'],
             window_fast=self.fast_period,
             window_slow=self.slow_period,
             window_sign=self.signal_period
         )
+        return {
+            'macd': macd_indicator.macd(),
+            'macd_signal': macd_indicator.macd_signal(),
+            'macd_hist': macd_indicator.macd_diff()
+        }
+    
+    def analyze(self, data: pd.DataFrame) -> dict:
+        if len(data) < max(self.fast_period, self.slow_period) + self.signal_period:
+            return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
         
-        data['macd'] = macd_indicator.macd()
-        data['macd_signal'] = macd_indicator.macd_signal()
-        data['macd_hist'] = macd_indicator.macd_diff()
+        # Расчет MACD
+        indicators = self.get_indicators(data)
         
-        current_macd = data['macd'].iloc[-1]
-        current_signal = data['macd_signal'].iloc[-1]
-        previous_macd = data['macd'].iloc[-2]
-        previous_signal = data['macd_signal'].iloc[-2]
+        current_macd = indicators['macd'].iloc[-1]
+        current_signal = indicators['macd_signal'].iloc[-1]
+        previous_macd = indicators['macd'].iloc[-2]
+        previous_signal = indicators['macd_signal'].iloc[-2]
         
-        # Генерация сигнала
+        return self._build_result(
+            current_macd, current_signal, previous_macd, previous_signal,
+            indicators['macd_hist'].iloc[-1], data['close'].iloc[-1]
+        )
+
+    def _build_result(self, current_macd: float, current_signal: float, previous_macd: float,
+                      previous_signal: float, histogram: float, price: float) -> dict:
+        """Генерация сигнала по пересечению MACD и сигнальной линии"""
         if (previous_macd <= previous_signal) and (current_macd > current_signal):
             signal = 'BUY'
-            confidence = min(abs(current_macd - current_signal) / abs(current_signal), 1.0)
+            confidence = self._crossover_confidence(current_macd, current_signal)
         elif (previous_macd >= previous_signal) and (current_macd < current_signal):
             signal = 'SELL'
-            confidence = min(abs(current_macd - current_signal) / abs(current_signal), 1.0)
+            confidence = self._crossover_confidence(current_macd, current_signal)
         else:
             signal = 'HOLD'
             confidence = 0.0
@@ -47,12 +66,72 @@ class MACDStrategy(BaseStrategy):
         details = {
             'macd': round(current_macd, 4),
             'signal_line': round(current_signal, 4),
-            'histogram': round(data['macd_hist'].iloc[-1], 4),
-            'price': round(data['close'].iloc[-1], 2)
+            'histogram': round(histogram, 4),
+            'price': round(price, 2)
         }
         
         return {
             'signal': signal,
             'confidence': round(confidence, 2),
             'details': details
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def _crossover_confidence(current_macd: float, current_signal: float) -> float:
+        # При нулевой сигнальной линии отношение бесконечно, уверенность максимальна
+        if current_signal == 0:
+            return 1.0
+        return min(abs(current_macd - current_signal) / abs(current_signal), 1.0)
+
+    def seed(self, closes) -> None:
+        """Инициализация потокового MACD по истории закрытых свечей"""
+        self._macd = StreamingMACD(self.fast_period, self.slow_period, self.signal_period)
+        self._candles_seen = 0
+        for close in closes:
+            self._macd.update(float(close))
+            self._candles_seen += 1
+
+    def update(self, close: float) -> dict:
+        """Анализ новой закрытой свечи за O(1), без пересчета истории"""
+        if self._macd is None:
+            self.seed([])
+
+        previous_macd, previous_signal = self._macd.macd, self._macd.macd_signal
+        current_macd, current_signal = self._macd.update(close)
+        self._candles_seen += 1
+
+        if self._candles_seen < max(self.fast_period, self.slow_period) + self.signal_period:
+            return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
+
+        return self._build_result(
+            current_macd, current_signal, previous_macd, previous_signal,
+            self._macd.histogram, close
+        )
+
+    def analyze_series(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Векторный расчет сигналов MACD по всей истории"""
+        indicators = self.calculate_indicators(data)
+        macd = indicators['macd'].to_numpy(dtype=np.float64)
+        macd_signal = indicators['macd_signal'].to_numpy(dtype=np.float64)
+
+        previous_macd = np.concatenate(([np.nan], macd[:-1]))
+        previous_signal = np.concatenate(([np.nan], macd_signal[:-1]))
+
+        enough_data = np.arange(len(macd)) >= max(self.fast_period, self.slow_period) + self.signal_period - 1
+
+        with np.errstate(invalid='ignore'):
+            buy = enough_data & (previous_macd <= previous_signal) & (macd > macd_signal)
+            sell = enough_data & (previous_macd >= previous_signal) & (macd < macd_signal)
+
+        signals = np.full(len(macd), SIGNAL_HOLD, dtype=np.int8)
+        signals[buy] = SIGNAL_BUY
+        signals[sell] = SIGNAL_SELL
+
+        crossed = buy | sell
+        confidence = np.zeros(len(macd), dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            confidence[crossed] = np.minimum(
+                np.abs(macd[crossed] - macd_signal[crossed]) / np.abs(macd_signal[crossed]), 1.0
+            )
+
+        return signals, np.round(confidence, 2)
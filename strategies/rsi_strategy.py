@@ -1,29 +1,43 @@
+from typing import Dict, Tuple
+import numpy as np
 import pandas as pd
 import ta
-from strategies.base_strategy import BaseStrategy
+from strategies.base_strategy import BaseStrategy, StreamingStrategy, SIGNAL_BUY, SIGNAL_SELL, SIGNAL_HOLD
+from strategies.indicators import WilderRSI
 
-class RSIStrategy(BaseStrategy):
+class RSIStrategy(BaseStrategy, StreamingStrategy):
     def __init__(self, rsi_period: int = 14, rsi_overbought: int = 70, rsi_oversold: int = 30):
         super().__init__("RSI Strategy")
         self.rsi_period = rsi_period
         self.rsi_overbought = rsi_overbought
         self.rsi_oversold = rsi_oversold
+        self._rsi = None
+        self._candles_seen = 0
     
     def get_required_indicators(self) -> list:
         return ['rsi']
+
+    def get_indicator_params(self) -> tuple:
+        return (self.rsi_period,)
+
+    def calculate_indicators(self, data: pd.DataFrame) -> Dict[str, pd.Series]:
+        rsi_indicator = ta.momentum.RSIIndicator(data['close'], window=self.rsi_period)
+        return {'rsi': rsi_indicator.rsi()}
     
     def analyze(self, data: pd.DataFrame) -> dict:
         if len(data) < self.rsi_period:
             return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
         
         # Расчет RSI
-        rsi_indicator = ta.momentum.RSIIndicator(data['close'], window=self.rsi_period)
-        data['rsi'] = rsi_indicator.rsi()
+        rsi = self.get_indicators(data)['rsi']
         
-        current_rsi = data['rsi'].iloc[-1]
-        previous_rsi = data['rsi'].iloc[-2] if len(data) > 1 else current_rsi
+        current_rsi = rsi.iloc[-1]
+        previous_rsi = rsi.iloc[-2] if len(data) > 1 else current_rsi
         
-        # Генерация сигнала
+        return self._build_result(current_rsi, previous_rsi, data['close'].iloc[-1])
+
+    def _build_result(self, current_rsi: float, previous_rsi: float, price: float) -> dict:
+        """Генерация сигнала по текущему и предыдущему значению RSI"""
         if current_rsi < self.rsi_oversold and previous_rsi >= self.rsi_oversold:
             signal = 'BUY'
             confidence = (self.rsi_oversold - current_rsi) / self.rsi_oversold
@@ -36,11 +50,55 @@ class RSIStrategy(BaseStrategy):
         
         details = {
             'rsi': round(current_rsi, 2),
-            'price': round(data['close'].iloc[-1], 2)
+            'price': round(price, 2)
         }
         
         return {
             'signal': signal,
             'confidence': round(confidence, 2),
             'details': details
-        }
\ No newline at end of file
+        }
+
+    def seed(self, closes) -> None:
+        """Инициализация потокового RSI по истории закрытых свечей"""
+        self._rsi = WilderRSI(self.rsi_period)
+        self._candles_seen = 0
+        for close in closes:
+            self._rsi.update(float(close))
+            self._candles_seen += 1
+
+    def update(self, close: float) -> dict:
+        """Анализ новой закрытой свечи за O(1), без пересчета истории"""
+        if self._rsi is None:
+            self.seed([])
+
+        previous_rsi = self._rsi.value
+        current_rsi = self._rsi.update(close)
+        self._candles_seen += 1
+
+        if self._candles_seen < self.rsi_period:
+            return {'signal': 'HOLD', 'confidence': 0.0, 'details': {}}
+
+        return self._build_result(current_rsi, previous_rsi, close)
+
+    def analyze_series(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Векторный расчет сигналов RSI по всей истории"""
+        rsi = self.calculate_indicators(data)['rsi'].to_numpy(dtype=np.float64)
+        previous_rsi = np.concatenate((rsi[:1], rsi[:-1]))
+
+        # Для префиксов короче периода analyze возвращает HOLD
+        enough_data = np.arange(len(rsi)) >= self.rsi_period - 1
+
+        with np.errstate(invalid='ignore'):
+            buy = enough_data & (rsi < self.rsi_oversold) & (previous_rsi >= self.rsi_oversold)
+            sell = enough_data & (rsi > self.rsi_overbought) & (previous_rsi <= self.rsi_overbought)
+
+        signals = np.full(len(rsi), SIGNAL_HOLD, dtype=np.int8)
+        signals[buy] = SIGNAL_BUY
+        signals[sell] = SIGNAL_SELL
+
+        confidence = np.zeros(len(rsi), dtype=np.float64)
+        confidence[buy] = (self.rsi_oversold - rsi[buy]) / self.rsi_oversold
+        confidence[sell] = (rsi[sell] - self.rsi_overbought) / (100 - self.rsi_overbought)
+
+        return signals, np.round(confidence, 2)
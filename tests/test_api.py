@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from database.database import Base, get_db
+from database.models import Trade
+from web.app import app
+from web.routes.api import response_cache
+from core.event_hub import event_hub
+
+def make_client(trades):
+    engine = create_engine("sqlite://", connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    db.add_all(trades)
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    response_cache.clear()
+    return TestClient(app)
+
+def test_trades_keyset_pagination_and_etag():
+    base = datetime(2024, 1, 1)
+    # По две сделки на одну секунду: курсор должен различать их по id
+    trades = [
+        Trade(symbol='BTCUSDT' if i % 3 else 'ETHUSDT', side='BUY', quantity=0.001, price=100 + i,
+              timestamp=base + timedelta(seconds=i // 2))
+        for i in range(250)
+    ]
+    client = make_client(trades)
+    try:
+        ids = []
+        cursor = None
+        while True:
+            params = {'limit': 100}
+            if cursor:
+                params['cursor'] = cursor
+            page = client.get('/api/trades', params=params).json()
+            ids.extend(item['id'] for item in page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        assert ids == list(range(250, 0, -1))
+
+        response = client.get('/api/trades', params={'symbol': 'ethusdt', 'start': '2024-01-01T00:01:00'})
+        items = response.json()['items']
+        assert {item['symbol'] for item in items} == {'ETHUSDT'}
+        assert all(item['timestamp'] >= '2024-01-01T00:01:00' for item in items)
+
+        etag = response.headers['etag']
+        cached = client.get('/api/trades', params={'symbol': 'ethusdt', 'start': '2024-01-01T00:01:00'},
+                            headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+
+        assert client.get('/api/trades', params={'cursor': 'broken'}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+def test_websocket_sends_snapshot_then_live_events():
+    from core.event_hub import EventHub
+    from web.routes import stream
+
+    hub = EventHub()
+    stream.event_hub = hub
+    try:
+        hub.publish('signal', {'symbol': 'BTCUSDT', 'strategy': 'RSI', 'signal_type': 'BUY'})
+        with TestClient(app).websocket_connect('/ws') as websocket:
+            snapshot = websocket.receive_json()
+            assert snapshot['type'] == 'snapshot'
+            assert snapshot['seq'] == 1
+            assert snapshot['data']['signals'][0]['signal_type'] == 'BUY'
+
+            hub.publish('trade', {'symbol': 'BTCUSDT', 'side': 'BUY', 'timestamp': datetime(2024, 1, 1)})
+            event = websocket.receive_json()
+            assert event == {'seq': 2, 'type': 'trade',
+                             'data': {'symbol': 'BTCUSDT', 'side': 'BUY', 'timestamp': '2024-01-01T00:00:00'}}
+        assert hub.subscriber_count == 0
+    finally:
+        stream.event_hub = event_hub
+
+def test_event_hub_disconnects_lagging_subscriber():
+    import asyncio
+    from core.event_hub import EventHub
+
+    async def scenario():
+        hub = EventHub(max_queue=3)
+        fast, _ = hub.subscribe()
+        slow, _ = hub.subscribe()
+        received = []
+        for i in range(5):
+            hub.publish('candle', {'symbol': 'BTCUSDT', 'close': i})
+            await asyncio.sleep(0)
+            received.append(await fast.get())
+        assert len(received) == 5
+        assert await slow.get() is None
+        assert hub.candles['BTCUSDT']['close'] == 4
+
+    asyncio.run(scenario())
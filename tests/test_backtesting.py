@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtesting.engine import BacktestEngine
+from strategies.rsi_strategy import RSIStrategy
+from strategies.macd_strategy import MACDStrategy
+from strategies.bollinger_strategy import BollingerBandsStrategy
+
+def make_ohlcv(n=400, seed=42):
+    """Синтетические свечи со случайным блужданием цены"""
+    rng = np.random.default_rng(seed)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='15min'),
+        'close': close
+    })
+
+@pytest.mark.parametrize('strategy', [
+    RSIStrategy(rsi_period=7, rsi_overbought=65, rsi_oversold=35),
+    MACDStrategy(),
+    BollingerBandsStrategy(num_std=1.5)
+])
+def test_vectorized_run_matches_per_bar(strategy):
+    data = make_ohlcv()
+
+    per_bar_engine = BacktestEngine(data)
+    per_bar = per_bar_engine.run(strategy)
+    vectorized_engine = BacktestEngine(data)
+    vectorized = vectorized_engine.run(strategy, vectorized=True)
+
+    assert per_bar['total_trades'] > 0
+    assert vectorized == per_bar
+    assert vectorized_engine.trades == per_bar_engine.trades
+
+@pytest.mark.parametrize('strategy', [RSIStrategy(), MACDStrategy(), BollingerBandsStrategy()])
+def test_analyze_series_matches_analyze(strategy):
+    data = make_ohlcv(n=120, seed=7)
+    signals, confidence = strategy.analyze_series(data)
+
+    expected_signals, expected_confidence = super(type(strategy), strategy).analyze_series(data)
+
+    np.testing.assert_array_equal(signals, expected_signals)
+    np.testing.assert_allclose(confidence, expected_confidence, equal_nan=True)
+
+def test_optimizer_grid_search_matches_sequential_runs():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from backtesting.optimizer import StrategyOptimizer
+    from database.models import Base, BacktestResult
+
+    data = make_ohlcv(n=600)
+    optimizer = StrategyOptimizer(data, RSIStrategy, max_workers=2)
+    grid = {'rsi_period': [7, 14], 'rsi_oversold': [30, 35]}
+    results = optimizer.grid_search(grid)
+
+    assert [r['params'] for r in results] == [
+        {'rsi_period': 7, 'rsi_oversold': 30}, {'rsi_period': 7, 'rsi_oversold': 35},
+        {'rsi_period': 14, 'rsi_oversold': 30}, {'rsi_period': 14, 'rsi_oversold': 35}
+    ]
+    expected = BacktestEngine(data).run(RSIStrategy(rsi_period=7, rsi_oversold=35), vectorized=True)
+    assert {k: results[1][k] for k in expected} == expected
+
+    walk_forward = optimizer.walk_forward(grid, train_size=300, test_size=100)
+    assert [(r['start'], r['end']) for r in walk_forward] == [(300, 400), (400, 500), (500, 600)]
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    assert optimizer.save_results(results, db) == 4
+    assert db.query(BacktestResult).filter(BacktestResult.strategy.like('RSIStrategy(rsi_period=7%')).count() == 2
+
+def make_minutes(n_bars=300, minutes_per_bar=60, seed=3):
+    """Минутные свечи и часовые свечи, собранные из них"""
+    rng = np.random.default_rng(seed)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.002, n_bars * minutes_per_bar)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = close * np.abs(rng.normal(0, 0.001, len(close)))
+    minutes = pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=len(close), freq='1min'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close
+    })
+    bars = minutes.resample('60min', on='timestamp').agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'}
+    ).reset_index()
+    return bars, minutes
+
+def test_intrabar_stop_loss_take_profit():
+    bars, minutes = make_minutes()
+    strategy = RSIStrategy(rsi_period=7, rsi_overbought=65, rsi_oversold=35)
+
+    per_bar = BacktestEngine(bars, intrabar_data=minutes, stop_loss_percent=1.0, take_profit_percent=1.5)
+    per_bar_results = per_bar.run(strategy)
+    vectorized = BacktestEngine(bars, intrabar_data=minutes, stop_loss_percent=1.0, take_profit_percent=1.5)
+    vectorized_results = vectorized.run(strategy, vectorized=True)
+
+    assert per_bar_results == vectorized_results
+    assert per_bar.trades == vectorized.trades
+
+    reasons = {trade['exit_reason'] for trade in vectorized.trades}
+    assert {'stop_loss', 'take_profit'} <= reasons
+    for trade in vectorized.trades:
+        if trade['exit_reason'] == 'stop_loss':
+            assert trade['exit_price'] <= trade['entry_price'] * 0.99 + 1e-9
+        elif trade['exit_reason'] == 'take_profit':
+            assert trade['exit_price'] >= trade['entry_price'] * 1.015 - 1e-9
+
+        # Цена выхода достигнута внутри часа, в котором закрыта сделка
+        hour = minutes[(minutes['timestamp'] >= trade['timestamp']) &
+                       (minutes['timestamp'] < trade['timestamp'] + pd.Timedelta('60min'))]
+        assert hour['low'].min() - 1e-9 <= trade['exit_price'] <= hour['high'].max() + 1e-9
+
+    # Без минуток уровни проверяются по high/low самих свечей
+    coarse = BacktestEngine(bars, stop_loss_percent=1.0, take_profit_percent=1.5)
+    coarse.run(strategy, vectorized=True)
+    assert {'stop_loss', 'take_profit'} & {trade['exit_reason'] for trade in coarse.trades}
+
+def test_optimizer_sweeps_stop_loss_and_take_profit_on_intrabar_data():
+    from backtesting.optimizer import StrategyOptimizer
+
+    bars, minutes = make_minutes(n_bars=200)
+    optimizer = StrategyOptimizer(bars, RSIStrategy, max_workers=2, intrabar_data=minutes)
+    grid = {'rsi_period': [7], 'rsi_overbought': [65], 'rsi_oversold': [35],
+            'stop_loss_percent': [1.0, 2.0], 'take_profit_percent': [1.5]}
+    results = optimizer.grid_search(grid)
+
+    for result in results:
+        params = result['params']
+        expected = BacktestEngine(bars, intrabar_data=minutes, stop_loss_percent=params['stop_loss_percent'],
+                                  take_profit_percent=params['take_profit_percent']).run(
+            RSIStrategy(rsi_period=7, rsi_overbought=65, rsi_oversold=35), vectorized=True)
+        assert {k: result[k] for k in expected} == expected
+    assert results[0]['total_return'] != results[1]['total_return']
+
+def test_metrics_batch_matches_single_curves():
+    from ml.utils.metrics import compute_metrics
+
+    equity = np.array([100.0, 110.0, 99.0, 104.5, 120.0])
+    single = compute_metrics(equity, trade_pnl=np.array([10.0, -11.0, 21.0]),
+                             positions=np.array([0, 10, 10, 0, 0]), periods_per_year=252)
+    assert single['max_drawdown'] == pytest.approx(0.1)
+    assert single['max_drawdown_duration'] == 2
+    assert single['total_return'] == pytest.approx(20.0)
+    assert single['profit_factor'] == pytest.approx(31 / 11)
+    assert single['exposure'] == pytest.approx(0.4)
+    assert single['turnover'] == pytest.approx(20 / equity.mean())
+
+    rng = np.random.default_rng(0)
+    curves = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, (2000, 500)), axis=1))
+    pnl = rng.normal(0, 10, (2000, 30))
+    pnl[:, 20:] = np.nan
+    batch = compute_metrics(curves, trade_pnl=pnl)
+    for i in (0, 999, 1999):
+        row = compute_metrics(curves[i], trade_pnl=pnl[i, :20])
+        for name, value in row.items():
+            assert batch[name][i] == pytest.approx(value)
+
+def test_calmar_stays_finite_on_minute_data_and_records_drop_infinities():
+    from ml.utils.metrics import calmar_ratio
+
+    # Рост на 50% за час минутных свечей: годовая степень больше 10^5
+    equity = np.linspace(100.0, 150.0, 61)
+    equity[30] = 90.0
+    calmar = calmar_ratio(equity, periods_per_year=365 * 24 * 60)
+    assert np.isfinite(calmar) and calmar > 0
+    assert calmar_ratio(np.array([100.0, 0.0]), periods_per_year=365 * 24 * 60) == pytest.approx(-1.0)
+
+    record = BacktestEngine.to_record({'calmar_ratio': np.inf, 'sharpe_ratio': np.nan, 'sortino_ratio': -np.inf,
+                                       'profit_factor': np.inf}, 'RSI', 'BTCUSDT', None, None)
+    assert [record[name] for name in ('calmar_ratio', 'sharpe_ratio', 'sortino_ratio', 'profit_factor')] == [None] * 4
+
+def test_engine_reports_risk_metrics_and_saves_them():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database.database import Base
+    from database.models import BacktestResult
+
+    engine = BacktestEngine(make_ohlcv())
+    results = engine.run(RSIStrategy(rsi_period=7, rsi_overbought=65, rsi_oversold=35), vectorized=True)
+    assert results['total_trades'] > 0
+    assert results['sharpe_ratio'] != 0
+    assert 0 < results['exposure'] < 1
+    assert results['turnover'] > 0
+
+    db = sessionmaker(bind=create_engine('sqlite://'))()
+    Base.metadata.create_all(db.get_bind())
+    record = engine.save_results(results, 'RSIStrategy(rsi_period=7)', 'BTCUSDT', db)
+    saved = db.get(BacktestResult, record.id)
+    assert saved.sortino_ratio == pytest.approx(results['sortino_ratio'])
+    assert saved.max_drawdown_duration == results['max_drawdown_duration']
@@ -0,0 +1,49 @@
+import json
+from benchmarks.run import BENCHMARKS, compare, main, make_klines, make_ohlcv, run_benchmarks
+
+def test_benchmark_data_is_reproducible():
+    data = make_ohlcv(100)
+    assert data.equals(make_ohlcv(100))
+    assert (data['high'] >= data[['open', 'close']].max(axis=1)).all()
+    assert (data['low'] <= data[['open', 'close']].min(axis=1)).all()
+
+    klines = make_klines(3)
+    assert klines[1][0] - klines[0][0] == 60_000
+    assert float(klines[2][4]) == round(data['close'].iloc[2], 8)
+
+def test_run_benchmarks_and_flag_regressions(tmp_path):
+    assert {'strategy.rsi.analyze', 'backtest.rsi.per_bar', 'klines.parse', 'ml.lstm.prepare_data',
+            'ml.lstm.predict', 'bot.combine_signals'} <= set(BENCHMARKS)
+
+    assert BENCHMARKS['backtest.rsi.per_bar'][1] == 2000
+
+    results = run_benchmarks(sizes=[100, 300], names=['strategy.rsi', 'backtest.rsi.per_bar'], repeat=1)
+    assert [(r['name'], r['bars']) for r in results] == [
+        ('strategy.rsi.analyze', 100), ('strategy.rsi.analyze', 300),
+        ('backtest.rsi.per_bar', 100), ('backtest.rsi.per_bar', 300)
+    ]
+    assert all(0 < r['best'] <= r['median'] for r in results)
+
+    baseline = [dict(r, best=r['best'] * 10) for r in results]
+    assert compare(results, baseline) == []
+    baseline[0]['best'] = results[0]['best'] / 2
+    regressions = compare(results, baseline, tolerance=0.5)
+    assert [(r['name'], r['bars']) for r in regressions] == [('strategy.rsi.analyze', 100)]
+    assert regressions[0]['ratio'] > 1.5
+
+    path = str(tmp_path / 'baseline.json')
+    args = ['--sizes', '200', '--only', 'strategy.macd', '--repeat', '1', '--baseline', path]
+    assert main(args + ['--update-baseline']) == 0
+    assert main(args + ['--tolerance', '1000']) == 0
+
+    # Линия с заниженным временем дает регрессию только на своей машине
+    with open(path) as f:
+        report = json.load(f)
+    for r in report['results']:
+        r['best'] = 1e-12
+    with open(path, 'w') as f:
+        json.dump(report, f)
+    assert main(args) == 1
+    with open(path, 'w') as f:
+        json.dump({**report, 'machine': 'other-host'}, f)
+    assert main(args) == 0
@@ -0,0 +1,73 @@
+import time
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from database.database import Base, enable_sqlite_wal
+from database.models import Signal, Trade, Balance
+from database.writer import WriteBehindBuffer
+
+def make_session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bot.db'}")
+    enable_sqlite_wal(engine)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)
+
+def test_models_share_base_and_have_time_indexes(tmp_path):
+    engine, _ = make_session_factory(tmp_path)
+    tables = inspect(engine).get_table_names()
+    assert {'signals', 'trades', 'balances', 'backtest_results'} <= set(tables)
+
+    indexes = {tuple(index['column_names']) for index in inspect(engine).get_indexes('signals')}
+    assert {('symbol', 'timestamp'), ('strategy', 'timestamp')} <= indexes
+
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+
+def test_write_behind_buffer_flushes_in_batches(tmp_path):
+    engine, session_factory = make_session_factory(tmp_path)
+    writer = WriteBehindBuffer(session_factory, max_batch=1000, flush_interval=60)
+
+    started = time.perf_counter()
+    for i in range(5000):
+        writer.add_signal('BTCUSDT', 'RSI', 'HOLD', confidence=0.5, price=100.0 + i)
+    # Постановка в буфер не ждет базу
+    assert time.perf_counter() - started < 1.0
+    writer.add_trade('BTCUSDT', 'BUY', 0.001, 100.0, order_id='bot-1', strategy='RSI')
+    writer.add_balance('USDT', 90.0, 10.0)
+    writer.close()
+
+    db = session_factory()
+    assert db.query(Signal).count() == 5000
+    assert db.query(Trade).one().order_id == 'bot-1'
+    assert db.query(Balance).one().free == 90.0
+    db.close()
+    assert writer.written == 5002
+    assert writer.failed == 0
+
+def test_write_behind_buffer_keeps_rows_after_failed_commit(tmp_path):
+    engine, session_factory = make_session_factory(tmp_path)
+    available = [False]
+
+    def flaky_session():
+        db = session_factory()
+        if not available[0]:
+            db.commit = lambda: (_ for _ in ()).throw(RuntimeError('database is locked'))
+        return db
+
+    writer = WriteBehindBuffer(flaky_session, max_batch=1000, flush_interval=60, max_pending=4)
+    writer.add_trade('BTCUSDT', 'BUY', 0.001, 100.0, order_id='bot-1')
+    writer.add_signal('BTCUSDT', 'RSI', 'BUY')
+    assert writer.flush() == 0 and writer.failed == 2 and writer.dropped == 0
+
+    # Переполнение: отбрасываются самые старые сигналы, сделка сохраняется
+    for i in range(3):
+        writer.add_signal('BTCUSDT', 'RSI', 'HOLD', price=float(i))
+    assert writer.flush() == 0
+    assert writer.dropped == 1
+
+    available[0] = True
+    assert writer.flush() == 4
+    writer.close()
+    db = session_factory()
+    assert db.query(Trade).one().order_id == 'bot-1'
+    assert [row.price for row in db.query(Signal).order_by(Signal.id)] == [0.0, 1.0, 2.0]
+    db.close()
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import pytest
+import websockets
+from exchanges.binance_client import KlineStream
+
+MINUTE = 60000
+
+def rest_kline(open_time, close=100.0):
+    return [open_time, str(close), str(close), str(close), str(close), '1.0',
+            open_time + MINUTE - 1, '100.0', 10, '0.5', '50.0', '0']
+
+def ws_kline(open_time, closed=True, close=100.0):
+    return json.dumps({
+        'stream': 'btcusdt@kline_1m',
+        'data': {'e': 'kline', 's': 'BTCUSDT', 'k': {
+            't': open_time, 'T': open_time + MINUTE - 1, 'i': '1m',
+            'o': str(close), 'h': str(close), 'l': str(close), 'c': str(close), 'v': '1.0',
+            'n': 10, 'x': closed, 'q': '100.0', 'V': '0.5', 'Q': '50.0', 'B': '0'
+        }}
+    })
+
+class FakeRestClient:
+    def __init__(self, klines):
+        self.klines = klines
+        self.calls = 0
+
+    def get_klines(self, symbol, interval, limit):
+        self.calls += 1
+        return self.klines[-limit:]
+
+def test_kline_stream_reconnects_and_backfills_gap():
+    rest = FakeRestClient([rest_kline(i * MINUTE) for i in range(3)])
+    closed = []
+    connections = []
+
+    async def fake_binance(ws, *args):
+        connections.append(ws)
+        if len(connections) == 1:
+            await ws.send(ws_kline(3 * MINUTE, closed=False))
+            await ws.send(ws_kline(3 * MINUTE))
+            # Пока соединения нет, закрывается еще одна свеча
+            rest.klines = rest.klines + [rest_kline(3 * MINUTE), rest_kline(4 * MINUTE)]
+        else:
+            await ws.send(ws_kline(5 * MINUTE, close=105.0))
+            await ws.wait_closed()
+
+    def on_candle_close(symbol, data):
+        closed.append((symbol, int(data['close_time'].iloc[-1]) // MINUTE))
+        if len(closed) == 3:
+            stream.stop()
+
+    async def scenario():
+        async with websockets.serve(fake_binance, '127.0.0.1', 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            stream.ws_url = f"ws://127.0.0.1:{port}"
+            await asyncio.wait_for(stream.run(), timeout=10)
+
+    from exchanges.binance_client import klines_weight
+    from exchanges.rate_limiter import RequestWeightBudget
+
+    budget = RequestWeightBudget()
+    stream = KlineStream(rest, ['BTCUSDT'], '1m', on_candle_close, limit=5, reconnect_delay=0.01,
+                         weight_budget=budget)
+    asyncio.run(scenario())
+
+    assert closed == [('BTCUSDT', 3), ('BTCUSDT', 4), ('BTCUSDT', 5)]
+    assert stream.reconnects == 1
+    assert rest.calls == 2
+    # Догрузка через REST учтена в бюджете веса клиента
+    assert budget.used == 2 * klines_weight(5)
+
+    window = stream.get_window('BTCUSDT')
+    assert len(window) == 5
+    assert window['close'].iloc[-1] == 105.0
+    assert window.attrs['symbol'] == 'BTCUSDT'
+
+def test_request_weight_budget_waits_for_window():
+    import time
+    from exchanges.rate_limiter import RequestWeightBudget
+
+    budget = RequestWeightBudget(max_weight=10, window=0.2)
+    budget.acquire(6)
+    budget.acquire(4)
+    assert budget.used == 10
+
+    started = time.monotonic()
+    budget.acquire(5)
+    assert time.monotonic() - started >= 0.15
+    assert budget.waits >= 1
+    assert budget.used == 5
+
+class FakeAccountClient:
+    def __init__(self):
+        self.listen_keys = 0
+
+    def stream_get_listen_key(self):
+        self.listen_keys += 1
+        return 'KEY'
+
+    def get_account(self):
+        return {'updateTime': 1000, 'balances': [
+            {'asset': 'BTC', 'free': '0.5', 'locked': '0'},
+            {'asset': 'USDT', 'free': '100', 'locked': '0'}
+        ]}
+
+    def get_open_orders(self):
+        return []
+
+def execution_report(order_id, status, execution, filled='0', last='0'):
+    return json.dumps({
+        'e': 'executionReport', 's': 'BTCUSDT', 'c': 'bot-1', 'S': 'BUY', 'o': 'LIMIT',
+        'q': '0.1', 'p': '100', 'x': execution, 'X': status, 'i': order_id, 'l': last,
+        'z': filled, 'L': '100', 'n': '0', 'N': 'BNB', 'T': 3000
+    })
+
+def test_user_data_stream_keeps_account_snapshot_current():
+    from exchanges.binance_client import AccountSnapshot, UserDataStream
+    from exchanges.rate_limiter import RequestWeightBudget
+
+    account = AccountSnapshot()
+    paths = []
+
+    async def fake_binance(ws, *args):
+        paths.append(ws.request.path)
+        # Событие старше снимка REST не должно его перезаписать
+        await ws.send(json.dumps({'e': 'outboundAccountPosition', 'u': 500,
+                                  'B': [{'a': 'BTC', 'f': '9', 'l': '0'}]}))
+        await ws.send(execution_report(7, 'NEW', 'NEW'))
+        await ws.send(json.dumps({'e': 'outboundAccountPosition', 'u': 2000,
+                                  'B': [{'a': 'USDT', 'f': '90', 'l': '10'}]}))
+        await ws.send(execution_report(8, 'NEW', 'NEW'))
+        await ws.send(execution_report(8, 'FILLED', 'TRADE', filled='0.1', last='0.1'))
+        await ws.wait_closed()
+
+    async def scenario():
+        async with websockets.serve(fake_binance, '127.0.0.1', 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            stream.ws_url = f"ws://127.0.0.1:{port}"
+            task = asyncio.create_task(stream.run())
+            while len(account.fills) < 1:
+                await asyncio.sleep(0.01)
+            assert account.live
+            stream.stop()
+            await asyncio.wait_for(task, timeout=5)
+
+    stream = UserDataStream(FakeAccountClient(), account, weight_budget=RequestWeightBudget(),
+                            reconcile_interval=60)
+    asyncio.run(scenario())
+
+    assert paths == ['/ws/KEY']
+    assert account.get_free('BTC') == 0.5
+    assert account.get_free('USDT') == 90.0
+    assert [order['orderId'] for order in account.get_open_orders('BTCUSDT')] == [7]
+    assert account.fills[-1]['quantity'] == 0.1
+    assert not account.live
+
+class FlakyOrderClient:
+    """Первый ответ теряется, хотя биржа ордер приняла"""
+    def __init__(self):
+        self.orders = {}
+        self.create_calls = []
+
+    def create_order(self, **params):
+        self.create_calls.append(params['newClientOrderId'])
+        order = {'symbol': params['symbol'], 'clientOrderId': params['newClientOrderId'], 'status': 'NEW'}
+        self.orders[params['newClientOrderId']] = order
+        if len(self.create_calls) == 1:
+            raise ConnectionError('connection reset')
+        return order
+
+    def get_order(self, symbol, origClientOrderId):
+        return self.orders[origClientOrderId]
+
+def test_execution_engine_recovers_lost_ack_and_records_latencies():
+    from types import SimpleNamespace
+    from exchanges.binance_client import AccountSnapshot
+    from exchanges.execution import ExecutionEngine
+    from exchanges.rate_limiter import RequestWeightBudget
+
+    client = FlakyOrderClient()
+    account = AccountSnapshot()
+    binance = SimpleNamespace(client=client, account=account, weight_budget=RequestWeightBudget())
+    engine = ExecutionEngine(binance, retry_delay=0)
+
+    result = engine.submit('BTCUSDT', 'BUY', 0.001).result(timeout=5)
+    assert result['status'] == 'NEW'
+    # Ордер найден по client id, повторной отправки не было
+    assert client.create_calls == [result['client_order_id']]
+
+    account.apply_event({'e': 'executionReport', 's': 'BTCUSDT', 'c': result['client_order_id'],
+                         'S': 'BUY', 'o': 'MARKET', 'q': '0.001', 'p': '0', 'x': 'TRADE', 'X': 'FILLED',
+                         'i': 1, 'l': '0.001', 'z': '0.001', 'L': '100', 'n': '0', 'N': 'BNB', 'T': 1})
+
+    stats = engine.latency_stats()['BTCUSDT']
+    assert [stats[stage]['count'] for stage in ('signal_to_send', 'send_to_ack', 'ack_to_fill')] == [1, 1, 1]
+    engine.close()
+
+class UnavailableOrderClient:
+    """Биржа отвечает 503 "execution status unknown", ордер при этом исполнен"""
+    def __init__(self, accepted=True, lookup_error=False):
+        self.accepted = accepted
+        self.lookup_error = lookup_error
+        self.orders = {}
+        self.create_calls = []
+        self.lookups = 0
+
+    def create_order(self, **params):
+        from binance.exceptions import BinanceAPIException
+        self.create_calls.append(params['newClientOrderId'])
+        if self.accepted or len(self.create_calls) > 1:
+            self.orders[params['newClientOrderId']] = {'symbol': params['symbol'], 'status': 'FILLED',
+                                                       'clientOrderId': params['newClientOrderId']}
+        if len(self.create_calls) == 1:
+            raise BinanceAPIException(None, 503, '{"code": -1007, "msg": "Send status unknown; execution status unknown."}')
+        return self.orders[params['newClientOrderId']]
+
+    def get_order(self, symbol, origClientOrderId):
+        from binance.exceptions import BinanceAPIException
+        self.lookups += 1
+        if self.lookup_error:
+            raise BinanceAPIException(None, 502, '{"code": -1001, "msg": "Internal error"}')
+        if origClientOrderId not in self.orders:
+            raise BinanceAPIException(None, 400, '{"code": -2013, "msg": "Order does not exist."}')
+        return self.orders[origClientOrderId]
+
+@pytest.mark.parametrize('accepted, lookup_error, status, sends', [
+    (True, False, 'FILLED', 1),
+    (False, False, 'FILLED', 2),
+    (True, True, 'UNKNOWN', 1)
+])
+def test_execution_engine_resends_only_after_order_is_confirmed_missing(accepted, lookup_error, status, sends):
+    from types import SimpleNamespace
+    from exchanges.binance_client import AccountSnapshot
+    from exchanges.execution import ExecutionEngine
+    from exchanges.rate_limiter import RequestWeightBudget
+
+    client = UnavailableOrderClient(accepted, lookup_error)
+    binance = SimpleNamespace(client=client, account=AccountSnapshot(), weight_budget=RequestWeightBudget())
+    engine = ExecutionEngine(binance, retry_delay=0)
+
+    result = engine.submit('BTCUSDT', 'SELL', 0.001).result(timeout=5)
+    assert result['status'] == status
+    assert len(client.create_calls) == sends
+    assert client.lookups >= 1
+    engine.close()
+
+def test_latency_histogram_percentiles():
+    from exchanges.execution import LatencyHistogram
+
+    histogram = LatencyHistogram()
+    for value in [0.5] * 90 + [30] * 9 + [20000]:
+        histogram.observe(value)
+    assert histogram.percentile(50) == 1.0
+    assert histogram.percentile(99) == 50.0
+    assert histogram.percentile(100) == 20000
+
+def test_candle_buffer_ring_views_and_incremental_klines(monkeypatch):
+    import time
+    import numpy as np
+    from exchanges.binance_client import BinanceClient
+    from exchanges.candle_buffer import CandleBuffer
+    from exchanges.rate_limiter import RequestWeightBudget
+
+    buffer = CandleBuffer(3, 'BTCUSDT', '1m')
+    for i in range(7):
+        buffer.append_kline(rest_kline(i * MINUTE, close=100.0 + i))
+    # Незакрытая свеча обновляется на месте, старая игнорируется
+    assert not buffer.append_kline(rest_kline(6 * MINUTE, close=200.0))
+    assert not buffer.append_kline(rest_kline(2 * MINUTE))
+    np.testing.assert_array_equal(buffer.view('close'), [104.0, 105.0, 200.0])
+
+    frame = buffer.to_frame()
+    assert np.shares_memory(frame['close'].to_numpy(), buffer.view('close'))
+    assert frame['open'].dtype == np.float64
+    assert frame['close_time'].iloc[-1] == 7 * MINUTE - 1
+
+    rest = FakeRestClient([rest_kline(i * MINUTE, close=100.0 + i) for i in range(10)])
+    requests = []
+    original = rest.get_klines
+    rest.get_klines = lambda symbol, interval, limit: requests.append(limit) or original(symbol, interval, limit)
+    client = BinanceClient.__new__(BinanceClient)
+    client.client, client.weight_budget, client.candles = rest, RequestWeightBudget(), {}
+
+    monkeypatch.setattr(time, 'time', lambda: (9 * MINUTE + 30000) / 1000)
+    assert client.get_klines('BTCUSDT', '1m', limit=5)['close'].tolist() == [105.0, 106.0, 107.0, 108.0, 109.0]
+
+    # Через две минуты догружаются только новые свечи и последняя известная
+    rest.klines = rest.klines[:-1] + [rest_kline(i * MINUTE, close=200.0 + i) for i in range(9, 12)]
+    monkeypatch.setattr(time, 'time', lambda: (11 * MINUTE + 30000) / 1000)
+    data = client.get_klines('BTCUSDT', '1m', limit=5)
+    assert requests == [5, 3]
+    assert data['close'].tolist() == [107.0, 108.0, 209.0, 210.0, 211.0]
+    assert data.attrs == {'symbol': 'BTCUSDT', 'interval': '1m'}
+
+    # Отданный кадр - снимок: следующие свечи его не меняют, его можно изменять
+    snapshot = data['close'].tolist()
+    rest.klines += [rest_kline(i * MINUTE, close=300.0 + i) for i in range(12, 20)]
+    monkeypatch.setattr(time, 'time', lambda: (19 * MINUTE + 30000) / 1000)
+    assert client.get_klines('BTCUSDT', '1m', limit=5)['close'].iloc[-1] == 319.0
+    assert data['close'].tolist() == snapshot
+    data.loc[data.index[-1], 'close'] = 0.0
+    assert client.get_klines('BTCUSDT', '1m', limit=5)['close'].iloc[-1] == 319.0
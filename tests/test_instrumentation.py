@@ -0,0 +1,81 @@
+import timeit
+import pytest
+from fastapi.testclient import TestClient
+from utils.instrumentation import MetricsRegistry
+
+def test_histogram_counter_and_gauge_render_prometheus_text():
+    registry = MetricsRegistry()
+    latency = registry.histogram('stage_duration_seconds', 'Stage duration', ['stage'], buckets=(0.01, 0.1))
+    calls = registry.counter('calls_total', 'Calls', ['status'])
+    registry.gauge('startup_seconds', 'Startup').set(1.5)
+    registry.gauge('answer', 'Computed on read', function=lambda: 42)
+
+    latency.observe(0.005, stage='fetch')
+    latency.observe(0.05, stage='fetch')
+    latency.observe(1.0, stage='fetch')
+    with latency.time(stage='analyze "rsi"'):
+        pass
+
+    @latency.timed(stage='decorated')
+    def work():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        work()
+    calls.inc(status='ok')
+    calls.inc(2, status='ok')
+
+    text = registry.render()
+    assert '# TYPE stage_duration_seconds histogram' in text
+    assert 'stage_duration_seconds_bucket{stage="fetch",le="0.01"} 1' in text
+    assert 'stage_duration_seconds_bucket{stage="fetch",le="0.1"} 2' in text
+    assert 'stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 3' in text
+    assert 'stage_duration_seconds_count{stage="fetch"} 3' in text
+    assert 'stage_duration_seconds_sum{stage="fetch"} 1.055' in text
+    assert 'stage="analyze \\"rsi\\""' in text
+    assert latency.count(stage='decorated') == 1
+    assert 'calls_total{status="ok"} 3' in text
+    assert 'startup_seconds 1.5' in text
+    assert 'answer 42' in text
+
+    assert registry.histogram('stage_duration_seconds', 'Stage duration', ['stage']) is latency
+    with pytest.raises(ValueError):
+        registry.counter('stage_duration_seconds', 'Stage duration', ['stage'])
+
+def test_disabled_instrumentation_is_cheap():
+    registry = MetricsRegistry(enabled=False)
+    latency = registry.histogram('stage_duration_seconds', 'Stage duration', ['stage'])
+    calls = registry.counter('calls_total', 'Calls', ['status'])
+
+    def span():
+        with latency.time(stage='fetch'):
+            pass
+
+    timed = latency.timed(stage='fetch')(lambda: None)
+    number = 100_000
+    for func in (span, timed, lambda: calls.inc(status='ok')):
+        assert min(timeit.repeat(func, number=number, repeat=5)) / number < 1e-6
+    assert latency.count(stage='fetch') == 0
+    assert calls.value(status='ok') == 0
+
+def test_metrics_endpoint_exposes_hot_path_metrics(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from database.database import Base
+    from database.writer import WriteBehindBuffer
+    import exchanges.binance_client  # объявляет метрики запросов к бирже
+    from web.app import app
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    Base.metadata.create_all(engine)
+    writer = WriteBehindBuffer(sessionmaker(bind=engine), flush_interval=60)
+    writer.add_signal('BTCUSDT', 'RSI', 'BUY', 0.5, 40000.0)
+    writer.close()
+
+    response = TestClient(app).get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert 'db_rows_written_total{table="signals"}' in response.text
+    assert 'db_flush_duration_seconds_count' in response.text
+    assert '# TYPE binance_request_duration_seconds histogram' in response.text
+    assert 'process_resident_memory_bytes ' in response.text
@@ -0,0 +1,192 @@
+import time
+import uuid
+import numpy as np
+import pytest
+from core.market_bus import MarketDataBus, SharedRingBuffer, BusPredictor, CANDLE_DTYPE
+
+def new_prefix():
+    return f"test_{uuid.uuid4().hex[:8]}"
+
+def write_candles(bus_prefix):
+    """Писатель в отдельном процессе: свечи с номерами 0..99"""
+    bus = MarketDataBus.attach(bus_prefix)
+    try:
+        for i in range(100):
+            bus.publish_candle('BTCUSDT', i * 60_000, 1.0, 2.0, 0.5, float(i), 10.0)
+    finally:
+        bus.close()
+
+def flaky_worker(bus_prefix):
+    """Процесс, который падает при первом запуске и работает после перезапуска"""
+    bus = MarketDataBus.attach(bus_prefix)
+    try:
+        bus.publish_prediction('BTCUSDT', {'signal': 'BUY', 'confidence': 0.5, 'predicted_price': 1.0,
+                                           'current_price': 1.0, 'change_percent': 0.0}, 0)
+        if bus.predictions.seq < 2:
+            raise RuntimeError('first start fails')
+        while True:
+            time.sleep(0.05)
+    finally:
+        bus.close()
+
+def test_ring_buffer_wraps_and_readers_keep_own_position():
+    name = new_prefix()
+    ring = SharedRingBuffer(name, CANDLE_DTYPE, capacity=8, create=True)
+    reader = SharedRingBuffer(name, CANDLE_DTYPE)
+    try:
+        assert reader.capacity == 8
+        for i in range(5):
+            ring.append((b'BTCUSDT', i, 0, 0, 0, float(i), 0))
+        records, position = reader.read(0)
+        assert records['close'].tolist() == [0, 1, 2, 3, 4] and position == 5
+
+        for i in range(5, 20):
+            ring.append((b'BTCUSDT', i, 0, 0, 0, float(i), 0))
+        # Отставший читатель получает последние capacity - 1 записей
+        records, position = reader.read(position)
+        assert records['open_time'].tolist() == list(range(13, 20)) and position == 20
+        records, _ = reader.read(18, limit=1)
+        assert records['open_time'].tolist() == [18]
+        assert len(reader.read(position)[0]) == 0
+    finally:
+        reader.close()
+        ring.close()
+        ring.unlink()
+
+class WritingDuringCopy:
+    """Записи кольца, в которые писатель пишет во время копирования читателем"""
+    def __init__(self, records, write):
+        self.records = records
+        self.write = write
+
+    def __getitem__(self, key):
+        self.write()
+        return self.records[key]
+
+def test_ring_buffer_drops_records_overwritten_during_read():
+    name = new_prefix()
+    ring = SharedRingBuffer(name, CANDLE_DTYPE, capacity=8, create=True)
+    reader = SharedRingBuffer(name, CANDLE_DTYPE)
+    try:
+        for i in range(8):
+            ring.append((b'BTCUSDT', i, 0, 0, 0, float(i), 0))
+
+        def write():
+            for i in range(8, 11):
+                ring.append((b'BTCUSDT', i, 0, 0, 0, float(i), 0))
+
+        reader._records = WritingDuringCopy(reader._records, write)
+        # Записи 1-2 перезаписаны, ячейку записи 3 писатель заполняет следующей
+        records, position = reader.read(0)
+        assert records['open_time'].tolist() == [4, 5, 6, 7] and position == 8
+    finally:
+        reader.close()
+        ring.close()
+        ring.unlink()
+
+def test_bus_carries_candles_across_processes_and_events_from_hub():
+    import multiprocessing
+    from core.event_hub import EventHub
+
+    bus = MarketDataBus.create(new_prefix(), capacities={'candles': 256})
+    try:
+        process = multiprocessing.get_context('spawn').Process(target=write_candles, args=(bus.prefix,))
+        process.start()
+        process.join(60)
+        assert process.exitcode == 0
+        records, position = bus.candles.read(0)
+        assert position == 100
+        np.testing.assert_array_equal(records['close'], np.arange(100.0))
+        assert records['symbol'][0] == b'BTCUSDT'
+
+        hub = EventHub()
+        hub.sinks.append(bus.publish_event)
+        hub.publish('candle', {'symbol': 'ETHUSDT', 'open_time': np.datetime64('2024-01-01T00:00', 'ms'),
+                               'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 3.0})
+        hub.publish('trade', {'symbol': 'ETHUSDT', 'side': 'BUY'})
+        hub.publish('pnl', {'blob': 'x' * 5000})
+        bus.events.append((b'{"type": "trade"',))
+        hub.publish('signal', {'symbol': 'ETHUSDT', 'signal': 'HOLD'})
+
+        records, _ = bus.candles.read(position)
+        assert records['symbol'].tolist() == [b'ETHUSDT']
+        assert records['open_time'][0] == 1704067200000
+        events, _ = bus.read_events(0)
+        # Слишком большое событие не попадает в кольцо, испорченное пропускается,
+        # остальные идут по порядку
+        assert [event_type for event_type, _ in events] == ['candle', 'trade', 'signal']
+        assert events[1][1] == {'symbol': 'ETHUSDT', 'side': 'BUY'}
+    finally:
+        bus.close()
+
+def test_bus_predictor_returns_latest_fresh_prediction():
+    bus = MarketDataBus.create(new_prefix())
+    try:
+        predictor = BusPredictor(bus, max_age=60, wait=0.05)
+        assert predictor.get_trend_signal('BTCUSDT', 100.0)['signal'] == 'HOLD'
+
+        for signal in ('SELL', 'STRONG_BUY'):
+            bus.publish_prediction('BTCUSDT', {'signal': signal, 'confidence': 0.8, 'predicted_price': 103.0,
+                                               'current_price': 100.0, 'change_percent': 3.0}, 0)
+        result = predictor.get_trend_signal('BTCUSDT', 101.0)
+        assert result['signal'] == 'STRONG_BUY'
+        assert result['predicted_price'] == 103.0 and result['current_price'] == 101.0
+
+        # После новой свечи прогноз прошлой свечи не используется
+        bus.publish_candle('BTCUSDT', 60_000, 1.0, 2.0, 0.5, 101.0, 10.0)
+        assert predictor.get_trend_signal('BTCUSDT', 101.0)['signal'] == 'HOLD'
+        bus.publish_prediction('BTCUSDT', {'signal': 'SELL', 'confidence': 0.8, 'predicted_price': 99.0,
+                                           'current_price': 101.0, 'change_percent': -2.0}, 60_000)
+        assert predictor.get_trend_signal('BTCUSDT', 101.0)['signal'] == 'SELL'
+
+        predictor.max_age = 0
+        time.sleep(0.01)
+        assert predictor.get_trend_signal('BTCUSDT', 101.0)['signal'] == 'HOLD'
+    finally:
+        bus.close()
+
+def test_supervisor_restarts_crashed_process_and_stops_cleanly():
+    from core.supervisor import Supervisor, ProcessSpec
+
+    supervisor = Supervisor([ProcessSpec('flaky', flaky_worker)], bus_prefix=new_prefix(), restart_delay=0.1)
+    supervisor.start()
+    try:
+        deadline = time.monotonic() + 60
+        while supervisor.bus.predictions.seq < 2 and time.monotonic() < deadline:
+            supervisor.poll(0.1)
+        assert supervisor.restarts['flaky'] == 1
+        process = supervisor.processes['flaky']
+        time.sleep(0.5)
+        assert process.is_alive()
+    finally:
+        supervisor.stop(timeout=20)
+
+    assert process.exitcode == 0
+    assert supervisor.processes == {}
+    with pytest.raises(FileNotFoundError):
+        MarketDataBus.attach(supervisor.bus_prefix)
+
+def test_web_metrics_include_child_processes():
+    from utils.instrumentation import MetricsRegistry
+
+    bus = MarketDataBus.create(new_prefix())
+    try:
+        child = MetricsRegistry()
+        child.counter('bot_errors_total', 'Errors', ['component']).inc(component='ml')
+        child.gauge('bot_startup_seconds', 'Startup').set(2.5)
+        bus.publish_metrics('trading', child.render())
+
+        web = MetricsRegistry()
+        web.counter('bot_errors_total', 'Errors', ['component']).inc(component='web')
+        assert 'process=' not in web.render_all('web')
+        snapshots, _ = bus.read_metrics(0)
+        for process, text in snapshots.items():
+            web.set_remote(process, text)
+
+        lines = web.render_all('web').splitlines()
+        assert lines.count('# TYPE bot_errors_total counter') == 1
+        assert 'bot_errors_total{process="web",component="web"} 1' in lines
+        assert 'bot_errors_total{process="trading",component="ml"} 1' in lines
+        assert 'bot_startup_seconds{process="trading"} 2.5' in lines
+    finally:
+        bus.close()
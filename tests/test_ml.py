@@ -0,0 +1,398 @@
+import os
+import time
+import numpy as np
+import pytest
+from ml.data.data_loader import CandleStore, INTERVAL_MS
+
+HOUR = INTERVAL_MS['1h']
+
+class FakeHistoricalClient:
+    def __init__(self, last_open_time, count):
+        self.klines = [
+            [t, '1', '2', '0.5', str(float(i)), '10', t + HOUR - 1, '0', 1, '0', '0', '0']
+            for i, t in enumerate(range(last_open_time - (count - 1) * HOUR, last_open_time + 1, HOUR))
+        ]
+        self.requests = []
+
+    def get_historical_klines(self, symbol, interval, start_str, end_str):
+        self.requests.append((start_str, end_str))
+        return [k for k in self.klines if start_str <= k[0] <= end_str]
+
+def test_candle_store_syncs_only_missing_tail(tmp_path, monkeypatch):
+    now_ms = int(time.time() * 1000)
+    current_open = now_ms - now_ms % HOUR
+    client = FakeHistoricalClient(current_open, count=51)
+    store = CandleStore(client, path=str(tmp_path / 'candles.db'))
+    start_ms = current_open - 50 * HOUR
+
+    # Текущая незакрытая свеча не сохраняется
+    assert store.sync('BTCUSDT', '1h', start_ms) == 50
+    assert store.sync('BTCUSDT', '1h', start_ms) == 0
+    assert len(client.requests) == 1
+
+    # Через час закрывается еще одна свеча: запрашивается только хвост
+    monkeypatch.setattr(time, 'time', lambda: (now_ms + HOUR) / 1000)
+    client.klines = FakeHistoricalClient(current_open + HOUR, count=52).klines
+    assert store.sync('BTCUSDT', '1h', start_ms) == 1
+    assert client.requests[-1][0] == current_open - HOUR + 1
+
+    candles = store.load('BTCUSDT', '1h', start_ms=start_ms)
+    assert candles['close'].dtype == np.float64
+    assert candles['open_time'].dtype == np.int64
+    assert len(candles['close']) == 51
+    assert np.all(np.diff(candles['open_time']) == HOUR)
+    assert candles['open_time'][-1] == current_open
+
+class StubModel:
+    sequence_length = 3
+    horizons = (1, 4)
+
+    def __init__(self):
+        self.batches = []
+        self.loaded = None
+
+    def load_model(self, filepath):
+        self.loaded = filepath
+
+    def predict_batch(self, windows):
+        self.batches.append(windows)
+        return np.column_stack([windows[:, -1] + 1, windows[:, -1] + 4])
+
+class StubStore:
+    def sync(self, symbol, interval, start_ms, end_ms=None):
+        return 0
+
+    def load(self, symbol, interval, start_ms=None, end_ms=None):
+        base = {'BTCUSDT': 100.0, 'ETHUSDT': 10.0}[symbol]
+        return {'close': base + np.arange(3, dtype=np.float64)}
+
+def test_predictions_use_model_per_symbol_and_are_cached_per_candle():
+    from ml.prediction.predictor import PricePredictor
+
+    predictor = PricePredictor(model_factory=StubModel, binance=object(), candle_store=StubStore())
+
+    # Модели загружаются в фоне, до готовности прогнозов нет
+    assert predictor.predict_many(['BTCUSDT', 'ETHUSDT']) == {}
+    for symbol in ('BTCUSDT', 'ETHUSDT'):
+        assert predictor.wait_model(symbol, timeout=5) is not None
+    predictions = predictor.predict_many(['BTCUSDT', 'ETHUSDT'])
+    np.testing.assert_array_equal(predictions['BTCUSDT'], [103.0, 106.0])
+    np.testing.assert_array_equal(predictions['ETHUSDT'], [13.0, 16.0])
+
+    # Цены ETHUSDT не проходят через модель и масштабирование BTCUSDT
+    btc, eth = predictor.models['BTCUSDT'], predictor.models['ETHUSDT']
+    assert btc is not eth
+    assert btc.loaded == 'models/btcusdt_lstm' and eth.loaded == 'models/ethusdt_lstm'
+    assert [len(batch) for batch in btc.batches] == [1]
+    assert [len(batch) for batch in eth.batches] == [1]
+
+    signal = predictor.get_trend_signal('BTCUSDT', current_price=100.0)
+    assert signal['signal'] == 'STRONG_BUY'
+    assert signal['horizon_predictions'] == {1: 103.0, 4: 106.0}
+    assert len(btc.batches) == 1
+    assert predictor.cache_hits == 1
+
+def test_lstm_predict_batch_returns_all_horizons():
+    from ml.models.lstm_model import LSTMPricePredictor
+
+    prices = 100 + np.sin(np.arange(200) / 10)
+    model = LSTMPricePredictor(sequence_length=10, horizons=(1, 3))
+    X, y = model.prepare_data(prices)
+    assert X.shape == (188, 10, 1)
+    assert y.shape == (188, 2)
+
+    windows = np.stack([prices[-10:], prices[-20:-10]])
+    assert model.predict_batch(windows).shape == (2, 2)
+    assert np.isscalar(model.predict(prices))
+
+def test_lstm_windows_are_views_and_train_chronologically():
+    from ml.models.lstm_model import LSTMPricePredictor
+
+    prices = 100 + np.sin(np.arange(300) / 10)
+    model = LSTMPricePredictor(sequence_length=20, epochs=1, batch_size=64, horizons=(1, 2))
+    X, y = model.prepare_data(prices)
+
+    scaled = model.scaler.transform(prices.reshape(-1, 1)).ravel()
+    np.testing.assert_allclose(X[5, :, 0], scaled[5:25], rtol=1e-6)
+    np.testing.assert_allclose(y[5], scaled[[25, 26]], rtol=1e-6)
+    assert not X.flags.owndata
+    assert X.base is not None
+
+    batches = list(model.make_dataset(X, y))
+    assert len(batches) == 5
+    assert batches[0][0].shape == (64, 20, 1)
+
+    history = model.train(prices)
+    assert set(history.history) >= {'loss', 'val_loss'}
+
+def test_missing_model_is_trained_in_background_and_signal_holds_meanwhile():
+    import threading
+    from ml.prediction.predictor import PricePredictor
+
+    gate = threading.Event()
+
+    class SlowModel(StubModel):
+        def load_model(self, filepath):
+            # Долгая загрузка или обучение модели
+            assert gate.wait(5)
+            super().load_model(filepath)
+
+    predictor = PricePredictor(model_factory=SlowModel, binance=object(), candle_store=StubStore())
+    started = time.perf_counter()
+    assert predictor.get_trend_signal('BTCUSDT', 100.0)['signal'] == 'HOLD'
+    assert predictor.predict_many(['BTCUSDT']) == {}
+    assert time.perf_counter() - started < 1
+
+    gate.set()
+    assert predictor.wait_model('BTCUSDT', timeout=5) is not None
+    assert predictor.get_trend_signal('BTCUSDT', 100.0)['signal'] == 'STRONG_BUY'
+
+def test_predictor_registry_loads_once_in_background():
+    import threading
+    import pandas as pd
+    from ml.prediction.registry import PredictorRegistry
+    from ml.strategies.ml_strategy import MLStrategy
+
+    release = threading.Event()
+    created = []
+
+    class SlowPredictor:
+        def __init__(self, binance=None):
+            created.append(binance)
+            release.wait(5)
+
+        def load_or_train(self, symbol):
+            self.symbol = symbol
+
+        def get_trend_signal(self, symbol, current_price):
+            return {'signal': 'BUY', 'confidence': 0.4, 'predicted_price': 101.0, 'change_percent': 1.0}
+
+    registry = PredictorRegistry({'lstm': SlowPredictor})
+    strategy = MLStrategy(registry)
+    data = pd.DataFrame({'close': np.linspace(100, 110, 20)})
+    data.attrs['symbol'] = 'ETHUSDT'
+
+    binance = object()
+    thread = registry.load_async('lstm', 'BTCUSDT', binance=binance)
+    # Пока модель загружается, стратегия держит HOLD и не запускает вторую загрузку
+    assert strategy.analyze(data)['details'] == {'status': 'loading'}
+    assert registry.load_async('lstm', 'BTCUSDT') is thread
+
+    release.set()
+    assert registry.get('lstm', timeout=5) is strategy.predictor
+    assert created == [binance]
+    assert strategy.predictor.symbol == 'BTCUSDT'
+    assert strategy.analyze(data)['signal'] == 'BUY'
+    assert registry.load_times['lstm'] > 0
+
+def test_predictor_registry_retries_failed_load_after_interval():
+    from ml.prediction.registry import PredictorRegistry
+
+    attempts = []
+
+    def failing(binance=None):
+        attempts.append(binance)
+        raise RuntimeError('no model')
+
+    binance = object()
+    registry = PredictorRegistry({'lstm': failing}, retry_interval=3600)
+    assert registry.get('lstm', timeout=5, binance=binance) is None
+    assert registry.load_async('lstm') is None
+    registry.retry_interval = 0
+    # Повтор без аргументов, как из MLStrategy, получает тот же клиент биржи
+    assert registry.get('lstm', timeout=5) is None
+    assert attempts == [binance, binance]
+
+def test_bot_import_does_not_load_tensorflow():
+    import subprocess
+    import sys
+
+    code = "import sys, core.bot; print('tensorflow' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
+
+def synthetic_candles(n=600, seed=5, start_ms=1_704_067_200_000, step_ms=3_600_000):
+    rng = np.random.default_rng(seed)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return {
+        'open_time': start_ms + step_ms * np.arange(n, dtype=np.int64),
+        'open': close * (1 + rng.normal(0, 0.001, n)),
+        'high': close * 1.01,
+        'low': close * 0.99,
+        'close': close,
+        'volume': rng.uniform(1, 100, n)
+    }
+
+def test_features_match_ta_indicators(tmp_path):
+    import pandas as pd
+    import ta
+    from ml.features.feature_engineering import FeaturePipeline, FeatureSet
+
+    candles = synthetic_candles()
+    feature_set = FeatureSet()
+    matrix = FeaturePipeline(feature_set, str(tmp_path)).transform(candles)
+    column = {name: matrix[:, i] for i, name in enumerate(feature_set.features)}
+    close = pd.Series(candles['close'])
+
+    np.testing.assert_allclose(column['rsi'], ta.momentum.RSIIndicator(close).rsi(), equal_nan=True)
+    macd = ta.trend.MACD(close)
+    np.testing.assert_allclose(column['macd'], macd.macd(), equal_nan=True)
+    np.testing.assert_allclose(column['macd_signal'], macd.macd_signal(), equal_nan=True)
+    bands = ta.volatility.BollingerBands(close)
+    np.testing.assert_allclose(column['bb_percent'], bands.bollinger_pband(), equal_nan=True, atol=1e-9)
+    np.testing.assert_allclose(column['bb_width'] * 100, bands.bollinger_wband(), equal_nan=True)
+    np.testing.assert_allclose(column['volatility'], np.log(close).diff().rolling(20).std(), equal_nan=True)
+    # 2024-01-01 00:00 UTC - понедельник, полночь
+    assert column['hour_sin'][0] == 0 and column['hour_cos'][0] == 1
+    assert column['weekday_cos'][0] == 1
+
+    subset = FeatureSet(features=('rsi', 'log_volume'))
+    assert subset.key != feature_set.key
+    np.testing.assert_array_equal(FeaturePipeline(subset, str(tmp_path)).transform(candles)[:, 0], column['rsi'])
+    with pytest.raises(ValueError):
+        FeatureSet(features=('rsi', 'unknown'))
+
+def test_feature_cache_appends_new_candles_identically_to_full_pass(tmp_path):
+    from ml.features.feature_engineering import FeaturePipeline
+
+    candles = synthetic_candles()
+    pipeline = FeaturePipeline(path=str(tmp_path))
+    assert pipeline.update('BTCUSDT', '1h', {k: v[:400] for k, v in candles.items()}) == 400
+    # В живом режиме приходит короткий хвост: контекст окон и новые свечи
+    for end in range(401, 601, 3):
+        tail = {k: v[end - 40:end] for k, v in candles.items()}
+        pipeline.update('BTCUSDT', '1h', tail)
+    assert pipeline.update('BTCUSDT', '1h', {k: v[-40:-10] for k, v in candles.items()}) == 0
+
+    open_time, matrix = pipeline.load('BTCUSDT', '1h')
+    np.testing.assert_array_equal(open_time, candles['open_time'][:599])
+    np.testing.assert_array_equal(matrix, pipeline.transform(candles)[:599])
+    assert pipeline.get_range('BTCUSDT', '1h') == (int(candles['open_time'][0]), int(candles['open_time'][598]))
+
+    start = int(candles['open_time'][500])
+    open_time, window = pipeline.load('BTCUSDT', '1h', start_ms=start)
+    assert open_time[0] == start and len(window) == 99
+
+    # Недописанная после сбоя строка при чтении пропускается, а при записи обрезается
+    path = pipeline.file_path('BTCUSDT', '1h')
+    size = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'\0' * 12)
+    assert pipeline.get_range('BTCUSDT', '1h')[1] == int(candles['open_time'][598])
+    assert len(pipeline.load('BTCUSDT', '1h')[0]) == 599
+    assert os.path.getsize(path) == size + 12
+    assert pipeline.update('BTCUSDT', '1h', candles) == 1
+    np.testing.assert_array_equal(pipeline.load('BTCUSDT', '1h')[1], pipeline.transform(candles))
+
+    # Разрыв в свечах ведет к пересчету
+    gap = {k: v[620:] for k, v in synthetic_candles(n=700).items()}
+    assert pipeline.update('BTCUSDT', '1h', gap) == 80
+    assert pipeline.get_range('BTCUSDT', '1h')[0] == int(gap['open_time'][0])
+
+def test_predictor_features_reuse_cache_between_calls(tmp_path, monkeypatch):
+    import time as time_module
+    from ml.features.feature_engineering import FeaturePipeline
+    from ml.prediction.predictor import PricePredictor
+
+    candles = synthetic_candles()
+
+    class HistoryStore:
+        def __init__(self):
+            self.loads = []
+
+        def sync(self, symbol, interval, start_ms, end_ms=None):
+            return 0
+
+        def load(self, symbol, interval, start_ms=None, end_ms=None):
+            self.loads.append(start_ms)
+            visible = (candles['open_time'] >= start_ms) & (candles['open_time'] <= now_ms - 3_600_000)
+            return {k: v[visible] for k, v in candles.items()}
+
+    now_ms = int(candles['open_time'][500])
+    monkeypatch.setattr(time_module, 'time', lambda: now_ms / 1000)
+    store = HistoryStore()
+    predictor = PricePredictor(model_factory=StubModel, binance=object(), candle_store=store,
+                               feature_pipeline=FeaturePipeline(path=str(tmp_path)))
+
+    open_time, first = predictor.get_features('BTCUSDT', days=10)
+    assert open_time[-1] == candles['open_time'][499]
+    assert len(first) == 10 * 24
+
+    now_ms = int(candles['open_time'][510])
+    open_time, second = predictor.get_features('BTCUSDT', days=10)
+    assert open_time[-1] == candles['open_time'][509]
+    # Вторая загрузка читает только хвост: контекст окон и новые свечи
+    assert store.loads[1] == candles['open_time'][499] - 21 * 3_600_000
+    # Кэш построен с начала первого периода, дальше только дописывался
+    full = predictor.feature_pipeline.transform({k: v[260:510] for k, v in candles.items()})
+    np.testing.assert_array_equal(second, full[-len(second):])
+
+def test_ensemble_fast_predict_matches_sklearn_and_round_trips(tmp_path):
+    from ml.features.feature_engineering import FeaturePipeline
+    from ml.models.ensemble_model import EnsemblePricePredictor
+
+    candles = synthetic_candles(n=1500)
+    features = FeaturePipeline(path=str(tmp_path)).transform(candles)
+    model = EnsemblePricePredictor(horizons=(1, 4), n_jobs=2)
+    X, y = model.prepare_data(features, candles['close'])
+    assert np.isfinite(X).all() and y.shape == (len(X), 2)
+    np.testing.assert_allclose(y[-1], np.log(candles['close'][[-4, -1]] / candles['close'][-5]))
+
+    scores = model.train(features, candles['close'])
+    assert set(scores) == set(model.members) == {'ridge', 'extra_trees', 'random_forest'}
+    assert sum(model.weights.values()) == pytest.approx(1.0)
+
+    rows, prices = features[-50:], candles['close'][-50:]
+    expected = sum(model.weights[name] * estimator.predict(rows) for name, estimator in model.members.items())
+    batch = model.predict_batch(rows, prices)
+    assert batch.shape == (50, 2)
+    np.testing.assert_allclose(batch, prices[:, np.newaxis] * np.exp(expected), rtol=1e-9)
+    assert model.predict(features[-1], prices[-1]) == pytest.approx(batch[-1, 0])
+
+    model.save_model(str(tmp_path / 'btcusdt_ensemble'))
+    loaded = EnsemblePricePredictor()
+    loaded.load_model(str(tmp_path / 'btcusdt_ensemble'))
+    assert loaded.horizons == (1, 4)
+    np.testing.assert_array_equal(loaded.predict_batch(rows, prices), batch)
+
+def test_predictor_uses_ensemble_on_cached_features(tmp_path, monkeypatch):
+    import time as time_module
+    from ml.features.feature_engineering import FeaturePipeline
+    from ml.models.ensemble_model import EnsemblePricePredictor
+    from ml.prediction.predictor import PricePredictor
+
+    history = {'BTCUSDT': synthetic_candles(n=2400, seed=1), 'ETHUSDT': synthetic_candles(n=2400, seed=2)}
+    now_ms = int(history['BTCUSDT']['open_time'][-1]) + 30 * 60 * 1000
+
+    class HistoryStore:
+        def sync(self, symbol, interval, start_ms, end_ms=None):
+            return 0
+
+        def load(self, symbol, interval, start_ms=None, end_ms=None):
+            candles = history[symbol]
+            visible = (candles['open_time'] >= start_ms) & (candles['open_time'] <= min(end_ms or now_ms, now_ms - 3_600_000))
+            return {k: v[visible] for k, v in candles.items()}
+
+    monkeypatch.setattr(time_module, 'time', lambda: now_ms / 1000)
+    monkeypatch.chdir(tmp_path)
+    predictor = PricePredictor(model_factory=lambda: EnsemblePricePredictor(horizons=(1, 3), n_jobs=1),
+                               binance=object(), candle_store=HistoryStore(),
+                               feature_pipeline=FeaturePipeline(path=str(tmp_path / 'features')))
+    assert predictor.uses_features and predictor.model_name == 'ensemble'
+
+    # Одна модель на все символы: обучается один раз и считает их одной пачкой
+    model = predictor.load_or_train('BTCUSDT')
+    assert predictor.load_or_train('ETHUSDT') is model
+    assert (tmp_path / 'models' / 'ensemble_model.pkl').exists()
+    calls = []
+    monkeypatch.setattr(model, 'predict_batch',
+                        lambda *args, predict=model.predict_batch: calls.append(args) or predict(*args))
+    predictions = predictor.predict_many(['BTCUSDT', 'ETHUSDT'])
+    assert predictions['ETHUSDT'].shape == (2,)
+
+    assert len(calls) == 1 and calls[0][0].shape == (2, len(predictor.prototype.feature_set.features))
+    np.testing.assert_array_equal(calls[0][1], [history[symbol]['close'][-2] for symbol in history])
+
+    # Строка признаков для инференса совпадает с полным пересчетом по истории
+    full = predictor.feature_pipeline.transform({k: v[-90 * 24:-1] for k, v in history['BTCUSDT'].items()})
+    np.testing.assert_array_equal(calls[0][0][0], full[-1])
@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from notifications.telegram_notifier import TelegramNotifier, PRIORITY_HIGH, PRIORITY_LOW
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        server = self.server
+        if server.rate_limited:
+            server.rate_limited -= 1
+            self._reply(429, {'ok': False, 'parameters': {'retry_after': 0.1}})
+            return
+        server.messages.append(parse_qs(body)['text'][0])
+        self._reply(200, {'ok': True})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def test_notifier_prioritizes_coalesces_and_retries():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegramHandler)
+    server.messages = []
+    server.rate_limited = 1
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    notifier = TelegramNotifier(base_url=f"http://127.0.0.1:{server.server_port}/botTEST", min_interval=0)
+    # Пока первый отчет ждет повтора после 429, накапливаются остальные
+    notifier.send_message("report 0", priority=PRIORITY_LOW)
+    deadline = time.monotonic() + 5
+    while notifier._pending() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    for i in range(1, 4):
+        notifier.send_message(f"report {i}", priority=PRIORITY_LOW)
+    notifier.send_message("trade", priority=PRIORITY_HIGH)
+
+    assert notifier.flush(timeout=5)
+    notifier.close()
+    server.shutdown()
+
+    assert server.messages == ["report 0", "trade", "report 1\n\nreport 2\n\nreport 3"]
+    assert notifier.sent == 3
+    assert notifier.dropped == 0
+
+def test_notifier_counts_rate_limited_failure_and_keeps_all_trade_alerts():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegramHandler)
+    server.messages = []
+    server.rate_limited = 3
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    notifier = TelegramNotifier(base_url=f"http://127.0.0.1:{server.server_port}/botTEST", min_interval=0,
+                                max_queue_size=2)
+    notifier.send_message("lost", priority=PRIORITY_HIGH)
+    assert notifier.flush(timeout=5)
+    assert (notifier.sent, notifier.failed) == (0, 1)
+
+    # Переполнение отбрасывает отчеты, но не сделки
+    with notifier._condition:
+        for i in range(5):
+            notifier.send_message(f"trade {i}", priority=PRIORITY_HIGH)
+            notifier.send_message(f"report {i}", priority=PRIORITY_LOW)
+    assert notifier.flush(timeout=5)
+    notifier.close()
+    server.shutdown()
+
+    assert server.messages[:5] == [f"trade {i}" for i in range(5)]
+    assert notifier.dropped == 3
@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.database import Base
+from database.models import Trade
+from core.risk_manager import RiskManager
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+def test_risk_manager_rebuilds_and_updates_counters_incrementally():
+    db = make_session()
+    now = datetime.utcnow()
+    yesterday = now - timedelta(days=1)
+    db.add_all([
+        Trade(symbol='BTCUSDT', side='BUY', quantity=0.01, price=100, profit=-30, timestamp=now),
+        Trade(symbol='BTCUSDT', side='SELL', quantity=0.004, price=100, profit=10, timestamp=now),
+        Trade(symbol='ETHUSDT', side='BUY', quantity=0.5, price=10, profit=-500, timestamp=yesterday),
+        Trade(symbol='ETHUSDT', side='BUY', quantity=1.0, price=10, profit=-500, timestamp=now, status='failed')
+    ])
+    db.commit()
+
+    risk = RiskManager(db)
+    assert risk.daily_loss == 30
+    assert risk.daily_pnl == -20
+    assert risk.symbol_pnl == {'BTCUSDT': -20, 'ETHUSDT': 0}
+    assert abs(risk.exposure['BTCUSDT'] - 0.006) < 1e-12
+    assert risk.exposure['ETHUSDT'] == 0.5
+    assert risk.check_daily_loss_limit()
+
+    risk.record_fill('BTCUSDT', 'SELL', 0.006, profit=-80, timestamp=now)
+    assert risk.daily_loss == 110
+    assert abs(risk.exposure['BTCUSDT']) < 1e-12
+    assert risk.should_stop_trading()
+
+    # После полуночи UTC дневные счетчики обнуляются, позиции остаются
+    risk.record_fill('ETHUSDT', 'SELL', 0.5, profit=5, timestamp=now + timedelta(days=1))
+    assert risk.daily_loss == 0
+    assert risk.daily_pnl == 5
+    assert risk.exposure['ETHUSDT'] == 0
+
+def test_risk_manager_realizes_pnl_from_entry_price():
+    db = make_session()
+    db.add_all([
+        Trade(symbol='BTCUSDT', side='BUY', quantity=1.0, price=90, profit=None, timestamp=datetime.utcnow() - timedelta(days=3)),
+        Trade(symbol='BTCUSDT', side='BUY', quantity=1.0, price=100, profit=None, timestamp=datetime.utcnow())
+    ])
+    db.commit()
+
+    # Позиция открыта до запуска: цена входа восстанавливается по последним покупкам
+    risk = RiskManager(db)
+    assert risk.exposure['BTCUSDT'] == 2.0
+    assert risk.entry_price['BTCUSDT'] == 95
+
+    assert risk.record_fill('BTCUSDT', 'BUY', 2.0, price=105) is None
+    assert risk.entry_price['BTCUSDT'] == 100
+    assert risk.record_fill('BTCUSDT', 'SELL', 1.0, price=90) == -10
+    assert risk.entry_price['BTCUSDT'] == 100
+    assert risk.record_fill('BTCUSDT', 'SELL', 3.0, price=110) == 30
+    assert 'BTCUSDT' not in risk.entry_price
+    assert risk.daily_loss == 10
+    assert risk.daily_pnl == 20
+
+class ImmediateExecution:
+    """Исполнение без биржи: ордер сразу получает заданный статус"""
+    def __init__(self, status='TEST', order=None):
+        self.status = status
+        self.order = order
+
+    def submit(self, symbol, side, quantity, signal_time=None, test=False):
+        from concurrent.futures import Future
+
+        future = Future()
+        result = {'symbol': symbol, 'side': side, 'client_order_id': f'{side}-1', 'status': self.status}
+        if self.order is not None:
+            result['order'] = self.order
+        future.set_result(result)
+        return future
+
+class Recorder:
+    def __init__(self):
+        self.trades = []
+
+    def add_trade(self, **trade):
+        self.trades.append(trade)
+
+    def send_message(self, *args, **kwargs):
+        pass
+
+def make_bot(execution=None):
+    from core.bot import TradingBot
+
+    bot = TradingBot.__new__(TradingBot)
+    bot.symbol = 'BTCUSDT'
+    bot.quantity = 1.0
+    bot.execution = execution or ImmediateExecution()
+    bot.writer = bot.notifier = Recorder()
+    bot.risk_manager = RiskManager(make_session())
+    return bot
+
+def test_bot_losing_round_trip_hits_daily_loss_limit():
+    bot = make_bot()
+
+    assert bot.execute_trade('BUY', 'BTCUSDT', price=1000.0) is not None
+    assert bot.execute_trade('SELL', 'BTCUSDT', price=850.0) is not None
+    assert [trade['profit'] for trade in bot.writer.trades] == [None, -150.0]
+    assert bot.risk_manager.daily_loss == 150
+    assert bot.risk_manager.should_stop_trading()
+    # Лимит достигнут: новые сделки не отправляются
+    assert bot.execute_trade('BUY', 'BTCUSDT', price=800.0) is None
+
+@pytest.mark.parametrize('status, executed, quantity, recorded', [
+    ('FILLED', '1.00000000', 1.0, 'executed'),
+    ('PARTIALLY_FILLED', '0.40000000', 0.4, 'executed'),
+    ('EXPIRED', '0.00000000', 1.0, 'expired'),
+    ('CANCELED', '0.00000000', 1.0, 'canceled'),
+    ('NEW', '0.00000000', 1.0, 'new')
+])
+def test_bot_records_only_executed_quantity(status, executed, quantity, recorded):
+    order = {'status': status, 'executedQty': executed, 'cummulativeQuoteQty': str(float(executed) * 1000)}
+    bot = make_bot(ImmediateExecution(status, order))
+
+    assert bot.execute_trade('BUY', 'BTCUSDT', price=1000.0, strategy='MACD') is not None
+    trade, = bot.writer.trades
+    assert (trade['quantity'], trade['status'], trade['strategy']) == (quantity, recorded, 'MACD')
+    # Неисполненный ордер не открывает позицию
+    assert bot.risk_manager.exposure.get('BTCUSDT', 0.0) == (quantity if recorded == 'executed' else 0.0)
+
+def test_partial_fill_realizes_pnl_on_executed_quantity_against_configured_limit(monkeypatch):
+    from config.settings import settings
+
+    monkeypatch.setattr(settings, 'MAX_DAILY_LOSS', 50.0)
+    bot = make_bot()
+    assert bot.risk_manager.daily_loss_limit == 50.0
+    assert bot.execute_trade('BUY', 'BTCUSDT', price=1000.0) is not None
+
+    order = {'status': 'PARTIALLY_FILLED', 'executedQty': '0.40000000', 'cummulativeQuoteQty': '340.00000000'}
+    bot.execution = ImmediateExecution('PARTIALLY_FILLED', order)
+    assert bot.execute_trade('SELL', 'BTCUSDT', price=900.0) is not None
+    # Убыток только по исполненным 0.4 по средней цене исполнения 850
+    assert bot.writer.trades[-1]['profit'] == pytest.approx(-60.0)
+    assert bot.risk_manager.exposure['BTCUSDT'] == pytest.approx(0.6)
+    assert bot.risk_manager.should_stop_trading()
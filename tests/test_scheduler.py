@@ -0,0 +1,43 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from core.scheduler import MultiSymbolScheduler
+
+class FakeBot:
+    def __init__(self, symbols, delay=0.05):
+        self.symbols = symbols
+        self.delay = delay
+        self.analyzed = []
+        self.lock = threading.Lock()
+
+    def get_market_data(self, symbol):
+        time.sleep(self.delay)
+        return pd.DataFrame({'close': [1.0, 2.0], 'close_time': [1, 2]})
+
+    def run_strategy(self, data, symbol):
+        time.sleep(self.delay)
+        with self.lock:
+            self.analyzed.append(symbol)
+
+def test_scheduler_processes_symbols_concurrently():
+    symbols = [f"COIN{i}USDT" for i in range(40)]
+    bot = FakeBot(symbols)
+    scheduler = MultiSymbolScheduler(bot, max_concurrency=40)
+
+    async def two_ticks():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=40))
+        started = time.perf_counter()
+        await scheduler.tick()
+        elapsed = time.perf_counter() - started
+        # Повторный тик без новых свечей не запускает анализ
+        await scheduler.tick()
+        return elapsed
+
+    elapsed = asyncio.run(two_ticks())
+
+    # Последовательно 40 символов заняли бы 4 секунды
+    assert elapsed < 1.0
+    assert sorted(bot.analyzed) == sorted(symbols)
+    assert all(state.runs == 1 for state in scheduler.states.values())
@@ -1,5 +1,11 @@
+import numpy as np
 import pandas as pd
+import pytest
+import ta
 from strategies.rsi_strategy import RSIStrategy
+from strategies.macd_strategy import MACDStrategy
+from strategies.bollinger_strategy import BollingerBandsStrategy
+from strategies.indicators import WilderRSI, StreamingMACD, RollingBollinger
 
 def test_rsi_strategy():
     # Создаем тестовые данные
@@ -14,5 +20,94 @@ def test_rsi_strategy():
     assert result['signal'] in ['BUY', 'SELL', 'HOLD']
     print("RSI Strategy test passed!")
 
+def random_closes(n=300, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.Series(40000 * np.exp(np.cumsum(rng.normal(0, 0.01, n))))
+
+def test_streaming_indicators_match_ta():
+    closes = random_closes()
+
+    rsi = WilderRSI(14)
+    macd = StreamingMACD()
+    bands = RollingBollinger(20, 2.0)
+    streamed = np.array([
+        (rsi.update(c), *macd.update(c), bands.update(c)[0]) for c in closes
+    ])
+
+    expected_macd = ta.trend.MACD(closes)
+    np.testing.assert_array_equal(streamed[:, 0], ta.momentum.RSIIndicator(closes).rsi())
+    np.testing.assert_array_equal(streamed[:, 1], expected_macd.macd())
+    np.testing.assert_array_equal(streamed[:, 2], expected_macd.macd_signal())
+    np.testing.assert_allclose(streamed[:, 3], ta.volatility.BollingerBands(closes).bollinger_hband(), rtol=1e-10)
+
+@pytest.mark.parametrize('strategy_cls', [RSIStrategy, MACDStrategy, BollingerBandsStrategy])
+def test_streaming_update_matches_analyze(strategy_cls):
+    closes = random_closes(n=200, seed=3)
+    streaming = strategy_cls()
+    streaming.seed(closes[:50])
+
+    for i in range(50, len(closes)):
+        result = streaming.update(closes[i])
+        expected = strategy_cls().analyze(pd.DataFrame({'close': closes[:i+1]}))
+        assert result['signal'] == expected['signal']
+        assert result['confidence'] == pytest.approx(expected['confidence'])
+        assert result['details'] == pytest.approx(expected['details'])
+
+@pytest.mark.parametrize('strategy_cls', [RSIStrategy, MACDStrategy, BollingerBandsStrategy])
+def test_live_signals_update_only_new_candles(strategy_cls):
+    from core.streaming_signals import StreamingSignals
+
+    minute = 60_000
+    closes = random_closes(n=260, seed=4).to_numpy()
+    candles = pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=len(closes), freq='1min'),
+        'close': closes,
+        'close_time': np.arange(1, len(closes) + 1) * minute - 1 + 1_704_067_200_000
+    })
+    signals = StreamingSignals({'rule': strategy_cls})
+
+    # Опрос REST: окно из 100 свечей, последняя еще не закрыта
+    for end in range(100, 200):
+        window = candles.iloc[end - 100:end]
+        now_ms = int(window['close_time'].iloc[-1]) - 1000
+        result = signals.analyze('rule', 'BTCUSDT', window, now_ms=now_ms)
+        expected = strategy_cls().analyze(candles.iloc[:end])
+        assert result['signal'] == expected['signal']
+        assert result['confidence'] == pytest.approx(expected['confidence'])
+        assert result['details'] == pytest.approx(expected['details'])
+    # Каждая свеча передана в update один раз, незакрытая - только на копии состояния
+    assert signals.seeds == 1
+    assert signals.updates == 100
+
+    # Закрытые окна потока; разрыв в свечах ведет к новой инициализации
+    window = candles.iloc[210:260]
+    result = signals.analyze('rule', 'BTCUSDT', window, now_ms=int(window['close_time'].iloc[-1]) + 1)
+    expected = strategy_cls().analyze(window)
+    assert signals.seeds == 2
+    assert result['signal'] == expected['signal']
+    assert result['details'] == pytest.approx(expected['details'])
+
+def test_indicator_cache_shared_between_strategies():
+    from core.indicator_cache import IndicatorCache
+
+    closes = random_closes(n=100)
+    data = pd.DataFrame({'close': closes, 'close_time': np.arange(len(closes)) * 60000})
+    data.attrs.update(symbol='BTCUSDT', interval='15m')
+    cache = IndicatorCache()
+
+    first, second, macd = RSIStrategy(), RSIStrategy(rsi_overbought=80), MACDStrategy()
+    for strategy in (first, second, macd):
+        strategy.indicator_cache = cache
+
+    expected = RSIStrategy().analyze(data.copy())
+    assert first.analyze(data) == expected
+    second.analyze(data)
+    macd.analyze(data)
+    macd.analyze(data)
+
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 2
+    assert list(data.columns) == ['close', 'close_time']
+
 if __name__ == "__main__":
     test_rsi_strategy()
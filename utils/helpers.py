@@ -0,0 +1,13 @@
+import os
+import resource
+import sys
+
+def memory_usage_mb() -> float:
+    """Резидентная память процесса в мегабайтах"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        # Без /proc доступен только пик: на Linux в килобайтах, на macOS в байтах
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
@@ -0,0 +1,279 @@
+import bisect
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Optional, Sequence, Tuple
+from config.settings import settings
+from utils.helpers import memory_usage_mb
+
+# Корзины гистограмм длительности в секундах
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class _NoopSpan:
+    """Замер, который ничего не делает, когда инструментирование выключено"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+class _Span:
+    __slots__ = ('histogram', 'key', 'started')
+
+    def __init__(self, histogram, key):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram._observe(self.key, time.perf_counter() - self.started)
+        return False
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, registry, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple, extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list:
+        lines = super().render()
+        with self._lock:
+            items = list(self._values.items())
+        lines.extend(f"{self.name}{self._labels(key)} {_format(value)}" for key, value in items)
+        return lines
+
+class Gauge(_Metric):
+    """Текущее значение; функция вызывается при каждом чтении метрик"""
+    type_name = 'gauge'
+
+    def __init__(self, *args, function: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list:
+        lines = super().render()
+        if self.function is not None:
+            lines.append(f"{self.name} {_format(self.function())}")
+            return lines
+        with self._lock:
+            items = list(self._values.items())
+        lines.extend(f"{self.name}{self._labels(key)} {_format(value)}" for key, value in items)
+        return lines
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # Ключ меток -> [счетчики корзин (последняя - +Inf), сумма, количество]
+        self._values: Dict[Tuple, list] = {}
+
+    def time(self, **labels):
+        """Контекстный менеджер замера длительности блока"""
+        if not self.registry.enabled:
+            return _NOOP_SPAN
+        return _Span(self, self._key(labels))
+
+    def timed(self, **labels):
+        """Декоратор замера длительности вызова функции"""
+        def decorator(func):
+            key = self._key(labels)
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.registry.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._observe(key, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def observe(self, value: float, **labels):
+        if self.registry.enabled:
+            self._observe(self._key(labels), value)
+
+    def _observe(self, key: Tuple, value: float):
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self) -> list:
+        lines = super().render()
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket
+                le = 'le="' + _format(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Метрики процесса в текстовом формате Prometheus
+    Метрики объявляются один раз на уровне модуля; повторное объявление
+    с тем же именем возвращает существующий объект. Когда registry.enabled
+    выключен, замеры и счетчики сводятся к одной проверке флага.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        # Последние метрики других процессов: имя процесса -> текст
+        self.remote: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames, function=function)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def set_remote(self, process: str, text: str):
+        """Метрики другого процесса для общей выдачи"""
+        with self._lock:
+            self.remote[process] = text
+
+    def render_all(self, process: str) -> str:
+        """Метрики процесса вместе с метриками других процессов, с меткой process"""
+        with self._lock:
+            remote = dict(self.remote)
+        if not remote:
+            return self.render()
+        return merge_expositions({process: self.render(), **remote})
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+def merge_expositions(texts: Dict[str, str]) -> str:
+    """Объединение выдач нескольких процессов в одну
+    Каждое семейство метрик выводится один раз, к строкам значений
+    добавляется метка process с именем процесса.
+    """
+    families: Dict[str, dict] = {}
+    for process, text in texts.items():
+        family = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith('#'):
+                parts = line.split(' ', 3)
+                if len(parts) >= 3 and parts[1] in ('HELP', 'TYPE'):
+                    family = families.setdefault(parts[2], {'HELP': None, 'TYPE': None, 'samples': []})
+                    family[parts[1]] = family[parts[1]] or line
+                continue
+            if family is None:
+                family = families.setdefault('', {'HELP': None, 'TYPE': None, 'samples': []})
+            family['samples'].append(_with_label(line, f'process="{_escape(process)}"'))
+
+    lines = []
+    for family in families.values():
+        lines.extend(line for line in (family['HELP'], family['TYPE']) if line)
+        lines.extend(family['samples'])
+    return '\n'.join(lines) + '\n'
+
+def _with_label(sample: str, label: str) -> str:
+    # Имя метрики заканчивается на '{' с метками или на пробел перед значением
+    end = min(i for i in (sample.find('{'), sample.find(' ')) if i >= 0)
+    if sample[end] == '{':
+        return f"{sample[:end + 1]}{label},{sample[end + 1:]}"
+    return f"{sample[:end]}{{{label}}}{sample[end:]}"
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Общий реестр процесса: бот пишет метрики, веб-сервер отдает их на /metrics
+metrics = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+errors = metrics.counter('bot_errors_total', 'Errors caught and logged, by component', ['component'])
+metrics.gauge('process_resident_memory_bytes', 'Resident memory size in bytes',
+              function=lambda: memory_usage_mb() * 2 ** 20)
@@ -8,14 +8,16 @@ from config.settings import settings
 app = FastAPI(title="Binance Trading Bot", version="1.0.0")
 
 # Подключение статических файлов и шаблонов
-app.mount("/static", StaticFiles(directory="web/static"), name="static")
+app.mount("/static", StaticFiles(directory="web/static", check_dir=False), name="static")
 templates = Jinja2Templates(directory="web/templates")
 
 # Подключение роутов
-from web.routes import dashboard, trades, api
+from web.routes import dashboard, trades, api, stream, metrics
 app.include_router(dashboard.router)
 app.include_router(trades.router)
 app.include_router(api.router)
+app.include_router(stream.router)
+app.include_router(metrics.router)
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
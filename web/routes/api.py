@@ -0,0 +1,145 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+from config.settings import settings
+from database.database import get_db
+from database.models import Signal, Balance, BacktestResult
+
+router = APIRouter(prefix="/api", tags=["api"])
+
+MAX_PAGE_SIZE = 500
+
+class ResponseCache:
+    """Кэш готовых JSON ответов с коротким TTL"""
+    def __init__(self, ttl: float = 2.0, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1], entry[2]
+
+    def set(self, key: str, body: bytes, etag: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache(settings.API_CACHE_TTL)
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(db: Session, model, filters: list, limit: int, cursor: Optional[str],
+             start: Optional[datetime], end: Optional[datetime]) -> dict:
+    """Страница записей от новых к старым с курсором на следующую
+    Keyset по (timestamp, id) идет по индексу, поэтому стоимость не
+    зависит от глубины страницы и размера таблицы.
+    """
+    conditions = list(filters)
+    if start is not None:
+        conditions.append(model.timestamp >= start)
+    if end is not None:
+        conditions.append(model.timestamp < end)
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        conditions.append(or_(
+            model.timestamp < timestamp,
+            and_(model.timestamp == timestamp, model.id < row_id)
+        ))
+
+    statement = (
+        select(*model.__table__.columns)
+        .where(*conditions)
+        .order_by(model.timestamp.desc(), model.id.desc())
+        .limit(limit + 1)
+    )
+    rows = db.execute(statement).mappings().all()
+
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last['timestamp'], last['id'])
+    return {'items': items, 'next_cursor': next_cursor}
+
+def cached_json(request: Request, build: Callable[[], dict]) -> Response:
+    """JSON ответ через кэш с поддержкой ETag/If-None-Match"""
+    key = f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+    cached = response_cache.get(key)
+    if cached is None:
+        body = json.dumps(build(), default=_json_default, separators=(',', ':')).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        response_cache.set(key, body, etag)
+    else:
+        body, etag = cached
+
+    headers = {'ETag': etag, 'Cache-Control': f"max-age={int(response_cache.ttl)}"}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+@router.get("/signals")
+def list_signals(request: Request, symbol: Optional[str] = None, strategy: Optional[str] = None,
+                 start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+                 db: Session = Depends(get_db)):
+    """Сигналы стратегий"""
+    filters = []
+    if symbol:
+        filters.append(Signal.symbol == symbol.upper())
+    if strategy:
+        filters.append(Signal.strategy == strategy)
+    return cached_json(request, lambda: paginate(db, Signal, filters, limit, cursor, start, end))
+
+@router.get("/balances")
+def list_balances(request: Request, asset: Optional[str] = None,
+                  start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+                  db: Session = Depends(get_db)):
+    """Снимки балансов"""
+    filters = [Balance.asset == asset.upper()] if asset else []
+    return cached_json(request, lambda: paginate(db, Balance, filters, limit, cursor, start, end))
+
+@router.get("/backtests")
+def list_backtests(request: Request, strategy: Optional[str] = None, symbol: Optional[str] = None,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+                   db: Session = Depends(get_db)):
+    """Результаты бэктестов"""
+    filters = []
+    if strategy:
+        filters.append(BacktestResult.strategy == strategy)
+    if symbol:
+        filters.append(BacktestResult.symbol == symbol.upper())
+    return cached_json(request, lambda: paginate(db, BacktestResult, filters, limit, cursor, start, end))
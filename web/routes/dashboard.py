@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Request, Depends, HTMLResponse # <-- Добавлен HTMLResponse
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from database.database import get_db
 from sqlalchemy.orm import Session
@@ -7,7 +8,7 @@ from database.models import Trade, Signal
 router = APIRouter(prefix="", tags=["dashboard"])
 templates = Jinja2Templates(directory="web/templates")
 
-@router.get("/dashboard", response_class=HTMLResponse) # <-- HTMLResponse теперь определен
+@router.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(request: Request, db: Session = Depends(get_db)):
     # Получение последних сделок
     recent_trades = db.query(Trade).order_by(Trade.timestamp.desc()).limit(10).all()
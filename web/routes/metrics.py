@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from utils.instrumentation import metrics
+
+router = APIRouter(prefix="", tags=["metrics"])
+
+# Формат текстовой выдачи Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+@router.get("/metrics")
+async def get_metrics():
+    """Метрики для Prometheus; в многопроцессном режиме - всех процессов с меткой process"""
+    return Response(metrics.render_all('web'), media_type=CONTENT_TYPE)
@@ -0,0 +1,49 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from core.event_hub import event_hub
+
+router = APIRouter(prefix="", tags=["stream"])
+
+# Интервал комментариев keep-alive в SSE, секунд
+SSE_KEEPALIVE = 15
+
+@router.websocket("/ws")
+async def events_websocket(websocket: WebSocket):
+    """Поток событий бота: снимок, затем новые события"""
+    await websocket.accept()
+    subscriber, snapshot = event_hub.subscribe()
+    try:
+        await websocket.send_text(snapshot)
+        while True:
+            message = await subscriber.get()
+            if message is None:
+                break
+            await websocket.send_text(message)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+@router.get("/api/stream")
+async def events_sse():
+    """Поток событий бота через Server-Sent Events"""
+    async def events():
+        subscriber, snapshot = event_hub.subscribe()
+        try:
+            yield f"data: {snapshot}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield f"data: {message}\n\n"
+        finally:
+            event_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={'Cache-Control': 'no-cache'})
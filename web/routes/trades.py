@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+from database.database import get_db
+from database.models import Trade
+from web.routes.api import MAX_PAGE_SIZE, cached_json, paginate
+
+router = APIRouter(prefix="/api/trades", tags=["trades"])
+
+@router.get("")
+def list_trades(request: Request, symbol: Optional[str] = None, strategy: Optional[str] = None,
+                side: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+                db: Session = Depends(get_db)):
+    """Сделки"""
+    filters = []
+    if symbol:
+        filters.append(Trade.symbol == symbol.upper())
+    if strategy:
+        filters.append(Trade.strategy == strategy)
+    if side:
+        filters.append(Trade.side == side.upper())
+    return cached_json(request, lambda: paginate(db, Trade, filters, limit, cursor, start, end))